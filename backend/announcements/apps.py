@@ -3,4 +3,8 @@ from django.apps import AppConfig
 class AnnouncementsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'announcements'
-    verbose_name = 'Duyurular' 
\ No newline at end of file
+    verbose_name = 'Duyurular'
+
+    def ready(self):
+        # Sinyalleri yükle
+        import announcements.signals
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from ecommerce.cache import invalidate_namespace_on_commit
+from .models import Announcement
+
+
+@receiver(post_save, sender=Announcement)
+@receiver(post_delete, sender=Announcement)
+def invalidate_announcement_cache(sender, **kwargs):
+    """Duyurular değiştiğinde duyuru önbelleğini geçersiz kılar"""
+    invalidate_namespace_on_commit('announcements')
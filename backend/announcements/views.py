@@ -4,9 +4,19 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny
 from .models import Announcement
 from .serializers import AnnouncementSerializer
+from ecommerce.cache import cache_response
+from ecommerce.conditional import ConditionalGetMixin
 
-class AnnouncementListAPIView(APIView):
+class AnnouncementListAPIView(ConditionalGetMixin, APIView):
     permission_classes = [AllowAny]
+    conditional_list_actions = ('get',)
+    conditional_object_actions = ()
+    conditional_cache_namespace = 'announcements'
+
+    def get_conditional_queryset(self):
+        return Announcement.objects.filter(is_active=True)
+
+    @cache_response('announcements')
     def get(self, request):
         announcements = Announcement.objects.filter(is_active=True)
         serializer = AnnouncementSerializer(announcements, many=True)
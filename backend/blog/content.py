@@ -0,0 +1,233 @@
+"""
+Blog içeriğinden türetilen veriler: bölümler (BlogSection), kelime sayısı, okuma
+süresi ve özet.
+
+Yazı kaydedilirken içerik yalnızca değiştiyse işlenir:
+  1. İçeriğin özeti (content_hash) saklanan özetle aynıysa hiçbir şey yapılmaz.
+  2. İçerik HTMLParser ile tek geçişte taranır (prepare_content). Düz metinden
+     word_count ve reading_time hesaplanır; özet (excerpt) boş bırakıldıysa düz
+     metnin başından oluşturulur. Liste uç noktaları bu alanları okur, içeriği
+     (content) hiç yüklemez.
+  3. <h2> başlıkları üst bölüm, <h3> başlıkları kendinden önceki <h2>'nin alt
+     bölümü (level=3, parent) olur. Yeni bölümler mevcutlarla slug üzerinden
+     eşleştirilir; değişenler bulk_update, yeniler bulk_create ile yazılır, artık
+     olmayanlar silinir. Eşleşen bölümlerin id'leri (frontend'de anahtar olarak
+     kullanılır) korunur.
+
+İçindekiler tablosu H2 bölümlerinin içeriğini (sonraki H2'ye kadar, alt başlıklar
+dahil) gösterir; H3 bölümlerinin içeriği bu metnin içinde olduğu için ayrıca
+saklanmaz.
+"""
+import hashlib
+import re
+from html.parser import HTMLParser
+
+from django.db import transaction
+from django.utils.text import slugify
+
+# Çıkarım kuralları değiştiğinde artırılır; rebuild_blog_content tüm yazıları yeniden işler
+CONTENT_VERSION = 2
+HEADING_LEVELS = {'h2': 2, 'h3': 3}
+# Düz metinde ayrı kelimeler olarak kalması için boşlukla ayrılan etiketler
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote',
+    'pre', 'table', 'tr', 'td', 'th', 'figure', 'figcaption', 'hr', 'img',
+}
+SKIPPED_TAGS = {'script', 'style'}
+WORD_PATTERN = re.compile(r'\w+')
+WORDS_PER_MINUTE = 200  # Ortalama dakikada 200 kelime
+EXCERPT_LENGTH = 200
+
+# İçerik değiştiğinde içerikle birlikte kaydedilen alanlar
+CONTENT_FIELDS = ('content_hash', 'word_count', 'reading_time', 'excerpt')
+
+
+def get_content_hash(content):
+    return hashlib.sha256(f'{CONTENT_VERSION}:{content or ""}'.encode('utf-8')).hexdigest()
+
+
+class ContentParser(HTMLParser):
+    """
+    İçerikteki <h2>/<h3> başlıklarını (seviye, başlangıç konumu, metin) ve
+    içeriğin düz metnini toplar
+    """
+
+    def __init__(self, content):
+        super().__init__(convert_charrefs=True)
+        # getpos() (satır, sütun) döndürür; karakter konumuna çevirmek için satır başları
+        self.line_offsets = [0]
+        for index, char in enumerate(content):
+            if char == '\n':
+                self.line_offsets.append(index + 1)
+        self.headings = []
+        self.current = None
+        self.text = []
+        self.skipping = 0
+
+    def get_offset(self):
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag in HEADING_LEVELS:
+            # Kapatılmamış başlık bir sonraki başlıkta biter
+            self.current = {'level': HEADING_LEVELS[tag], 'start': self.get_offset(), 'text': []}
+            self.headings.append(self.current)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.text.append(' ')
+        if tag in HEADING_LEVELS:
+            self.current = None
+
+    def handle_data(self, data):
+        if self.skipping:
+            return
+        self.text.append(data)
+        if self.current is not None:
+            self.current['text'].append(data)
+
+    def get_text(self):
+        return ' '.join(''.join(self.text).split())
+
+
+def parse_content(content):
+    parser = ContentParser(content or '')
+    parser.feed(content or '')
+    parser.close()
+    return parser
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """Düz metnin başından kelime ortasında bölünmeyen bir özet oluşturur"""
+    if len(text) <= length:
+        return text
+    cut = text[:length + 1].rsplit(' ', 1)[0] or text[:length]
+    return f"{cut.rstrip(' .,;:')}…"
+
+
+def prepare_content(blog):
+    """
+    İçerikten türetilen alanları (CONTENT_FIELDS) yazıya atar ve yazı kaydedildikten
+    sonra sync_sections'a verilecek bölümleri döndürür.
+    """
+    parser = parse_content(blog.content)
+    text = parser.get_text()
+    blog.word_count = len(WORD_PATTERN.findall(text))
+    blog.reading_time = max(1, round(blog.word_count / WORDS_PER_MINUTE))  # En az 1 dakika
+    if not (blog.excerpt or '').strip():
+        blog.excerpt = make_excerpt(text)
+    blog.content_hash = get_content_hash(blog.content)
+    return extract_sections(blog.content, parser)
+
+
+def extract_sections(content, parser=None):
+    """
+    İçerikteki bölümleri sırayla döndürür:
+    [{'title', 'slug', 'level', 'order', 'parent_slug', 'content'}, ...]
+    """
+    if not content:
+        return []
+    if parser is None:
+        parser = parse_content(content)
+
+    sections, titles, slugs = [], set(), set()
+    parent_slug = None
+    h2_starts = [heading['start'] for heading in parser.headings if heading['level'] == 2] + [len(content)]
+    for order, heading in enumerate(parser.headings, start=1):
+        title = ' '.join(''.join(heading['text']).split())
+        # Aynı başlık (veya slug) tekrar ediyorsa numaralandırılır (bağlantılar benzersiz olmalı)
+        original_title, count = title, 1
+        while title in titles or slugify(title)[:220] in slugs:
+            title = f"{original_title} {count}"
+            count += 1
+        titles.add(title)
+        slugs.add(slugify(title)[:220])
+
+        section = {
+            'title': title[:200],
+            'slug': slugify(title)[:220],
+            'level': heading['level'],
+            'order': order,
+            'parent_slug': None,
+            'content': None,
+        }
+        if heading['level'] == 2:
+            end = next(start for start in h2_starts if start > heading['start'])
+            section['content'] = content[heading['start']:end]
+            parent_slug = section['slug']
+        else:
+            section['parent_slug'] = parent_slug
+        sections.append(section)
+    return sections
+
+
+def sync_sections(blog, extracted=None):
+    """
+    Yazının bölümlerini içerikle eşitler ve değişen bölüm sayısını döndürür.
+    Çağıran, içeriğin değiştiğini content_hash ile kontrol eder.
+    """
+    BlogSection = blog.sections.model
+    if extracted is None:
+        extracted = extract_sections(blog.content)
+    existing = {}
+    for section in blog.sections.order_by('order', 'pk'):
+        # Aynı slug birden fazlaysa (eski kayıtlar) ilki eşleşir, diğerleri silinir
+        existing.setdefault(section.slug, section)
+
+    fields = ('title', 'level', 'order', 'parent', 'content')
+    kept, changed = {}, 0
+    with transaction.atomic():
+        # Üst bölümler alt bölümlerden önce yazılır; alt bölümlerin parent id'si hazır olur
+        for level in sorted(set(HEADING_LEVELS.values())):
+            to_create, to_update = [], []
+            for data in extracted:
+                if data['level'] != level:
+                    continue
+                values = {
+                    'title': data['title'],
+                    'level': data['level'],
+                    'order': data['order'],
+                    'parent_id': getattr(kept.get(data['parent_slug']), 'pk', None),
+                    'content': data['content'],
+                }
+                section = existing.get(data['slug'])
+                if section is None:
+                    section = BlogSection(blog=blog, slug=data['slug'], **values)
+                    to_create.append(section)
+                elif any(getattr(section, field) != value for field, value in values.items()):
+                    for field, value in values.items():
+                        setattr(section, field, value)
+                    to_update.append(section)
+                kept[data['slug']] = section
+            BlogSection.objects.bulk_create(to_create)
+            BlogSection.objects.bulk_update(to_update, fields)
+            changed += len(to_create) + len(to_update)
+
+        # Alt bölümler yeni üstlerine taşındıktan sonra silinir (parent CASCADE)
+        deleted, _ = blog.sections.exclude(pk__in=[section.pk for section in kept.values()]).delete()
+    return changed + deleted
+
+
+def rebuild_content(blogs, force=False):
+    """
+    Yazıların içerikten türetilen alanlarını ve bölümlerini (içerikleri değiştiyse
+    veya force ile) yeniden hesaplar; işlenen yazı sayısını döndürür. Toplu doldurma
+    için kullanılır, yazılar kaydedilmez (updated_at ve sinyaller tetiklenmez).
+    """
+    rebuilt = 0
+    for blog in blogs:
+        if not force and get_content_hash(blog.content) == blog.content_hash:
+            continue
+        sections = prepare_content(blog)
+        with transaction.atomic():
+            sync_sections(blog, sections)
+            type(blog).objects.filter(pk=blog.pk).update(**{field: getattr(blog, field) for field in CONTENT_FIELDS})
+        rebuilt += 1
+    return rebuilt
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from blog.models import Blog
+from blog.content import rebuild_content
+from blog.tasks import rebuild_blog_content
+
+
+class Command(BaseCommand):
+    help = 'Blog yazılarının içerik bölümlerini (içindekiler), kelime sayısı, okuma süresi ve özetlerini yeniden oluşturur'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Bir görevde işlenecek yazı sayısı (varsayılan: 100)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='İçeriği değişmemiş yazıları da yeniden işle',
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Celery görevlerine göndermeden bu süreçte sırayla çalıştır',
+        )
+
+    def handle(self, *args, **options):
+        batch_size, force = options['batch_size'], options['force']
+        blog_ids = list(Blog.objects.order_by('pk').values_list('pk', flat=True))
+        batches = [blog_ids[start:start + batch_size] for start in range(0, len(blog_ids), batch_size)]
+
+        if not options['sync']:
+            # Yazılar celery worker'larında paralel işlenir
+            for batch in batches:
+                rebuild_blog_content.delay(batch, force=force)
+            self.stdout.write(self.style.SUCCESS(
+                f'{len(blog_ids)} yazı için {len(batches)} görev kuyruğa gönderildi.'
+            ))
+            return
+
+        rebuilt = 0
+        for batch in batches:
+            blogs = Blog.objects.filter(pk__in=batch).only('pk', 'content', 'content_hash', 'excerpt').order_by('pk')
+            rebuilt += rebuild_content(blogs, force=force)
+        self.stdout.write(self.style.SUCCESS(f'{rebuilt} blog yazısının içerik bilgileri yeniden oluşturuldu.'))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from blog.related import rebuild_related_posts
+
+
+class Command(BaseCommand):
+    help = 'Tüm blog yazılarının benzer yazı listelerini yeniden hesaplar'
+
+    def handle(self, *args, **options):
+        changed = rebuild_related_posts()
+        self.stdout.write(self.style.SUCCESS(f'{changed} blog yazısının benzer yazıları güncellendi.'))
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlogRelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Sıra')),
+                ('score', models.FloatField(verbose_name='Benzerlik Puanı')),
+                ('blog', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='blog.blog', verbose_name='Blog Yazısı')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.blog', verbose_name='Benzer Yazı')),
+            ],
+            options={
+                'verbose_name': 'Benzer Yazı',
+                'verbose_name_plural': 'Benzer Yazılar',
+                'ordering': ['blog', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='blogrelatedpost',
+            constraint=models.UniqueConstraint(fields=('blog', 'rank'), name='blog_related_rank_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_blogrelatedpost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='İçerik Özeti'),
+        ),
+    ]
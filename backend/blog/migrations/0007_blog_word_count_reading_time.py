@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_blog_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='Okuma Süresi (dk)'),
+        ),
+        migrations.AddField(
+            model_name='blog',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Kelime Sayısı'),
+        ),
+        migrations.AlterField(
+            model_name='blog',
+            name='excerpt',
+            field=models.TextField(blank=True, help_text='Blog yazısının kısa özeti (boş bırakılırsa içeriğin başından oluşturulur)', verbose_name='Özet'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_blog_word_count_reading_time'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['status', 'is_featured', '-published_at'], name='blog_status_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blog',
+            index=models.Index(fields=['status', '-view_count'], name='blog_status_views_idx'),
+        ),
+    ]
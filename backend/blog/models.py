@@ -1,10 +1,12 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 from django.utils import timezone
 from django.utils.html import mark_safe
 from django.contrib.auth.models import User
 from ckeditor_uploader.fields import RichTextUploadingField
-import re
+from ecommerce.counters import ViewCounter
+from products.suggest import SuggestionSnapshotMixin
+from .content import CONTENT_FIELDS, get_content_hash, prepare_content, sync_sections
 
 class BlogCategory(models.Model):
     name = models.CharField(max_length=100, verbose_name="Kategori Adı")
@@ -46,7 +48,23 @@ class BlogTag(models.Model):
         super().save(*args, **kwargs)
 
 
-class Blog(models.Model):
+class BlogQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(status='published')
+
+    def with_listing_data(self):
+        """
+        Liste serileştiricisinin ihtiyaç duyduğu yazar, kategori ve etiketleri yazı
+        başına sorgu atmadan yükler; içerik (content) yüklenmez
+        """
+        return self.select_related('author').prefetch_related('categories', 'tags').defer('content')
+
+    def with_detail_data(self):
+        """Detay serileştiricisi için yazar, kategori, etiket ve bölümleri önceden yükler"""
+        return self.select_related('author').prefetch_related('categories', 'tags', 'sections')
+
+
+class Blog(SuggestionSnapshotMixin, models.Model):
     STATUS_CHOICES = [
         ('draft', 'Taslak'),
         ('published', 'Yayınlandı'),
@@ -54,7 +72,11 @@ class Blog(models.Model):
     
     title = models.CharField(max_length=200, verbose_name="Başlık")
     slug = models.SlugField(max_length=220, unique=True, verbose_name="URL Slug")
-    excerpt = models.TextField(verbose_name="Özet", help_text="Blog yazısının kısa özeti")
+    excerpt = models.TextField(
+        blank=True,
+        verbose_name="Özet",
+        help_text="Blog yazısının kısa özeti (boş bırakılırsa içeriğin başından oluşturulur)"
+    )
     content = RichTextUploadingField(verbose_name="İçerik")
     author = models.ForeignKey(
         User, 
@@ -96,14 +118,32 @@ class Blog(models.Model):
         help_text="SEO için 160 karakterden az olmalı"
     )
     view_count = models.PositiveIntegerField(default=0, verbose_name="Görüntülenme Sayısı")
+    # İçerikten kaydedilirken hesaplanır (bkz. blog.content); listeler içeriği yüklemez
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Kelime Sayısı")
+    reading_time = models.PositiveSmallIntegerField(default=1, editable=False, verbose_name="Okuma Süresi (dk)")
+    # Türetilen alanların hesaplandığı içeriğin özeti; boşsa henüz hesaplanmamıştır
+    content_hash = models.CharField(max_length=64, blank=True, editable=False, verbose_name="İçerik Özeti")
+
+    objects = BlogQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Blog Yazısı"
         verbose_name_plural = "Blog Yazıları"
         ordering = ['-published_at']
+        indexes = [
+            # Yayınlanmış yazıların keyset sayfalaması: (published_at, id)
+            models.Index(fields=['status', '-published_at', '-id'], name='blog_status_published_idx'),
+            models.Index(fields=['-created_at', '-id'], name='blog_created_idx'),
+            # Öne çıkan yazılar (featured, single_featured) ve popüler yazılar
+            models.Index(fields=['status', 'is_featured', '-published_at'], name='blog_status_featured_idx'),
+            models.Index(fields=['status', '-view_count'], name='blog_status_views_idx'),
+        ]
     
     def __str__(self):
         return self.title
+
+    # Arama önerilerinde görünen alanlar (bkz. products.suggest)
+    SUGGESTION_FIELDS = ('title', 'slug', 'featured_image', 'status')
     
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -112,122 +152,58 @@ class Blog(models.Model):
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
             
-        # Sadece belirli alanların güncellenmesi durumunda
-        is_update_fields = 'update_fields' in kwargs and kwargs['update_fields'] is not None
-        # Eğer content değişmediyse veya sadece belirli alanlar güncelleniyorsa ve content dahil değilse
-        if is_update_fields and 'content' not in kwargs['update_fields']:
+        # Sadece belirli alanlar güncelleniyorsa ve content dahil değilse bölümlere dokunma
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' not in update_fields:
             super().save(*args, **kwargs)
             return
-            
-        super().save(*args, **kwargs)
-        
-        # İçerikten başlıkları çıkarıp BlogSection modelinde sakla
-        if self.content:
-            # Bölümleri tamamen temizle ve yeniden oluştur - en güvenli yol
-            BlogSection.objects.filter(blog=self).delete()
-            
-            # H2 başlıklarını bul
-            h2_pattern = r'<h2[^>]*>(.*?)</h2>'
-            
-            # İçeriği bölümlere ayır
-            h2_positions = [(m.start(), m.group(1)) for m in re.finditer(h2_pattern, self.content)]
-            
-            if not h2_positions:
-                # H2 başlığı yoksa işlem yapma
-                return
-                
-            # Başlıkları benzersiz yap ve sırayla ekle
-            processed_titles = set()
-            
-            # Her H2 başlığı arasındaki içeriği bir bölüm olarak sakla
-            for i, (pos, title) in enumerate(h2_positions):
-                # Eğer aynı başlık daha önce işlendiyse, benzersiz yap
-                original_title = title
-                count = 1
-                
-                while title in processed_titles:
-                    title = f"{original_title} {count}"
-                    count += 1
-                
-                processed_titles.add(title)
-                slug = slugify(title)
-                start_pos = pos
-                
-                # Sonraki H2 başlığının pozisyonu veya içeriğin sonu
-                if i < len(h2_positions) - 1:
-                    end_pos = h2_positions[i+1][0]
-                else:
-                    end_pos = len(self.content)
-                    
-                # Bu bölümün içeriğini çıkar
-                section_content = self.content[start_pos:end_pos]
-                
-                # Yeni bölüm oluştur
-                BlogSection.objects.create(
-                    blog=self,
-                    title=title,
-                    slug=slug,
-                    level=2,
-                    order=i + 1,
-                    parent=None,
-                    content=section_content
-                )
+
+        # İçerik değişmediyse (ve özet boşaltılmadıysa) türetilen alanlar ve bölümler
+        # yeniden hesaplanmaz (bkz. blog.content)
+        if get_content_hash(self.content) == self.content_hash and (self.excerpt or '').strip():
+            super().save(*args, **kwargs)
+            return
+
+        sections = prepare_content(self)
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *CONTENT_FIELDS}
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # İçerikten başlıkları çıkarıp BlogSection modelinde sakla
+            sync_sections(self, sections)
     
     def get_absolute_url(self):
         return f"/blog/{self.slug}/"
     
     def get_reading_time(self):
-        """Yazının tahmini okuma süresini dakika cinsinden hesapla"""
-        word_count = len(re.findall(r'\w+', self.content))
-        reading_time = word_count / 200  # Ortalama dakikada 200 kelime
-        return max(1, round(reading_time))  # En az 1 dakika
+        """Yazının tahmini okuma süresi (dakika); kaydedilirken hesaplanır"""
+        return self.reading_time
     
-    def increment_view_count(self):
-        """Görüntülenme sayısını artır"""
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
+    def increment_view_count(self, request=None):
+        """
+        Görüntülenmeyi sayar. Sayı hemen yazılmaz; blog_view_counter'da biriktirilir
+        ve blog.tasks.flush_blog_view_counts ile toplu olarak veritabanına yazılır.
+        """
+        return blog_view_counter.hit(self.pk, request)
+
+    def get_live_view_count(self):
+        """Henüz veritabanına yazılmamış görüntülenmeler dahil görüntülenme sayısı"""
+        return self.view_count + blog_view_counter.get_pending(self.pk)
     
     def get_related_posts(self):
-        """Benzer yazıları getir (aynı kategoride ve etiketlerde)"""
-        # Önce kategori uyumunu kontrol et, sonra etiketlere bak
-        related_by_category = Blog.objects.filter(
-            status='published',
-            categories__in=self.categories.all()
-        ).exclude(id=self.id).distinct()
-        
-        # Zaten yeterince kategori bazlı benzer içerik varsa onları döndür
-        if related_by_category.count() >= 3:
-            return related_by_category[:3]
-            
-        # Yeterli kategori bazlı içerik yoksa, etiketlere göre de bak
-        related_by_tags = Blog.objects.filter(
-            status='published',
-            tags__in=self.tags.all()
-        ).exclude(id=self.id).exclude(
-            id__in=related_by_category.values_list('id', flat=True)
-        ).distinct()
-        
-        # İki sorgunun sonuçlarını birleştir
-        combined = list(related_by_category)
-        remaining_slots = 3 - len(combined)
-        
-        if remaining_slots > 0 and related_by_tags.exists():
-            combined.extend(list(related_by_tags[:remaining_slots]))
-            
-        # Hala 3'ten az ise, en yeni yazılardan ekle
-        if len(combined) < 3:
-            remaining_slots = 3 - len(combined)
-            recent_posts = Blog.objects.filter(
-                status='published'
-            ).exclude(
-                id=self.id
-            ).exclude(
-                id__in=[post.id for post in combined]
-            ).order_by('-published_at')[:remaining_slots]
-            
-            combined.extend(list(recent_posts))
-            
-        return combined
+        """
+        Benzer yazıları getir (aynı kategoride ve etiketlerde). Sıralama önceden
+        hesaplanıp BlogRelatedPost tablosunda tutulur (bkz. blog.related). Yazı
+        sayısından bağımsız üç sorgu: bağlantılar + kategoriler + etiketler.
+        """
+        links = self.related_links.filter(related__status='published').select_related(
+            'related__author',
+        ).defer('related__content').prefetch_related('related__categories', 'related__tags')
+        return [link.related for link in links]
+
+
+# Blog yazılarının tamponlu görüntülenme sayacı (bkz. ecommerce.counters)
+blog_view_counter = ViewCounter('blog', Blog)
 
 
 class BlogSection(models.Model):
@@ -263,3 +239,32 @@ class BlogSection(models.Model):
     def get_anchor_link(self):
         """HTML içindeki başlık için anchor link döndür"""
         return f"#{self.slug}"
+
+
+class BlogRelatedPost(models.Model):
+    """Yazının önceden hesaplanmış benzer yazıları (bkz. blog.related)"""
+    blog = models.ForeignKey(
+        Blog,
+        on_delete=models.CASCADE,
+        related_name="related_links",
+        verbose_name="Blog Yazısı"
+    )
+    related = models.ForeignKey(
+        Blog,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Benzer Yazı"
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="Sıra")
+    score = models.FloatField(verbose_name="Benzerlik Puanı")
+
+    class Meta:
+        verbose_name = "Benzer Yazı"
+        verbose_name_plural = "Benzer Yazılar"
+        ordering = ['blog', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['blog', 'rank'], name='blog_related_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.blog_id} -> {self.related_id} ({self.rank})"
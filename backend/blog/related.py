@@ -0,0 +1,137 @@
+"""
+Önceden hesaplanmış benzer yazılar.
+
+Detay sayfasındaki "benzer yazılar" her görüntülemede kategori/etiket örtüşmesi
+sorgularıyla hesaplanmaz; her yazı için ilk RELATED_POSTS_LIMIT yazı
+BlogRelatedPost tablosunda sıralı tutulur. Detayda liste kartları sabit üç sorguyla
+okunur: bağlantılar (yazarla birlikte) + kategoriler + etiketler. Puan:
+
+    CATEGORY_WEIGHT * ortak kategori + TAG_WEIGHT * ortak etiket + yenilik
+
+Yenilik puanı (en fazla RECENCY_WEIGHT, RECENCY_HALF_LIFE_DAYS günde yarıya iner)
+örtüşmesi aynı olan yazılarda yeniyi öne çıkarır; hiç örtüşme yoksa en yeni yazılar
+listeyi tamamlar (eski davranış).
+
+Yazı kaydedildiğinde veya kategori/etiketleri değiştiğinde rebuild_related_posts
+yalnızca etkilenen yazıları yeniden hesaplar (blog/signals.py):
+  - yazının kendisi ve onunla kategori/etiket paylaşan yazılar
+  - listesinde bu yazı bulunan yazılar (örtüşme azaldıysa veya yayından kalktıysa)
+  - listesi en yeni yazılarla tamamlanmış veya eksik kalmış yazılar (yeni yazı girebilir)
+Yenilik puanı zamanla değiştiği için tüm tablo her gece yeniden hesaplanır.
+"""
+import math
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Blog, BlogRelatedPost
+
+RELATED_POSTS_LIMIT = 3
+CATEGORY_WEIGHT = 2
+TAG_WEIGHT = 1
+RECENCY_WEIGHT = 0.5
+RECENCY_HALF_LIFE_DAYS = 90
+
+
+def load_index():
+    """Yayındaki yazıların {id: (yayın tarihi, kategori id'leri, etiket id'leri)} sözlüğü"""
+    posts = {
+        pk: (published_at, set(), set())
+        for pk, published_at in Blog.objects.published().values_list('id', 'published_at')
+    }
+    through_models = ((Blog.categories.through, 'blogcategory_id', 1), (Blog.tags.through, 'blogtag_id', 2))
+    for through, column, position in through_models:
+        rows = through.objects.filter(blog__status='published').values_list('blog_id', column)
+        for blog_id, related_id in rows:
+            posts[blog_id][position].add(related_id)
+    return posts
+
+
+def recency_score(published_at, now):
+    if published_at is None:
+        return 0
+    age_days = max((now - published_at).total_seconds(), 0) / 86400
+    return RECENCY_WEIGHT * math.pow(0.5, age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+def rank_related(pk, posts, now):
+    """Yazının benzer yazılarını [(id, puan), ...] olarak döndürür"""
+    _, categories, tags = posts[pk]
+    candidates = []
+    for other_pk, (published_at, other_categories, other_tags) in posts.items():
+        if other_pk == pk:
+            continue
+        score = (
+            CATEGORY_WEIGHT * len(categories & other_categories)
+            + TAG_WEIGHT * len(tags & other_tags)
+            + recency_score(published_at, now)
+        )
+        candidates.append((score, published_at or now, other_pk))
+    candidates.sort(reverse=True)
+    return [(other_pk, score) for score, _, other_pk in candidates[:RELATED_POSTS_LIMIT]]
+
+
+def get_affected_posts(blog_ids, posts, links):
+    """Değişen yazıların benzer yazı listelerini etkileyebileceği yazılar"""
+    affected = set(blog_ids)
+    for pk in blog_ids:
+        if pk not in posts:
+            continue
+        _, categories, tags = posts[pk]
+        affected.update(
+            other_pk for other_pk, (_, other_categories, other_tags) in posts.items()
+            if categories & other_categories or tags & other_tags
+        )
+    for blog_id, entries in links.items():
+        if any(related_id in blog_ids for related_id, _ in entries):
+            affected.add(blog_id)
+        # Örtüşmesiz (yalnızca yenilik puanlı) girişler veya eksik liste: yeni yazı girebilir
+        elif len(entries) < RELATED_POSTS_LIMIT or any(score < TAG_WEIGHT for _, score in entries):
+            affected.add(blog_id)
+    # Henüz hiç hesaplanmamış yazılar
+    affected.update(pk for pk in posts if pk not in links)
+    return affected
+
+
+def rebuild_related_posts(blog_ids=None):
+    """
+    Benzer yazı listelerini yeniden hesaplar; blog_ids verilmezse tümünü.
+    Listesi değişen yazı sayısını döndürür.
+    """
+    now = timezone.now()
+    posts = load_index()
+    links = {}
+    for blog_id, related_id, score in BlogRelatedPost.objects.order_by('blog_id', 'rank').values_list(
+        'blog_id', 'related_id', 'score',
+    ):
+        links.setdefault(blog_id, []).append((related_id, score))
+
+    if blog_ids is None:
+        affected = set(posts) | set(links)
+    else:
+        affected = get_affected_posts(set(blog_ids), posts, links)
+
+    changed, new_links = [], []
+    for pk in affected:
+        ranked = rank_related(pk, posts, now) if pk in posts else []
+        current = links.get(pk, [])
+        if [related_id for related_id, _ in ranked] == [related_id for related_id, _ in current]:
+            continue
+        changed.append(pk)
+        new_links.extend(
+            BlogRelatedPost(blog_id=pk, related_id=related_id, rank=rank, score=score)
+            for rank, (related_id, score) in enumerate(ranked, start=1)
+        )
+    if not changed:
+        return 0
+
+    with transaction.atomic():
+        # Eşzamanlı yeniden hesaplamalar aynı yazıların satırlarını sırayla değiştirir;
+        # bu arada silinen yazıların satırları eklenmez
+        locked = set(Blog.objects.select_for_update().filter(pk__in=changed).order_by('pk').values_list('pk', flat=True))
+        existing = set(Blog.objects.filter(pk__in={link.related_id for link in new_links}).values_list('pk', flat=True))
+        BlogRelatedPost.objects.filter(blog_id__in=changed).delete()
+        BlogRelatedPost.objects.bulk_create([
+            link for link in new_links if link.blog_id in locked and link.related_id in existing
+        ])
+    return len(changed)
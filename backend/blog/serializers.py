@@ -1,5 +1,11 @@
 from rest_framework import serializers
 from .models import Blog, BlogCategory, BlogTag, BlogSection
+from ecommerce.serializers import SparseFieldsetsMixin
+
+# Blog serileştiricilerindeki hesaplanan alanların ihtiyaç duyduğu veriler (bkz. SparseFieldsetsMixin)
+BLOG_FIELD_REQUIREMENTS = {
+    'author_name': {'select_related': ('author',), 'only': ()},
+}
 
 
 class BlogTagSerializer(serializers.ModelSerializer):
@@ -20,11 +26,12 @@ class BlogSectionSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'slug', 'level', 'order', 'parent', 'content']
 
 
-class BlogListSerializer(serializers.ModelSerializer):
+class BlogListSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     categories = BlogCategorySerializer(many=True, read_only=True)
     tags = BlogTagSerializer(many=True, read_only=True)
     author_name = serializers.SerializerMethodField()
-    reading_time = serializers.SerializerMethodField()
+
+    field_requirements = BLOG_FIELD_REQUIREMENTS
     
     class Meta:
         model = Blog
@@ -38,25 +45,26 @@ class BlogListSerializer(serializers.ModelSerializer):
         if obj.author:
             return obj.author.get_full_name() or obj.author.username
         return None
-    
-    def get_reading_time(self, obj):
-        return obj.get_reading_time()
 
 
-class BlogDetailSerializer(serializers.ModelSerializer):
+class BlogDetailSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     categories = BlogCategorySerializer(many=True, read_only=True)
     tags = BlogTagSerializer(many=True, read_only=True)
     sections = BlogSectionSerializer(many=True, read_only=True)
     author_name = serializers.SerializerMethodField()
-    reading_time = serializers.SerializerMethodField()
     related_posts = serializers.SerializerMethodField()
+
+    field_requirements = {
+        **BLOG_FIELD_REQUIREMENTS,
+        'related_posts': {'only': ()},
+    }
     
     class Meta:
         model = Blog
         fields = [
             'id', 'title', 'slug', 'excerpt', 'content', 'featured_image', 
             'categories', 'tags', 'sections', 'author_name', 'published_at', 
-            'reading_time', 'view_count', 'meta_description', 'related_posts'
+            'reading_time', 'word_count', 'view_count', 'meta_description', 'related_posts'
         ]
     
     def get_author_name(self, obj):
@@ -64,9 +72,6 @@ class BlogDetailSerializer(serializers.ModelSerializer):
             return obj.author.get_full_name() or obj.author.username
         return None
     
-    def get_reading_time(self, obj):
-        return obj.get_reading_time()
-    
     def get_related_posts(self, obj):
         related = obj.get_related_posts()
         return BlogListSerializer(related, many=True, context=self.context).data 
\ No newline at end of file
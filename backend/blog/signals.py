@@ -0,0 +1,90 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from ecommerce.cache import invalidate_namespace_on_commit
+from products.suggest import blog_entry, invalidate_suggestions_on_commit, suggestion_changed, suggestion_index
+from .models import Blog, BlogCategory, BlogTag
+from .tasks import rebuild_blog_related_posts
+
+
+@receiver(post_save, sender=Blog)
+def invalidate_blog_cache_on_save(sender, instance, update_fields=None, **kwargs):
+    """Blog yazısı kaydedildiğinde blog önbelleğini geçersiz kılar"""
+    # Sadece görüntülenme sayısı arttıysa önbelleği temizleme (her detay görüntülemede olur)
+    if update_fields is not None and set(update_fields) == {'view_count'}:
+        return
+    invalidate_namespace_on_commit('blog')
+
+
+@receiver(post_delete, sender=Blog)
+@receiver(post_save, sender=BlogCategory)
+@receiver(post_delete, sender=BlogCategory)
+@receiver(post_save, sender=BlogTag)
+@receiver(post_delete, sender=BlogTag)
+@receiver(m2m_changed, sender=Blog.categories.through)
+@receiver(m2m_changed, sender=Blog.tags.through)
+def invalidate_blog_cache(sender, **kwargs):
+    """Blog listelerinde görünen kayıtlar değiştiğinde blog önbelleğini geçersiz kılar"""
+    invalidate_namespace_on_commit('blog')
+
+
+@receiver(m2m_changed, sender=Blog.categories.through)
+@receiver(m2m_changed, sender=Blog.tags.through)
+def touch_blogs_on_relation_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Kategori/etiket ilişkisi değişen yazıların updated_at alanını yeniler;
+    ETag/Last-Modified doğrulayıcıları bu alana dayanır.
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        blog_ids = [instance.pk]
+    elif action == 'pre_clear':
+        blog_ids = list(instance.blogs.values_list('pk', flat=True))
+    else:
+        blog_ids = pk_set or []
+    Blog.objects.filter(pk__in=blog_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def update_blog_suggestion(sender, instance, signal, raw=False, update_fields=None, **kwargs):
+    """Arama önerilerindeki blog başlığını işlem tamamlanınca günceller"""
+    if raw or (update_fields is not None and set(update_fields) == {'view_count'}):
+        return
+    if signal is post_save and not suggestion_changed(instance):
+        # İçerik gibi öneride görünmeyen alanlar değişti
+        return
+    pk = instance.pk
+    published = signal is post_save and instance.status == 'published'
+    entry = blog_entry(instance) if published else None
+    transaction.on_commit(lambda: suggestion_index.update('blog', pk, entry))
+    invalidate_suggestions_on_commit()
+
+
+def schedule_related_rebuild(blog_ids):
+    blog_ids = sorted(blog_ids)
+    if blog_ids:
+        transaction.on_commit(lambda: rebuild_blog_related_posts.delay(blog_ids))
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def rebuild_related_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Yazı yayınlandığında, değiştiğinde veya silindiğinde benzer yazı listelerini yeniler"""
+    if raw or (update_fields is not None and set(update_fields) == {'view_count'}):
+        return
+    schedule_related_rebuild([instance.pk])
+
+
+@receiver(m2m_changed, sender=Blog.categories.through)
+@receiver(m2m_changed, sender=Blog.tags.through)
+def rebuild_related_on_relation_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Kategori/etiketleri değişen yazıların benzer yazı listelerini yeniler"""
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        schedule_related_rebuild([instance.pk])
+    elif reverse and action in ('post_add', 'post_remove'):
+        schedule_related_rebuild(pk_set or [])
+    elif reverse and action == 'pre_clear':
+        schedule_related_rebuild(instance.blogs.values_list('pk', flat=True))
@@ -0,0 +1,32 @@
+from celery import shared_task
+from .models import Blog, blog_view_counter
+from .related import rebuild_related_posts
+from .content import rebuild_content
+
+
+@shared_task
+def flush_blog_view_counts():
+    """Önbellekte biriken blog görüntülenmelerini toplu olarak veritabanına yazar."""
+    updated = blog_view_counter.flush()
+    return f"{updated} blog yazısının görüntülenme sayısı güncellendi."
+
+
+@shared_task
+def rebuild_blog_related_posts(blog_ids=None):
+    """
+    Benzer yazı listelerini yeniden hesaplar. blog_ids verilirse yalnızca bu yazıların
+    etkilediği listeler, verilmezse (gece çalışan görev) tüm tablo yenilenir.
+    """
+    changed = rebuild_related_posts(blog_ids)
+    return f"{changed} blog yazısının benzer yazıları güncellendi."
+
+
+@shared_task
+def rebuild_blog_content(blog_ids, force=False):
+    """
+    Verilen yazıların içerikten türetilen alanlarını ve bölümlerini yeniden hesaplar
+    (rebuild_blog_content komutu yazıları bölümler halinde gönderir).
+    """
+    blogs = Blog.objects.filter(pk__in=blog_ids).only('pk', 'content', 'content_hash', 'excerpt').order_by('pk')
+    rebuilt = rebuild_content(blogs, force=force)
+    return f"{rebuilt} blog yazısının içerik bilgileri yeniden oluşturuldu."
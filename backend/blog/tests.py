@@ -1,3 +1,404 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Blog, BlogCategory, BlogSection, BlogTag, blog_view_counter
+from .related import rebuild_related_posts
+from .serializers import BlogListSerializer
+from .tasks import flush_blog_view_counts
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'blog-tests'}}
+
+
+@override_settings(CACHES=NO_CACHE)
+class BlogPaginationTests(TestCase):
+    """Blog listeleri sayfa numarasıyla çalışmaya devam etmeli, cursor modu isteğe bağlı olmalı"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = BlogCategory.objects.create(name='Tarifler', slug='tarifler')
+        now = timezone.now()
+        for i in range(7):
+            blog = Blog.objects.create(
+                title=f'Yazı {i}', slug=f'yazi-{i}', excerpt='Özet', content='<p>İçerik</p>',
+                featured_image='https://cdn.kasarcim.com/yazi.jpg', status='published',
+            )
+            blog.categories.add(self.category)
+        # Aynı yayın tarihine sahip yazılar id ile ayrışmalı
+        Blog.objects.filter(pk__lte=Blog.objects.order_by('pk')[3].pk).update(published_at=now - timedelta(days=1))
+
+    def walk(self, url):
+        slugs = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            slugs.extend(item['slug'] for item in response.data['results'])
+            url = response.data['next']
+        return slugs
+
+    def test_page_numbers_unchanged(self):
+        response = self.client.get('/api/blog/posts/')
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_cursor_mode(self):
+        expected = list(Blog.objects.order_by('-published_at', '-id').values_list('slug', flat=True))
+        self.assertEqual(self.walk('/api/blog/posts/?pagination=cursor'), expected)
+
+    def test_category_blogs_pagination_is_opt_in(self):
+        url = f'/api/blog/categories/{self.category.slug}/blogs/'
+        self.assertEqual(len(self.client.get(url).data), 7)
+        self.assertEqual(len(self.walk(f'{url}?pagination=cursor&page_size=2')), 7)
+
+
+@override_settings(CACHES=LOCAL_CACHE, VIEW_COUNTER_DEDUP_SECONDS=1800)
+class BlogViewCounterTests(TestCase):
+    """Görüntülenmeler önbellekte biriktirilip toplu olarak yazılır"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.blogs = [
+            Blog.objects.create(
+                title=f'Yazı {i}', slug=f'yazi-{i}', excerpt='Özet', content='<p>İçerik</p>',
+                featured_image='https://cdn.kasarcim.com/yazi.jpg', status='published',
+            )
+            for i in range(2)
+        ]
+
+    def view(self, blog, ip='10.0.0.1'):
+        response = self.client.get(f'/api/blog/posts/{blog.slug}/', HTTP_X_REAL_IP=ip)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_views_are_buffered_until_flush(self):
+        blog = self.blogs[0]
+        self.view(blog)
+        response = self.view(blog, ip='10.0.0.2')
+        # Veritabanına henüz yazılmadı ama yanıtta görünür
+        self.assertEqual(response.data['view_count'], 2)
+        blog.refresh_from_db()
+        self.assertEqual(blog.view_count, 0)
+
+        updated_at = blog.updated_at
+        flush_blog_view_counts()
+        blog.refresh_from_db()
+        self.assertEqual(blog.view_count, 2)
+        self.assertEqual(blog.updated_at, updated_at)
+        self.assertEqual(blog_view_counter.get_pending(blog.pk), 0)
+        self.assertEqual(self.view(blog, ip='10.0.0.3').data['view_count'], 3)
+
+    def test_repeat_views_by_same_visitor_count_once(self):
+        blog = self.blogs[0]
+        for _ in range(3):
+            self.view(blog)
+        self.assertEqual(blog_view_counter.get_pending(blog.pk), 1)
+        # Farklı tarayıcı farklı ziyaretçidir
+        self.client.get(f'/api/blog/posts/{blog.slug}/', HTTP_X_REAL_IP='10.0.0.1', HTTP_USER_AGENT='Safari')
+        self.assertEqual(blog_view_counter.get_pending(blog.pk), 2)
+
+    @override_settings(VIEW_COUNTER_DEDUP_SECONDS=0)
+    def test_dedup_can_be_disabled(self):
+        for _ in range(3):
+            self.view(self.blogs[0])
+        self.assertEqual(blog_view_counter.get_pending(self.blogs[0].pk), 3)
+
+    def test_flush_updates_all_posts_in_one_query(self):
+        first, second = self.blogs
+        Blog.objects.filter(pk=second.pk).update(view_count=10)
+        self.view(first)
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            self.view(second, ip=ip)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(blog_view_counter.flush(), 2)
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            dict(Blog.objects.values_list('slug', 'view_count')), {'yazi-0': 1, 'yazi-1': 13},
+        )
+        # Yazılan farklar tekrar yazılmaz
+        with self.assertNumQueries(0):
+            self.assertEqual(blog_view_counter.flush(), 0)
+
+    def test_failed_flush_is_retried_without_double_counting(self):
+        for blog in self.blogs:
+            self.view(blog)
+
+        update = QuerySet.update
+        calls = []
+
+        def fail_second_batch(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise DatabaseError('bağlantı koptu')
+            return update(queryset, **kwargs)
+
+        with mock.patch('ecommerce.counters.FLUSH_BATCH_SIZE', 1):
+            with mock.patch.object(QuerySet, 'update', fail_second_batch), self.assertRaises(DatabaseError):
+                blog_view_counter.flush()
+            # İlk grup da geri alındı; farklar bir sonraki çalıştırmada bir kez yazılır
+            self.assertEqual(set(Blog.objects.values_list('view_count', flat=True)), {0})
+            self.assertEqual(blog_view_counter.flush(), 2)
+        self.assertEqual(set(Blog.objects.values_list('view_count', flat=True)), {1})
+
+
+@override_settings(CACHES=NO_CACHE)
+class BlogRelatedPostTests(TestCase):
+    """Benzer yazılar önceden hesaplanır ve değişikliklerde yenilenir"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.recipes = BlogCategory.objects.create(name='Tarifler', slug='tarifler')
+        self.news = BlogCategory.objects.create(name='Haberler', slug='haberler')
+        self.cheese = BlogTag.objects.create(name='Kaşar', slug='kasar')
+
+    def create_blog(self, slug, categories=(), tags=(), days_ago=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            blog = Blog.objects.create(
+                title=slug, slug=slug, excerpt='Özet', content='<p>İçerik</p>', status='published',
+                featured_image='https://cdn.kasarcim.com/yazi.jpg',
+                published_at=timezone.now() - timedelta(days=days_ago),
+            )
+            blog.categories.add(*categories)
+            blog.tags.add(*tags)
+        return blog
+
+    def related_slugs(self, blog):
+        return [post.slug for post in blog.get_related_posts()]
+
+    def test_ranking_by_overlap_and_recency(self):
+        post = self.create_blog('yazi', [self.recipes], [self.cheese], days_ago=10)
+        self.create_blog('eski-haber', [self.news], days_ago=30)
+        self.create_blog('tarif', [self.recipes], days_ago=20)
+        self.create_blog('tarif-kasar', [self.recipes], [self.cheese], days_ago=40)
+        self.create_blog('kasar', [self.news], [self.cheese], days_ago=50)
+        self.create_blog('yeni-haber', [self.news], days_ago=1)
+
+        self.assertEqual(self.related_slugs(post), ['tarif-kasar', 'tarif', 'kasar'])
+        self.assertEqual(self.related_slugs(Blog.objects.get(slug='eski-haber')), ['yeni-haber', 'kasar', 'yazi'])
+
+    def test_detail_reads_precomputed_posts(self):
+        post = self.create_blog('yazi', [self.recipes])
+        for i in range(3):
+            self.create_blog(f'tarif-{i}', [self.recipes], [self.cheese], days_ago=i + 1)
+
+        # Benzer yazılar: sıralama + kategori ve etiket ön yüklemeleri
+        with self.assertNumQueries(3):
+            related = post.get_related_posts()
+            data = BlogListSerializer(related, many=True).data
+        self.assertEqual([item['slug'] for item in data], ['tarif-0', 'tarif-1', 'tarif-2'])
+        response = self.client.get('/api/blog/posts/yazi/')
+        self.assertEqual([item['slug'] for item in response.data['related_posts']], ['tarif-0', 'tarif-1', 'tarif-2'])
+
+    def test_changes_rebuild_affected_posts(self):
+        post = self.create_blog('yazi', [self.recipes])
+        self.create_blog('haber', [self.news], days_ago=5)
+        self.create_blog('eski-haber', [self.news], days_ago=30)
+        self.create_blog('en-eski-haber', [self.news], days_ago=60)
+        self.assertEqual(self.related_slugs(post), ['haber', 'eski-haber', 'en-eski-haber'])
+
+        # Yeni yazı ortak kategoriyle öne geçer
+        self.create_blog('tarif', [self.recipes], days_ago=90)
+        self.assertEqual(self.related_slugs(post), ['tarif', 'haber', 'eski-haber'])
+
+        # Etiket eklenen yazı ve onunla örtüşen yazılar yenilenir
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheese.blogs.add(post, Blog.objects.get(slug='en-eski-haber'))
+        self.assertEqual(self.related_slugs(post), ['tarif', 'en-eski-haber', 'haber'])
+
+        # Yayından kaldırılan yazı listelerden çıkar
+        with self.captureOnCommitCallbacks(execute=True):
+            tarif = Blog.objects.get(slug='tarif')
+            tarif.status = 'draft'
+            tarif.save()
+        self.assertEqual(self.related_slugs(post), ['en-eski-haber', 'haber', 'eski-haber'])
+        self.assertEqual(self.related_slugs(tarif), [])
+
+        # Silinen yazı da
+        with self.captureOnCommitCallbacks(execute=True):
+            Blog.objects.get(slug='en-eski-haber').delete()
+        self.assertEqual(self.related_slugs(post), ['haber', 'eski-haber'])
+
+        # Gece çalışan tam yeniden hesaplama aynı sonucu verir
+        self.assertEqual(rebuild_related_posts(), 0)
+
+
+@override_settings(CACHES=NO_CACHE)
+class BlogContentTests(TestCase):
+    """İçerikten türetilen alanlar ve bölümler yalnızca içerik değiştiğinde güncellenir"""
+
+    CONTENT = (
+        '<p>Giriş</p>\n'
+        '<h2 id="a">Kaşar <em>tarifi</em></h2>\n<p>Süt</p>\n'
+        '<h3>Malzemeler</h3><p>Maya</p>\n'
+        '<h2>Saklama &amp; servis</h2><p>Buzdolabı</p>\n'
+        '<h3>Malzemeler</h3><p>Kap</p>'
+    )
+
+    def create_blog(self, content=CONTENT, excerpt='Özet'):
+        return Blog.objects.create(
+            title='Kaşar rehberi', slug='kasar-rehberi', excerpt=excerpt, content=content,
+            featured_image='https://cdn.kasarcim.com/yazi.jpg', status='published',
+        )
+
+    def test_stats_and_excerpt_are_stored(self):
+        blog = self.create_blog(excerpt='')
+        self.assertEqual(blog.word_count, 11)
+        self.assertEqual(blog.reading_time, 1)
+        self.assertEqual(blog.excerpt, 'Giriş Kaşar tarifi Süt Malzemeler Maya Saklama & servis Buzdolabı Malzemeler Kap')
+
+        blog.content = '<p>' + 'peynir ' * 1000 + '</p><script>var x = 1;</script>'
+        blog.save(update_fields=['content'])
+        blog.refresh_from_db()
+        self.assertEqual((blog.word_count, blog.reading_time), (1000, 5))
+        # Yazarın özeti korunur, otomatik özet kelime ortasında bölünmez
+        self.assertTrue(blog.excerpt.startswith('Giriş'))
+        blog.excerpt = ''
+        blog.save()
+        self.assertTrue(blog.excerpt.endswith('peynir…'))
+        self.assertLessEqual(len(blog.excerpt), 201)
+
+    def test_lists_do_not_load_content(self):
+        self.create_blog()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/blog/posts/')
+        self.assertEqual(response.data['results'][0]['reading_time'], 1)
+        blog_queries = [query['sql'] for query in queries if 'FROM "blog_blog"' in query['sql']]
+        self.assertTrue(blog_queries)
+        for sql in blog_queries:
+            self.assertNotIn('"blog_blog"."content"', sql)
+
+    def sections(self, blog):
+        return list(blog.sections.order_by('order').values_list('title', 'slug', 'level', 'parent__slug'))
+
+    def test_headings_are_nested(self):
+        blog = self.create_blog()
+        self.assertEqual(self.sections(blog), [
+            ('Kaşar tarifi', 'kasar-tarifi', 2, None),
+            ('Malzemeler', 'malzemeler', 3, 'kasar-tarifi'),
+            ('Saklama & servis', 'saklama-servis', 2, None),
+            ('Malzemeler 1', 'malzemeler-1', 3, 'saklama-servis'),
+        ])
+        first, second = blog.sections.filter(level=2).order_by('order')
+        # H2 bölümü alt başlıklarıyla birlikte sonraki H2'ye kadar sürer
+        self.assertEqual(first.content, '<h2 id="a">Kaşar <em>tarifi</em></h2>\n<p>Süt</p>\n<h3>Malzemeler</h3><p>Maya</p>\n')
+        self.assertTrue(second.content.endswith('<p>Kap</p>'))
+        self.assertIsNone(blog.sections.get(slug='malzemeler').content)
+
+    def test_unchanged_content_is_skipped(self):
+        blog = self.create_blog()
+        BlogSection.objects.filter(blog=blog).update(title='Elle düzenlendi')
+        blog.title = 'Yeni başlık'
+        blog.save()
+        self.assertEqual(set(blog.sections.values_list('title', flat=True)), {'Elle düzenlendi'})
+
+    def test_changes_keep_matching_sections(self):
+        blog = self.create_blog()
+        ids = dict(blog.sections.values_list('slug', 'pk'))
+
+        blog.content = self.CONTENT.replace('<h2>Saklama &amp; servis</h2>', '<h2>Servis</h2>')
+        blog.save(update_fields=['content'])
+        self.assertEqual(self.sections(blog)[2:], [('Servis', 'servis', 2, None), ('Malzemeler 1', 'malzemeler-1', 3, 'servis')])
+        new_ids = dict(blog.sections.values_list('slug', 'pk'))
+        for slug in ('kasar-tarifi', 'malzemeler', 'malzemeler-1'):
+            self.assertEqual(new_ids[slug], ids[slug])
+        self.assertNotIn('saklama-servis', new_ids)
+
+        blog.content = '<p>Başlıksız</p>'
+        blog.save()
+        self.assertFalse(blog.sections.exists())
+
+    def test_backfill_command(self):
+        blog = self.create_blog()
+        BlogSection.objects.all().delete()
+        call_command('rebuild_blog_content', '--sync', stdout=StringIO())
+        # İçerik özeti aynı olduğu için atlanır
+        self.assertFalse(blog.sections.exists())
+
+        Blog.objects.update(content_hash='')
+        out = StringIO()
+        call_command('rebuild_blog_content', '--sync', stdout=out)
+        self.assertIn('1 blog yazısının', out.getvalue())
+        self.assertEqual(blog.sections.count(), 4)
+
+        # Kuyruk modunda da aynı görev çalışır
+        BlogSection.objects.all().delete()
+        call_command('rebuild_blog_content', '--force', stdout=StringIO())
+        self.assertEqual(blog.sections.count(), 4)
+
+
+@override_settings(CACHES=NO_CACHE)
+class BlogQueryCountTests(TestCase):
+    """Blog okuma uç noktalarının sorgu sayısı yazı sayısından bağımsızdır"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = User.objects.create_user(username='yazar', first_name='Ayşe', last_name='Yılmaz')
+        self.category = BlogCategory.objects.create(name='Tarifler', slug='tarifler')
+        self.tag = BlogTag.objects.create(name='Kaşar', slug='kasar')
+        self.create_blogs(3)
+
+    def create_blogs(self, count):
+        start = Blog.objects.count()
+        for i in range(start, start + count):
+            blog = Blog.objects.create(
+                title=f'Yazı {i}', slug=f'yazi-{i}', excerpt='Özet', content='<h2>Başlık</h2><p>İçerik</p>',
+                featured_image='https://cdn.kasarcim.com/yazi.jpg', status='published', is_featured=True,
+                author=self.author,
+            )
+            blog.categories.add(self.category)
+            blog.tags.add(self.tag)
+        rebuild_related_posts()
+
+    def assert_constant_queries(self, url, expected):
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.create_blogs(3)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_post_list(self):
+        # doğrulayıcı + sayım + sayfa + kategoriler + etiketler
+        self.assert_constant_queries('/api/blog/posts/?page_size=10', 5)
+
+    def test_featured_and_popular(self):
+        # doğrulayıcı + yazılar + kategoriler + etiketler
+        self.assert_constant_queries('/api/blog/posts/featured/', 4)
+        self.assert_constant_queries('/api/blog/posts/single_featured/', 4)
+        # popular koşullu yanıt vermez
+        self.assert_constant_queries('/api/blog/posts/popular/', 3)
+
+    def test_post_detail(self):
+        # yazı + kategoriler + etiketler + bölümler + benzer yazılar (+ kategorileri ve etiketleri)
+        self.assert_constant_queries('/api/blog/posts/yazi-0/', 7)
+
+    def test_related_posts_use_three_queries(self):
+        self.create_blogs(3)
+        blog = Blog.objects.get(slug='yazi-0')
+        # bağlantılar (yazar dahil) + kategoriler + etiketler
+        with self.assertNumQueries(3):
+            data = BlogListSerializer(blog.get_related_posts(), many=True).data
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0]['author_name'], 'Ayşe Yılmaz')
+        self.assertEqual(data[0]['categories'][0]['slug'], 'tarifler')
+
+    def test_category_and_tag_posts(self):
+        # doğrulayıcı + kategori/etiket + yazılar + kategoriler + etiketler
+        self.assert_constant_queries('/api/blog/categories/tarifler/blogs/', 5)
+        self.assert_constant_queries('/api/blog/tags/kasar/blogs/', 5)
+
+    def test_author_name_uses_joined_author(self):
+        response = self.client.get('/api/blog/posts/')
+        self.assertEqual(response.data['results'][0]['author_name'], 'Ayşe Yılmaz')
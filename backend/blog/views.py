@@ -5,8 +5,11 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Count
-from rest_framework.pagination import PageNumberPagination
 
+from ecommerce.cache import cache_response
+from ecommerce.conditional import ConditionalGetMixin
+from ecommerce.pagination import KeysetPagination
+from ecommerce.serializers import SparseFieldsetsViewMixin
 from .models import Blog, BlogCategory, BlogTag, BlogSection
 from .serializers import (
     BlogListSerializer, 
@@ -16,13 +19,37 @@ from .serializers import (
     BlogSectionSerializer
 )
 
+# Popüler yazılar yanıtının önbellekte kalma süresi (saniye); görüntülenme sayaçları
+# her dakika veritabanına yazılır (bkz. blog.tasks.flush_blog_view_counts)
+POPULAR_CACHE_TIMEOUT = 60
+
 # Blog için özel pagination sınıfı
-class BlogPagination(PageNumberPagination):
+class BlogPagination(KeysetPagination):
     page_size = 3  # Sayfa boyutunu 3'e düşürdük
     page_size_query_param = 'page_size'
     max_page_size = 100
+    # ?pagination=cursor için sıralamalar (bkz. Blog indeksleri); view_count sürekli
+    # değiştiği için keyset sıralamasına uygun değildir
+    cursor_ordering = ('-published_at', '-id')
+    cursor_orderings = {
+        'published_at': ('published_at', 'id'),
+        '-published_at': ('-published_at', '-id'),
+        'title': ('title', 'id'),
+        '-title': ('-title', '-id'),
+    }
+
+
+class CategoryBlogsPagination(BlogPagination):
+    # Kategori/etiket yazı listeleri varsayılan olarak tam liste döner; sayfalama parametreyle açılır
+    paginate_by_default = False
+
 
-class BlogCategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class AdminBlogPagination(BlogPagination):
+    # Taslakların published_at değeri boş olduğundan keyset oluşturulma tarihine göre yapılır
+    cursor_ordering = ('-created_at', '-id')
+    cursor_orderings = {}
+
+class BlogCategoryViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Blog kategorilerini listeler ve detay görüntüler"""
     queryset = BlogCategory.objects.all()
     serializer_class = BlogCategorySerializer
@@ -30,15 +57,26 @@ class BlogCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'slug'
     filter_backends = [filters.SearchFilter]
     search_fields = ['name', 'description']
+    pagination_class = CategoryBlogsPagination
+    conditional_list_actions = ('list', 'blogs')
+    conditional_cache_namespace = 'blog'
+
+    def get_conditional_queryset(self):
+        if self.action == 'blogs':
+            return Blog.objects.published().filter(categories__slug=self.kwargs['slug'])
+        return super().get_conditional_queryset()
+
+    def get_conditional_timestamp_fields(self):
+        if self.action == 'blogs':
+            return ('updated_at', 'categories__updated_at')
+        return super().get_conditional_timestamp_fields()
     
     @action(detail=True, methods=['get'])
+    @cache_response('blog')
     def blogs(self, request, slug=None):
         """Belirli bir kategorideki blogları listeler"""
         category = self.get_object()
-        blogs = Blog.objects.filter(
-            categories=category, 
-            status='published'
-        ).order_by('-published_at')
+        blogs = Blog.objects.published().with_listing_data().filter(categories=category).order_by('-published_at')
         
         page = self.paginate_queryset(blogs)
         if page is not None:
@@ -49,7 +87,7 @@ class BlogCategoryViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class BlogTagViewSet(viewsets.ReadOnlyModelViewSet):
+class BlogTagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Blog etiketlerini listeler ve detay görüntüler"""
     queryset = BlogTag.objects.all()
     serializer_class = BlogTagSerializer
@@ -57,15 +95,22 @@ class BlogTagViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'slug'
     filter_backends = [filters.SearchFilter]
     search_fields = ['name']
+    pagination_class = CategoryBlogsPagination
+    # Etiketlerde updated_at olmadığı için yalnızca etiketin yazı listesi koşullu yanıt verir
+    conditional_list_actions = ('blogs',)
+    conditional_object_actions = ()
+    conditional_timestamp_fields = ('updated_at', 'categories__updated_at')
+    conditional_cache_namespace = 'blog'
+
+    def get_conditional_queryset(self):
+        return Blog.objects.published().filter(tags__slug=self.kwargs['slug'])
     
     @action(detail=True, methods=['get'])
+    @cache_response('blog')
     def blogs(self, request, slug=None):
         """Belirli bir etiketteki blogları listeler"""
         tag = self.get_object()
-        blogs = Blog.objects.filter(
-            tags=tag, 
-            status='published'
-        ).order_by('-published_at')
+        blogs = Blog.objects.published().with_listing_data().filter(tags=tag).order_by('-published_at')
         
         page = self.paginate_queryset(blogs)
         if page is not None:
@@ -76,9 +121,9 @@ class BlogTagViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class BlogViewSet(viewsets.ReadOnlyModelViewSet):
+class BlogViewSet(SparseFieldsetsViewMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """Blog yazılarını listeler ve detay görüntüler"""
-    queryset = Blog.objects.filter(status='published').order_by('-published_at')
+    queryset = Blog.objects.published().order_by('-published_at')
     permission_classes = [AllowAny]
     lookup_field = 'slug'
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -86,37 +131,59 @@ class BlogViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['title', 'excerpt', 'content']
     ordering_fields = ['published_at', 'view_count', 'title']
     pagination_class = BlogPagination
+    # Detay her görüntülemede view_count'u artırdığı için koşullu yanıt dışında tutulur
+    conditional_list_actions = ('list', 'featured', 'single_featured', 'archive')
+    conditional_object_actions = ()
+    conditional_timestamp_fields = ('updated_at', 'categories__updated_at')
+    conditional_cache_namespace = 'blog'
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return BlogDetailSerializer
         return BlogListSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            return queryset.with_detail_data()
+        # Liste kartları okuma süresini ve özeti saklanan alanlardan okur; içerik yüklenmez
+        return queryset.with_listing_data()
+
+    def get_conditional_queryset(self):
+        if self.action in ('featured', 'single_featured'):
+            return self.get_queryset().filter(is_featured=True)
+        if self.action == 'archive':
+            return self.get_queryset()
+        return super().get_conditional_queryset()
+
+    @cache_response('blog')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     def retrieve(self, request, *args, **kwargs):
         """Blog detayı görüntülendiğinde görüntülenme sayısını artırır"""
         instance = self.get_object()
-        instance.increment_view_count()
+        instance.increment_view_count(request)
         serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        data = serializer.data
+        if 'view_count' in data:
+            data['view_count'] = instance.get_live_view_count()
+        return Response(data)
     
     @action(detail=False, methods=['get'])
+    @cache_response('blog')
     def featured(self, request):
         """Öne çıkan blog yazılarını listeler"""
-        blogs = Blog.objects.filter(
-            status='published', 
-            is_featured=True
-        ).order_by('-published_at')[:5]
+        blogs = Blog.objects.published().with_listing_data().filter(is_featured=True).order_by('-published_at')[:5]
         
         serializer = BlogListSerializer(blogs, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response('blog')
     def single_featured(self, request):
         """Sadece tek bir öne çıkan blog yazısı getirir"""
-        blog = Blog.objects.filter(
-            status='published', 
-            is_featured=True
-        ).order_by('-published_at').first()
+        blog = Blog.objects.published().with_listing_data().filter(is_featured=True).order_by('-published_at').first()
         
         if not blog:
             return Response({"detail": "Öne çıkan yazı bulunamadı"}, status=status.HTTP_404_NOT_FOUND)
@@ -125,23 +192,22 @@ class BlogViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    # Görüntülenmeler önbelleği geçersiz kılmaz; sıralama her sayaç yazımından sonra kısa sürede yenilenir
+    @cache_response('blog', timeout=POPULAR_CACHE_TIMEOUT)
     def popular(self, request):
         """En çok okunan blog yazılarını listeler"""
-        blogs = Blog.objects.filter(
-            status='published'
-        ).order_by('-view_count')[:5]
+        blogs = Blog.objects.published().with_listing_data().order_by('-view_count')[:5]
         
         serializer = BlogListSerializer(blogs, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response('blog')
     def archive(self, request):
         """Blog arşivini ay/yıl bazında getirir"""
         from django.db.models.functions import TruncMonth
         
-        archive = Blog.objects.filter(
-            status='published'
-        ).annotate(
+        archive = Blog.objects.published().annotate(
             month=TruncMonth('published_at')
         ).values('month').annotate(
             count=Count('id')
@@ -151,14 +217,20 @@ class BlogViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 # Admin Panelde Kullanılabilecek Ek API'ler (İhtiyaç halinde)
-class AdminBlogViewSet(viewsets.ModelViewSet):
+class AdminBlogViewSet(SparseFieldsetsViewMixin, viewsets.ModelViewSet):
     """Admin kullanıcıları için tam yetkili blog yönetimi"""
     queryset = Blog.objects.all()
     permission_classes = [IsAuthenticated, IsAdminUser]
     lookup_field = 'slug'
-    pagination_class = BlogPagination
+    pagination_class = AdminBlogPagination
     
     def get_serializer_class(self):
         if self.action in ['retrieve', 'update', 'partial_update', 'create']:
             return BlogDetailSerializer
         return BlogListSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return queryset.with_listing_data()
+        return queryset.with_detail_data()
@@ -0,0 +1,21 @@
+from django.contrib import admin
+from .models import Cart, CartItem
+
+class CartItemInline(admin.TabularInline):
+    # Sepet toplamı artımlı tutulduğu için kalemler yalnızca API üzerinden değiştirilir
+    model = CartItem
+    fields = ['product', 'quantity', 'unit_price']
+    readonly_fields = ['product', 'quantity', 'unit_price']
+    can_delete = False
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'item_count', 'total', 'updated_at']
+    search_fields = ['user__username', 'user__email']
+    raw_id_fields = ['user']
+    readonly_fields = ['total', 'item_count']
+    inlines = [CartItemInline]
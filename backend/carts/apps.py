@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class CartsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "carts"
+
+    def ready(self):
+        # Sinyalleri yükle
+        import carts.signals
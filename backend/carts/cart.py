@@ -0,0 +1,321 @@
+"""
+Sunucu tarafı alışveriş sepeti.
+
+  - Giriş yapmış kullanıcıların sepeti veritabanında (Cart / CartItem) tutulur.
+  - Misafir sepetleri Redis önbelleğinde, X-Cart-Token başlığıyla gelen anahtar
+    altında CART_GUEST_TTL_DAYS gün saklanır.
+  - Giriş yapıldığında misafir sepeti kullanıcının sepetine aktarılır (merge_guest_cart).
+
+Her kalem eklendiği andaki indirimli birim fiyatı saklar. Sepet toplamı satır
+değiştiğinde yalnızca o satırın farkı kadar güncellenir; ürün fiyatları
+değiştiğinde (products.models.prices_changed) veritabanında yalnızca ilgili
+kalemler ve sepetler yeniden fiyatlanır. Misafir sepetleri taranamadığı için fiyat
+sürümü artırılır ve her sepet bir sonraki okumada kendi ürünlerini tek sorguda
+yeniden fiyatlar. Checkout ve kupon doğrulaması böylece hazır toplamı okur.
+"""
+import re
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.models import Product
+from .models import Cart, CartItem
+
+CART_TOKEN_HEADER = 'X-Cart-Token'
+CART_TOKEN_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+PRICE_VERSION_KEY = 'cart:price-version'
+
+ZERO = Decimal('0.00')
+
+
+def current_price_subquery(product_ref='product_id'):
+    """Ürünün güncel indirimli fiyatı (henüz hesaplanmadıysa liste fiyatı)"""
+    return Subquery(
+        Product.objects.filter(pk=OuterRef(product_ref))
+        .annotate(effective_price=Coalesce('current_price', 'price'))
+        .values('effective_price')[:1]
+    )
+
+
+class DatabaseCart:
+    """Giriş yapmış kullanıcının veritabanındaki sepeti"""
+
+    token = None
+
+    def __init__(self, cart):
+        self.cart = cart
+
+    @classmethod
+    def for_user(cls, user, create=True):
+        if create:
+            return cls(Cart.objects.get_or_create(user=user)[0])
+        cart = Cart.objects.filter(user=user).first()
+        return cls(cart) if cart else None
+
+    @property
+    def total(self):
+        return self.cart.total
+
+    @property
+    def item_count(self):
+        return self.cart.item_count
+
+    def get_lines(self):
+        """{ürün id: (adet, birim fiyat)}"""
+        return OrderedDict(
+            (product_id, (quantity, unit_price))
+            for product_id, quantity, unit_price in self.cart.items.values_list('product_id', 'quantity', 'unit_price')
+        )
+
+    def update(self, quantities, replace=False):
+        """
+        {ürün: adet} satırlarını sepete ekler (replace=True ise adetleri değiştirir;
+        adet 0 olan satır silinir). Toplam yalnızca değişen satırların farkı kadar güncellenir.
+        """
+        with transaction.atomic():
+            # Aynı sepete eşzamanlı yazmalar sırayla işlenir
+            cart = Cart.objects.select_for_update().get(pk=self.cart.pk)
+            existing = {
+                item.product_id: item
+                for item in CartItem.objects.filter(cart=cart, product__in=list(quantities))
+            }
+
+            total_delta, count_delta = ZERO, 0
+            to_create, to_update, to_delete = [], [], []
+            for product, quantity in quantities.items():
+                item = existing.get(product.pk)
+                old_quantity = item.quantity if item else 0
+                old_total = item.line_total if item else ZERO
+                new_quantity = quantity if replace else old_quantity + quantity
+                unit_price = product.get_current_price()
+
+                if new_quantity <= 0:
+                    if item:
+                        to_delete.append(item.pk)
+                    new_quantity, new_total = 0, ZERO
+                elif item:
+                    item.quantity, item.unit_price = new_quantity, unit_price
+                    to_update.append(item)
+                    new_total = item.line_total
+                else:
+                    item = CartItem(cart=cart, product=product, quantity=new_quantity, unit_price=unit_price)
+                    to_create.append(item)
+                    new_total = item.line_total
+
+                total_delta += new_total - old_total
+                count_delta += new_quantity - old_quantity
+
+            if to_delete:
+                CartItem.objects.filter(pk__in=to_delete).delete()
+            if to_update:
+                now = timezone.now()
+                for item in to_update:
+                    item.updated_at = now
+                CartItem.objects.bulk_update(to_update, ['quantity', 'unit_price', 'updated_at'])
+            if to_create:
+                CartItem.objects.bulk_create(to_create)
+
+            cart.total += total_delta
+            cart.item_count += count_delta
+            cart.save(update_fields=['total', 'item_count', 'updated_at'])
+        self.cart = cart
+
+    def add(self, product, quantity):
+        self.update({product: quantity})
+
+    def set_quantity(self, product, quantity):
+        self.update({product: quantity}, replace=True)
+
+    def remove(self, product):
+        self.update({product: 0}, replace=True)
+
+    def clear(self):
+        with transaction.atomic():
+            CartItem.objects.filter(cart=self.cart).delete()
+            Cart.objects.filter(pk=self.cart.pk).update(total=ZERO, item_count=0, updated_at=timezone.now())
+        self.cart.total, self.cart.item_count = ZERO, 0
+
+
+class GuestCart:
+    """Misafir kullanıcının Redis'teki sepeti"""
+
+    def __init__(self, token, data=None):
+        self.token = token
+        data = data or {}
+        # [[ürün id, adet, birim fiyat], ...] eklenme sırasıyla
+        self.items = OrderedDict((product_id, [quantity, unit_price]) for product_id, quantity, unit_price in data.get('items', []))
+        self.total = data.get('total', ZERO)
+        self.version = data.get('version')
+
+    @staticmethod
+    def _key(token):
+        return f'cart:guest:{token}'
+
+    @classmethod
+    def new(cls):
+        return cls(uuid.uuid4().hex)
+
+    @classmethod
+    def load(cls, token):
+        """Sepeti yükler; fiyatlar sepet kaydedildikten sonra değiştiyse yeniden fiyatlar"""
+        if not token or not CART_TOKEN_PATTERN.match(token):
+            return None
+        data = cache.get(cls._key(token))
+        if data is None:
+            return None
+        guest_cart = cls(token, data)
+        if guest_cart.items and guest_cart.version != get_price_version():
+            guest_cart.reprice()
+        return guest_cart
+
+    @property
+    def item_count(self):
+        return sum(quantity for quantity, _ in self.items.values())
+
+    def get_lines(self):
+        return OrderedDict((product_id, (quantity, unit_price)) for product_id, (quantity, unit_price) in self.items.items())
+
+    def reprice(self):
+        prices = dict(
+            Product.objects.filter(pk__in=list(self.items))
+            .annotate(effective_price=Coalesce('current_price', 'price'))
+            .values_list('pk', 'effective_price')
+        )
+        # Silinen ürünler sepetten çıkarılır
+        self.items = OrderedDict(
+            (product_id, [quantity, prices[product_id]])
+            for product_id, (quantity, _) in self.items.items() if product_id in prices
+        )
+        self.total = sum((quantity * unit_price for quantity, unit_price in self.items.values()), ZERO)
+        self.save()
+
+    def save(self):
+        self.version = get_price_version()
+        data = {
+            'items': [[product_id, quantity, unit_price] for product_id, (quantity, unit_price) in self.items.items()],
+            'total': self.total,
+            'version': self.version,
+        }
+        cache.set(self._key(self.token), data, settings.CART_GUEST_TTL_DAYS * 24 * 60 * 60)
+
+    def update(self, quantities, replace=False):
+        for product, quantity in quantities.items():
+            old_quantity, old_price = self.items.get(product.pk, [0, ZERO])
+            new_quantity = quantity if replace else old_quantity + quantity
+            unit_price = product.get_current_price()
+            self.total -= old_quantity * old_price
+            if new_quantity <= 0:
+                self.items.pop(product.pk, None)
+            else:
+                self.items[product.pk] = [new_quantity, unit_price]
+                self.total += new_quantity * unit_price
+        self.save()
+
+    def add(self, product, quantity):
+        self.update({product: quantity})
+
+    def set_quantity(self, product, quantity):
+        self.update({product: quantity}, replace=True)
+
+    def remove(self, product):
+        self.update({product: 0}, replace=True)
+
+    def clear(self):
+        cache.delete(self._key(self.token))
+        self.items, self.total = OrderedDict(), ZERO
+
+
+def get_price_version():
+    version = cache.get(PRICE_VERSION_KEY)
+    if version is None:
+        cache.add(PRICE_VERSION_KEY, 0, timeout=None)
+        version = cache.get(PRICE_VERSION_KEY)
+    return version
+
+
+def bump_price_version():
+    try:
+        cache.incr(PRICE_VERSION_KEY)
+    except ValueError:
+        cache.add(PRICE_VERSION_KEY, 1, timeout=None)
+
+
+def get_request_cart(request, create=True):
+    """
+    İsteğin sepetini döndürür: kullanıcı giriş yapmışsa veritabanı sepeti, değilse
+    X-Cart-Token başlığındaki misafir sepeti. create=False iken sepet yoksa None döner.
+    """
+    if request.user and request.user.is_authenticated:
+        return DatabaseCart.for_user(request.user, create=create)
+    guest_cart = GuestCart.load(request.headers.get(CART_TOKEN_HEADER))
+    if guest_cart is None and create:
+        guest_cart = GuestCart.new()
+    return guest_cart
+
+
+def get_cart_total(request, fallback='0'):
+    """
+    Kupon doğrulaması için sepet toplamı: sunucudaki sepet doluysa onun toplamı,
+    değilse (sepeti sunucuya taşımamış istemciler için) istemcinin gönderdiği tutar.
+    """
+    cart = get_request_cart(request, create=False)
+    if cart is not None and cart.item_count:
+        return cart.total
+    return Decimal(str(fallback))
+
+
+def merge_guest_cart(user, token):
+    """Misafir sepetindeki ürünleri kullanıcının sepetine ekler ve misafir sepetini siler"""
+    guest_cart = GuestCart.load(token)
+    if guest_cart is None or not guest_cart.items:
+        return None
+    products = Product.objects.in_bulk(list(guest_cart.items))
+    cart = DatabaseCart.for_user(user)
+    cart.update({
+        products[product_id]: quantity
+        for product_id, (quantity, _) in guest_cart.items.items() if product_id in products
+    })
+    guest_cart.clear()
+    return cart
+
+
+def reprice_carts(product_ids):
+    """
+    Fiyatı değişen ürünleri içeren veritabanı sepetlerinde birim fiyatları ve
+    toplamları günceller; misafir sepetleri için fiyat sürümünü artırır.
+    Güncellenen sepet sayısını döndürür.
+    """
+    transaction.on_commit(bump_price_version)
+
+    current_price = current_price_subquery()
+    stale_items = CartItem.objects.filter(product_id__in=product_ids).annotate(
+        current_price=current_price
+    ).exclude(unit_price=F('current_price'))
+    cart_ids = list(stale_items.values_list('cart_id', flat=True).distinct())
+    if not cart_ids:
+        return 0
+
+    with transaction.atomic():
+        CartItem.objects.filter(product_id__in=product_ids, cart_id__in=cart_ids).update(
+            unit_price=current_price, updated_at=timezone.now(),
+        )
+        recalculate_carts(cart_ids)
+    return len(cart_ids)
+
+
+def recalculate_carts(cart_ids):
+    """Sepetlerin toplamını ve adedini kalemlerinden tek sorguda yeniden hesaplar"""
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    line_total = ExpressionWrapper(F('unit_price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2))
+    Cart.objects.filter(pk__in=cart_ids).update(
+        total=Coalesce(Subquery(items.annotate(total=Sum(line_total)).values('total')), Value(ZERO)),
+        item_count=Coalesce(Subquery(items.annotate(count=Sum('quantity')).values('count')), Value(0)),
+        updated_at=timezone.now(),
+    )
@@ -0,0 +1,45 @@
+from django.db import models
+from django.contrib.auth.models import User
+from products.models import Product
+
+
+class Cart(models.Model):
+    """
+    Giriş yapmış kullanıcının sepeti. total, kalemlerin saklanan birim fiyatlarıyla
+    hesaplanmış toplamdır; satır değişikliklerinde ve ürün fiyatı değiştiğinde
+    artımlı olarak güncellenir (bkz. carts.cart).
+    """
+    user = models.OneToOneField(User, related_name='cart', on_delete=models.CASCADE)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)  # toplam adet
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Sepetler'
+
+    def __str__(self):
+        return f"Sepet - {self.user.username}"
+
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='cart_items', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)  # son hesaplanan indirimli fiyat
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Sepet Ürünleri'
+        ordering = ('id',)
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='cart_item_unique_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} - Sepet {self.cart_id}"
+
+    @property
+    def line_total(self):
+        return self.unit_price * self.quantity
@@ -0,0 +1,42 @@
+from rest_framework import serializers
+from products.models import Product
+
+
+class CartItemInputSerializer(serializers.Serializer):
+    product_id = serializers.PrimaryKeyRelatedField(
+        queryset=Product.objects.filter(available=True), source='product',
+        error_messages={'does_not_exist': 'Ürün bulunamadı.'},
+    )
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class CartQuantitySerializer(serializers.Serializer):
+    # 0 verilirse ürün sepetten çıkarılır
+    quantity = serializers.IntegerField(min_value=0)
+
+
+class CartLineSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(source='product.id')
+    name = serializers.CharField(source='product.name')
+    slug = serializers.CharField(source='product.slug')
+    img_url = serializers.CharField(source='product.img_url', allow_null=True)
+    is_in_stock = serializers.BooleanField(source='product.is_in_stock')
+    quantity = serializers.IntegerField()
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    line_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class CartSerializer(serializers.Serializer):
+    """carts.cart.DatabaseCart / GuestCart nesnesini serileştirir"""
+    token = serializers.CharField(allow_null=True)
+    items = serializers.SerializerMethodField()
+    item_count = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+    def get_items(self, cart):
+        lines = cart.get_lines()
+        products = Product.objects.only('id', 'name', 'slug', 'img_url', 'stock').in_bulk(list(lines))
+        return CartLineSerializer([
+            {'product': products[product_id], 'quantity': quantity, 'unit_price': unit_price, 'line_total': quantity * unit_price}
+            for product_id, (quantity, unit_price) in lines.items() if product_id in products
+        ], many=True).data
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from products.models import Product, prices_changed
+from .cart import bump_price_version, recalculate_carts, reprice_carts
+from .models import CartItem
+
+
+@receiver(prices_changed)
+def handle_prices_changed(sender, product_ids, **kwargs):
+    """İndirimli fiyatı değişen ürünleri içeren sepetleri yeniden fiyatlar"""
+    reprice_carts(product_ids)
+
+
+@receiver(pre_delete, sender=Product)
+def remember_product_carts(sender, instance, **kwargs):
+    # Kalemler ürünle birlikte silineceği için etkilenen sepetler önceden bulunur
+    instance._cart_ids = list(CartItem.objects.filter(product=instance).values_list('cart_id', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def handle_product_deleted(sender, instance, **kwargs):
+    """Silinen ürünü içeren sepetlerin toplamlarını yeniden hesaplar"""
+    # Misafir sepetleri bir sonraki okumada silinen ürünü çıkarır
+    transaction.on_commit(bump_price_version)
+    cart_ids = getattr(instance, '_cart_ids', None)
+    if cart_ids:
+        recalculate_carts(cart_ids)
@@ -0,0 +1,140 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from coupons.models import Coupon
+from orders.models import Order
+from products.models import Category, Discount, Product
+from .cart import CART_TOKEN_HEADER, DatabaseCart, GuestCart
+from .models import Cart
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'carts-tests'}}
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CartTests(TestCase):
+    """Sunucu tarafı sepet ve artımlı toplam"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='musteri', email='musteri@example.com', password='sifre12345')
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.cheese = Product.objects.create(category=category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('200.00'), stock=10)
+        self.butter = Product.objects.create(category=category, name='Tereyağı', slug='tereyagi', price=Decimal('50.00'), stock=10)
+
+    def add(self, product, quantity=1, token=None):
+        headers = {'HTTP_X_CART_TOKEN': token} if token else {}
+        return self.client.post('/api/cart/items/', {'product_id': product.pk, 'quantity': quantity}, format='json', **headers)
+
+    def assert_total_matches_lines(self, cart):
+        lines = cart.get_lines()
+        self.assertEqual(cart.total, sum((quantity * price for quantity, price in lines.values()), Decimal('0')))
+        self.assertEqual(cart.item_count, sum(quantity for quantity, _ in lines.values()))
+
+    def test_user_cart_total_is_incremental(self):
+        self.client.force_authenticate(self.user)
+        self.add(self.cheese, 2)
+        response = self.add(self.butter)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total'], '450.00')
+        self.assertEqual(response.data['item_count'], 3)
+
+        response = self.client.patch(f'/api/cart/items/{self.cheese.pk}/', {'quantity': 1}, format='json')
+        self.assertEqual(response.data['total'], '250.00')
+        response = self.client.delete(f'/api/cart/items/{self.butter.pk}/')
+        self.assertEqual(response.data['total'], '200.00')
+        self.assertEqual([item['product_id'] for item in response.data['items']], [self.cheese.pk])
+        self.assert_total_matches_lines(DatabaseCart.for_user(self.user))
+
+    def test_guest_cart_uses_token(self):
+        response = self.add(self.cheese, 2)
+        token = response[CART_TOKEN_HEADER]
+        self.assertEqual(response.data['token'], token)
+        response = self.add(self.butter, 1, token=token)
+        self.assertEqual(response.data['total'], '450.00')
+        self.assertFalse(Cart.objects.exists())
+
+        # Başka bir anahtarla gelen istek ayrı sepet görür
+        response = self.client.get('/api/cart/', HTTP_X_CART_TOKEN='0' * 32)
+        self.assertEqual(response.data['items'], [])
+
+    def test_discount_reprices_user_and_guest_carts(self):
+        self.client.force_authenticate(self.user)
+        self.add(self.cheese, 2)
+        self.client.force_authenticate(None)
+        token = self.add(self.cheese, 1)[CART_TOKEN_HEADER]
+
+        today = timezone.now().date()
+        # Misafir sepetlerinin fiyat sürümü işlem commit edildikten sonra artırılır
+        with self.captureOnCommitCallbacks(execute=True):
+            Discount.objects.create(
+                product=self.cheese, discount_percentage=Decimal('25.00'),
+                start_date=today - timedelta(days=1), end_date=today + timedelta(days=1),
+            )
+        cart = DatabaseCart.for_user(self.user)
+        self.assertEqual(cart.total, Decimal('300.00'))
+        self.assert_total_matches_lines(cart)
+        self.assertEqual(GuestCart.load(token).total, Decimal('150.00'))
+
+        self.butter.price = Decimal('40.00')
+        self.butter.save()
+        self.assertEqual(DatabaseCart.for_user(self.user).total, Decimal('300.00'))
+
+    def test_deleted_product_leaves_cart(self):
+        self.client.force_authenticate(self.user)
+        self.add(self.cheese, 1)
+        self.add(self.butter, 2)
+        self.butter.delete()
+        cart = DatabaseCart.for_user(self.user)
+        self.assertEqual((cart.total, cart.item_count), (Decimal('200.00'), 1))
+
+    def test_login_merges_guest_cart(self):
+        self.client.force_authenticate(self.user)
+        self.add(self.cheese, 1)
+        self.client.force_authenticate(None)
+        token = self.add(self.cheese, 2)[CART_TOKEN_HEADER]
+        self.add(self.butter, 1, token=token)
+
+        response = self.client.post(
+            '/api/login/', {'email': 'musteri@example.com', 'password': 'sifre12345'},
+            format='json', HTTP_X_CART_TOKEN=token,
+        )
+        self.assertEqual(response.status_code, 200)
+        cart = DatabaseCart.for_user(self.user)
+        self.assertEqual(dict((pid, qty) for pid, (qty, _) in cart.get_lines().items()), {self.cheese.pk: 3, self.butter.pk: 1})
+        self.assertEqual(cart.total, Decimal('650.00'))
+        self.assertIsNone(GuestCart.load(token))
+
+    def test_checkout_from_cart(self):
+        token = self.add(self.cheese, 2)[CART_TOKEN_HEADER]
+        response = self.client.post('/api/orders/', {
+            'guest_info': {
+                'full_name': 'Ayşe Yılmaz', 'email': 'ayse@example.com', 'phone': '5550000000',
+                'address': 'Adres', 'city': 'İstanbul', 'district': 'Kadıköy',
+            },
+        }, format='json', HTTP_X_CART_TOKEN=token)
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual(order.total_price, Decimal('400.00'))
+        self.assertEqual(list(order.items.values_list('product_id', 'quantity')), [(self.cheese.pk, 2)])
+        self.assertIsNone(GuestCart.load(token))
+
+    def test_coupon_uses_cart_total(self):
+        Coupon.objects.create(
+            code='YAZ10', discount_type='percentage', discount_value=Decimal('10.00'), max_usage=5,
+            valid_from=timezone.now() - timedelta(days=1), valid_to=timezone.now() + timedelta(days=1),
+        )
+        token = self.add(self.cheese, 2)[CART_TOKEN_HEADER]
+        # İstemcinin gönderdiği tutar yerine sunucudaki sepet toplamı kullanılır
+        response = self.client.post(
+            '/api/coupons/apply/', {'code': 'YAZ10', 'cart_total': '100000'},
+            format='json', HTTP_X_CART_TOKEN=token,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['discount_amount'], 40.0)
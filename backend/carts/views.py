@@ -0,0 +1,63 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from products.models import Product
+from .cart import CART_TOKEN_HEADER, get_request_cart
+from .serializers import CartItemInputSerializer, CartQuantitySerializer, CartSerializer
+
+
+class CartMixin:
+    permission_classes = [permissions.AllowAny]
+    # Sepet API'si için istek sınırlandırması
+    throttle_scope = 'cart_api'
+
+    def cart_response(self, cart, status_code=status.HTTP_200_OK):
+        response = Response(CartSerializer(cart).data, status=status_code)
+        if cart.token:
+            # Misafir sepetinin anahtarı; istemci sonraki isteklerde bu başlıkla gönderir
+            response[CART_TOKEN_HEADER] = cart.token
+        return response
+
+
+class CartView(CartMixin, APIView):
+    """Sepeti görüntüler veya boşaltır"""
+
+    def get(self, request):
+        return self.cart_response(get_request_cart(request))
+
+    def delete(self, request):
+        cart = get_request_cart(request)
+        cart.clear()
+        return self.cart_response(cart)
+
+
+class CartItemsView(CartMixin, APIView):
+    """Sepete ürün ekler (ürün zaten varsa adedi artırılır)"""
+
+    def post(self, request):
+        serializer = CartItemInputSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        cart = get_request_cart(request)
+        cart.add(serializer.validated_data['product'], serializer.validated_data['quantity'])
+        return self.cart_response(cart, status.HTTP_201_CREATED)
+
+
+class CartItemView(CartMixin, APIView):
+    """Sepetteki ürünün adedini değiştirir veya ürünü çıkarır"""
+
+    def patch(self, request, product_id):
+        serializer = CartQuantitySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        product = get_object_or_404(Product, pk=product_id)
+        cart = get_request_cart(request)
+        cart.set_quantity(product, serializer.validated_data['quantity'])
+        return self.cart_response(cart)
+
+    def delete(self, request, product_id):
+        product = get_object_or_404(Product, pk=product_id)
+        cart = get_request_cart(request)
+        cart.remove(product)
+        return self.cart_response(cart)
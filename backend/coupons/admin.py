@@ -1,5 +1,18 @@
 from django.contrib import admin
-from .models import Coupon
+from .models import Coupon, CouponRedemption
+
+
+class CouponRedemptionInline(admin.TabularInline):
+    # Kullanımlar sipariş ve iptal akışında oluşturulur; sayaç tutarlı kalsın diye elle değiştirilmez
+    model = CouponRedemption
+    fields = ['order', 'user', 'email', 'created_at', 'released_at']
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Coupon)
 class CouponAdmin(admin.ModelAdmin):
@@ -8,11 +21,12 @@ class CouponAdmin(admin.ModelAdmin):
     search_fields = ['code', 'description']
     list_editable = ['active']
     readonly_fields = ['usage_count', 'is_valid']
+    inlines = [CouponRedemptionInline]
     fieldsets = (
         ('Kupon Bilgileri', {
             'fields': ('code', 'description', 'discount_type', 'discount_value', 'min_purchase_amount')
         }),
         ('Geçerlilik', {
-            'fields': ('valid_from', 'valid_to', 'active', 'max_usage', 'usage_count')
+            'fields': ('valid_from', 'valid_to', 'active', 'max_usage', 'max_usage_per_user', 'usage_count')
         }),
     )
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.functions
+import django.db.models.deletion
+
+
+def backfill_redemptions(apps, schema_editor):
+    # Mevcut kuponlu siparişler için kullanım kayıtları; iptal edilenler iade edilmiş sayılır
+    Order = apps.get_model('orders', 'Order')
+    CouponRedemption = apps.get_model('coupons', 'CouponRedemption')
+
+    redemptions = []
+    orders = Order.objects.filter(coupon__isnull=False).values_list('pk', 'coupon_id', 'user_id', 'email', 'status', 'updated_at')
+    for order_id, coupon_id, user_id, email, status, updated_at in orders.iterator(chunk_size=2000):
+        redemptions.append(CouponRedemption(
+            order_id=order_id, coupon_id=coupon_id, user_id=user_id, email=(email or '').lower(),
+            released_at=updated_at if status == 'cancelled' else None,
+        ))
+        if len(redemptions) >= 2000:
+            CouponRedemption.objects.bulk_create(redemptions)
+            redemptions = []
+    CouponRedemption.objects.bulk_create(redemptions)
+
+    # Sayaç aktif kullanım sayısına eşitlenir (önceden iptaller iade edilmiyor,
+    # aynı siparişe tekrar uygulanan kupon iki kez sayılıyordu)
+    Coupon = apps.get_model('coupons', 'Coupon')
+    active = CouponRedemption.objects.filter(coupon=models.OuterRef('pk'), released_at__isnull=True).order_by().values('coupon')
+    Coupon.objects.update(usage_count=models.functions.Coalesce(
+        models.Subquery(active.annotate(count=models.Count('pk')).values('count')), 0,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_checkoutrequest'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('coupons', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coupon',
+            name='max_usage_per_user',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='CouponRedemption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('released_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('coupon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='redemptions', to='coupons.coupon')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='coupon_redemption', to='orders.order')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='coupon_redemptions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Kupon Kullanımları',
+                'indexes': [models.Index(condition=models.Q(('released_at__isnull', True)), fields=['coupon', 'user'], name='redemption_active_user_idx'), models.Index(condition=models.Q(('released_at__isnull', True)), fields=['coupon', 'email'], name='redemption_active_email_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_redemptions, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.auth.models import User
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -14,6 +15,8 @@ class Coupon(models.Model):
     valid_to = models.DateTimeField()
     active = models.BooleanField(default=True)
     max_usage = models.PositiveIntegerField(default=1)
+    # Kullanıcı (veya misafir e-postası) başına en fazla kullanım; boşsa sınır yok
+    max_usage_per_user = models.PositiveIntegerField(blank=True, null=True)
     usage_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -29,3 +32,28 @@ class Coupon(models.Model):
         from django.utils import timezone
         now = timezone.now()
         return self.active and self.valid_from <= now <= self.valid_to and self.usage_count < self.max_usage
+
+
+class CouponRedemption(models.Model):
+    """
+    Kupon kullanım kaydı; her sipariş en fazla bir kupon kullanabilir. Kuponun
+    usage_count alanı aktif (iade edilmemiş) kayıtların sayısıdır.
+    Bkz. coupons.redemptions
+    """
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, related_name='redemptions')
+    order = models.OneToOneField('orders.Order', on_delete=models.CASCADE, related_name='coupon_redemption')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='coupon_redemptions')
+    email = models.EmailField()  # küçük harfe çevrilmiş; misafir siparişlerinde kullanıcı sınırı için
+    released_at = models.DateTimeField(null=True, blank=True)  # sipariş iptal edildiğinde
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'Kupon Kullanımları'
+        indexes = [
+            # Kullanıcı başına sınır yalnızca aktif kayıtları sayar
+            models.Index(fields=['coupon', 'user'], condition=models.Q(released_at__isnull=True), name='redemption_active_user_idx'),
+            models.Index(fields=['coupon', 'email'], condition=models.Q(released_at__isnull=True), name='redemption_active_email_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.coupon.code} - Sipariş {self.order_id}"
@@ -0,0 +1,129 @@
+"""
+Kupon kullanımı (CouponRedemption).
+
+Kuponun geçerliliği okunup usage_count Python'da artırılırsa eşzamanlı siparişler
+max_usage sınırını aşar. Bunun yerine kullanım tek bir koşullu UPDATE ile alınır:
+
+    UPDATE coupons_coupon SET usage_count = usage_count + 1
+     WHERE id = 3 AND active AND valid_from <= now() AND valid_to >= now()
+       AND usage_count < max_usage
+
+Güncellenen satır yoksa kupon tükenmiştir. UPDATE kupon satırını transaction
+sonuna kadar kilitlediği için aynı kupona gelen diğer istekler sırayla işlenir;
+kullanıcı başına sınır da bu kilit altında sayılır. Her sipariş için tek bir
+kullanım kaydı tutulur: aynı siparişe kupon tekrar uygulandığında sayaç ikinci
+kez artmaz, sipariş iptal edildiğinde release_coupon kullanımı iade eder.
+
+Kupon doğrulama ön izlemesi (coupons.services) kullanım sayısını her istekte
+veritabanından okumamak için önbellekteki sayaçtan okur (get_usage_count). Sayaç
+her kullanım/iade commit edildikten sonra atomik olarak artırılır/azaltılır ve kısa
+süre sonra veritabanından yeniden yüklenir; kesin sınır her zaman yukarıdaki
+UPDATE'tir.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Coupon, CouponRedemption
+
+
+class CouponUnavailable(Exception):
+    """Kupon kullanım sınırına ulaşıldıysa veya kupon artık geçerli değilse fırlatılır"""
+
+
+# Önbellekteki kullanım sayacının veritabanından yeniden yüklenme süresi (saniye)
+USAGE_COUNTER_TIMEOUT = 60
+
+
+def _usage_counter_key(coupon_id):
+    return f'coupon:usage:{coupon_id}'
+
+
+def get_usage_count(coupon_id):
+    """Kuponun (yaklaşık) güncel kullanım sayısı"""
+    key = _usage_counter_key(coupon_id)
+    count = cache.get(key)
+    if count is None:
+        count = Coupon.objects.filter(pk=coupon_id).values_list('usage_count', flat=True).first() or 0
+        cache.add(key, count, USAGE_COUNTER_TIMEOUT)
+    return count
+
+
+def _adjust_usage_counter(coupon_id, delta):
+    def adjust():
+        try:
+            cache.incr(_usage_counter_key(coupon_id), delta)
+        except ValueError:
+            # Sayaç yoksa bir sonraki okumada veritabanından yüklenir
+            pass
+    transaction.on_commit(adjust)
+
+
+def get_active_redemptions(coupon_id, user=None, email=None):
+    """Kullanıcının (veya misafir e-postasının) kupondaki aktif kullanımları"""
+    owner = Q(email=(email or '').lower())
+    if user is not None:
+        owner |= Q(user=user)
+    return CouponRedemption.objects.filter(owner, coupon_id=coupon_id, released_at__isnull=True)
+
+
+def has_reached_user_limit(coupon_id, limit, user=None, email=None, exclude_order=None):
+    if not limit:
+        return False
+    redemptions = get_active_redemptions(coupon_id, user, email)
+    if exclude_order is not None:
+        redemptions = redemptions.exclude(order=exclude_order)
+    return redemptions.count() >= limit
+
+
+def _return_usage(coupon_id):
+    if Coupon.objects.filter(pk=coupon_id, usage_count__gt=0).update(usage_count=F('usage_count') - 1):
+        _adjust_usage_counter(coupon_id, -1)
+
+
+def claim_coupon(coupon, order):
+    """
+    Kuponu sipariş için kullanır ve kullanım kaydını döndürür. Sipariş bu kuponu
+    zaten kullanıyorsa hiçbir şey değişmez; başka bir kupon kullanıyorsa eski
+    kuponun kullanımı iade edilir. Kupon alınamazsa CouponUnavailable fırlatılır.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        redemption = CouponRedemption.objects.select_for_update().filter(order=order).first()
+        if redemption is not None and redemption.coupon_id == coupon.pk and redemption.released_at is None:
+            return redemption
+
+        claimed = Coupon.objects.filter(
+            pk=coupon.pk, active=True, valid_from__lte=now, valid_to__gte=now, usage_count__lt=F('max_usage'),
+        ).update(usage_count=F('usage_count') + 1)
+        if not claimed:
+            raise CouponUnavailable('Kupon geçerli değil veya kullanım sınırına ulaşmış.')
+        # Kupon satırı artık kilitli; aynı kullanıcının eşzamanlı siparişleri burada sırayla sayılır
+        if has_reached_user_limit(coupon.pk, coupon.max_usage_per_user, order.user, order.email, exclude_order=order):
+            # Savepoint geri alınır, yukarıdaki artış da iptal olur
+            raise CouponUnavailable('Bu kuponu kullanım hakkınız dolmuş.')
+
+        if redemption is None:
+            redemption = CouponRedemption(order=order)
+        elif redemption.released_at is None:
+            _return_usage(redemption.coupon_id)
+        redemption.coupon = coupon
+        redemption.user = order.user
+        redemption.email = order.email.lower()
+        redemption.released_at = None
+        redemption.save()
+        _adjust_usage_counter(coupon.pk, 1)
+    return redemption
+
+
+def release_coupon(order):
+    """Siparişin kupon kullanımını iade eder (sipariş iptalinde)"""
+    with transaction.atomic():
+        redemption = CouponRedemption.objects.select_for_update().filter(order=order, released_at__isnull=True).first()
+        if redemption is None:
+            return None
+        redemption.released_at = timezone.now()
+        redemption.save(update_fields=['released_at'])
+        _return_usage(redemption.coupon_id)
+    return redemption
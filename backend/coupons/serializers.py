@@ -1,22 +1,19 @@
 from rest_framework import serializers
 from .models import Coupon
+from ecommerce.serializers import SparseFieldsetsMixin
 
-class CouponSerializer(serializers.ModelSerializer):
+class CouponSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     class Meta:
         model = Coupon
         fields = ['id', 'code', 'description', 'discount_type', 'discount_value', 
                   'min_purchase_amount', 'valid_from', 'valid_to', 'active', 
-                  'max_usage', 'usage_count', 'is_valid']
+                  'max_usage', 'max_usage_per_user', 'usage_count', 'is_valid']
         read_only_fields = ['usage_count', 'is_valid']
 
+    field_requirements = {
+        'is_valid': {'only': ('active', 'valid_from', 'valid_to', 'usage_count', 'max_usage')},
+    }
+
 class CouponApplySerializer(serializers.Serializer):
+    # Kodun varlığı ve geçerliliği coupons.services.quote_coupon ile (önbellekten) kontrol edilir
     code = serializers.CharField(max_length=50)
-    
-    def validate_code(self, value):
-        try:
-            coupon = Coupon.objects.get(code=value)
-            if not coupon.is_valid:
-                raise serializers.ValidationError("Kupon geçerli değil.")
-            return value
-        except Coupon.DoesNotExist:
-            raise serializers.ValidationError("Geçersiz kupon kodu.") 
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+Kupon doğrulama ve indirim hesabı.
+
+Sepette kupon kodu yazılırken /api/coupons/check/ ve /api/coupons/apply/ her
+tuşta çağrılır. Kupon tanımları bu yüzden iki katmanlı önbellekte tutulur:
+  - süreç içi sözlük (COUPON_LOCAL_CACHE_TIMEOUT saniye; Redis'e de gidilmez)
+  - Redis (COUPON_CACHE_TIMEOUT saniye), anahtarlar 'coupons' alan sürümünü içerir
+Kupon kaydedildiğinde veya silindiğinde sürüm artırılır (coupons/signals.py);
+diğer worker'lar değişikliği en geç süreç içi süre dolunca görür.
+
+Bulunamayan kodlar da COUPON_NEGATIVE_CACHE_TIMEOUT saniye saklanır; rastgele kod
+denemeleri veritabanına ulaşmaz. Kullanım sayısı önbellekteki tanımdan değil
+coupons.redemptions.get_usage_count sayacından okunur. Buradaki kontroller yalnızca
+ön izleme içindir; kesin kontrol sipariş sırasında claim_coupon ile yapılır.
+"""
+import hashlib
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ecommerce.cache import get_namespace_version
+from .models import Coupon
+from .redemptions import get_usage_count, has_reached_user_limit
+
+# Bulunamayan kodlar için saklanan değer (None önbellekte "anahtar yok" demektir)
+MISSING = 'missing'
+MAX_CODE_LENGTH = Coupon._meta.get_field('code').max_length
+LOCAL_CACHE_SIZE = 1000
+
+DEFINITION_FIELDS = (
+    'id', 'code', 'discount_type', 'discount_value', 'min_purchase_amount', 'valid_from', 'valid_to',
+    'active', 'max_usage', 'max_usage_per_user',
+)
+
+# {kod: (geçerlilik sonu, tanım veya MISSING)}
+_local_cache = {}
+
+
+class CouponError(Exception):
+    """Kupon kullanılamıyorsa istemciye döndürülecek hata"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def clear_local_cache():
+    _local_cache.clear()
+
+
+def _cache_key(code):
+    digest = hashlib.sha1(code.encode('utf-8')).hexdigest()
+    return f'coupon:{get_namespace_version("coupons")}:{digest}'
+
+
+def _load_definition(code, key):
+    # Anahtar sorgudan önce alınır; sorgu sürerken kupon değişirse eski sürüme yazılır
+    definition = Coupon.objects.filter(code=code).values(*DEFINITION_FIELDS).first()
+    if definition is None:
+        cache.set(key, MISSING, settings.COUPON_NEGATIVE_CACHE_TIMEOUT)
+        return MISSING
+    cache.set(key, definition, settings.COUPON_CACHE_TIMEOUT)
+    return definition
+
+
+def get_coupon_definition(code):
+    """Kupon tanımını sözlük olarak döndürür; kod yoksa None"""
+    if not code or len(code) > MAX_CODE_LENGTH:
+        return None
+
+    now = time.monotonic()
+    cached = _local_cache.get(code)
+    if cached is not None and cached[0] > now:
+        definition = cached[1]
+    else:
+        key = _cache_key(code)
+        definition = cache.get(key)
+        if definition is None:
+            definition = _load_definition(code, key)
+        if len(_local_cache) >= LOCAL_CACHE_SIZE:
+            # Rastgele kod denemeleri süreç belleğini büyütmesin
+            _local_cache.clear()
+        _local_cache[code] = (now + settings.COUPON_LOCAL_CACHE_TIMEOUT, definition)
+    return None if definition == MISSING else definition
+
+
+def calculate_discount(discount_type, discount_value, total):
+    """Kupon indirimini döndürür; indirim toplamdan büyük olamaz"""
+    discount_value = Decimal(str(discount_value))
+    if discount_type == 'percentage':
+        discount = total * (discount_value / Decimal('100'))
+    else:
+        discount = discount_value
+    return min(discount, total)
+
+
+def validate_coupon(definition, cart_total, user=None):
+    """Kupon bu sepete uygulanamıyorsa CouponError fırlatır"""
+    now = timezone.now()
+    if not definition['active']:
+        raise CouponError('Bu kupon aktif değil.')
+    if now < definition['valid_from']:
+        raise CouponError('Bu kupon henüz geçerli değil.')
+    if now > definition['valid_to']:
+        raise CouponError('Bu kuponun süresi dolmuş.')
+    if get_usage_count(definition['id']) >= definition['max_usage']:
+        raise CouponError('Bu kupon maksimum kullanım sayısına ulaşmış.')
+    if user is not None and user.is_authenticated and has_reached_user_limit(
+        definition['id'], definition['max_usage_per_user'], user, user.email,
+    ):
+        raise CouponError('Bu kuponu kullanım hakkınız dolmuş.')
+    if cart_total < definition['min_purchase_amount']:
+        raise CouponError(
+            f'Bu kuponu kullanmak için minimum {definition["min_purchase_amount"]} TL tutarında alışveriş yapmalısınız.'
+        )
+
+
+def quote_coupon(code, cart_total, user=None):
+    """
+    Kuponun sepete uygulanmasıyla oluşacak indirimi döndürür (kupon kullanılmaz).
+    Kod bulunamazsa veya kupon uygulanamazsa CouponError fırlatır.
+    """
+    definition = get_coupon_definition(code)
+    if definition is None:
+        raise CouponError('Geçersiz kupon kodu.', status_code=404)
+    validate_coupon(definition, cart_total, user)
+
+    discount_amount = calculate_discount(definition['discount_type'], definition['discount_value'], cart_total)
+    return {
+        'code': definition['code'],
+        'discount_type': definition['discount_type'],
+        'discount_value': float(definition['discount_value']),
+        'discount_amount': float(discount_amount),
+        'message': f'Kupon başarıyla uygulandı! {discount_amount} TL indirim kazandınız.',
+    }
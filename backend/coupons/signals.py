@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ecommerce.cache import invalidate_namespace_on_commit
+from .models import Coupon
+from .services import clear_local_cache
+
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def invalidate_coupon_cache(sender, **kwargs):
+    """Kupon tanımı değiştiğinde önbellekteki tanımları (ve bulunamayan kodları) geçersiz kılar"""
+    invalidate_namespace_on_commit('coupons')
+    # Süreç içi kopya hemen ve (işlem sürerken eski veriyle dolmuş olabileceği için) commit sonrası temizlenir
+    clear_local_cache()
+    transaction.on_commit(clear_local_cache)
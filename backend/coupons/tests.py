@@ -1,3 +1,266 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from orders.models import Order
+from products.models import Category, Product
+from users.models import Address
+from .models import Coupon, CouponRedemption
+from .redemptions import CouponUnavailable, claim_coupon, release_coupon
+from .services import clear_local_cache
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'coupons-tests'}}
+
+
+def create_coupon(code='YAZ10', **extra):
+    return Coupon.objects.create(**{
+        'code': code, 'discount_type': 'percentage', 'discount_value': Decimal('10.00'), 'max_usage': 5,
+        'valid_from': timezone.now() - timedelta(days=1), 'valid_to': timezone.now() + timedelta(days=1),
+        **extra,
+    })
+
+
+def create_order(user=None, email='ayse@example.com'):
+    return Order.objects.create(
+        user=user, first_name='Ayşe', last_name='Yılmaz', email=email, address='Adres', city='İstanbul',
+        phone_number='5550000000', total_price=Decimal('200.00'),
+    )
+
+
+@override_settings(CACHES=NO_CACHE)
+class CouponRedemptionTests(TestCase):
+    """coupons.redemptions ile kupon kullanımı"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='musteri', email='ayse@example.com', password='sifre12345')
+        self.address = Address.objects.create(
+            user=self.user, title='Ev', first_name='Ayşe', last_name='Yılmaz', phone_number='5550000000',
+            address='Adres', city='İstanbul', district='Kadıköy',
+        )
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.product = Product.objects.create(category=category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('200.00'), stock=50)
+        self.client.force_authenticate(self.user)
+
+    def checkout(self, **extra):
+        return self.client.post('/api/orders/', {
+            'items': [{'product_id': self.product.pk, 'quantity': 1}], 'address_id': self.address.pk, **extra,
+        }, format='json')
+
+    def test_checkout_claims_and_cancel_releases(self):
+        coupon = create_coupon()
+        response = self.checkout(coupon_code='YAZ10')
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.data['id'])
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.usage_count, 1)
+        self.assertEqual(order.coupon_redemption.coupon, coupon)
+
+        response = self.client.post(f'/api/orders/{order.pk}/cancel_order/')
+        self.assertEqual(response.status_code, 200)
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.usage_count, 0)
+        self.assertIsNotNone(CouponRedemption.objects.get(order=order).released_at)
+
+    def test_reapplying_coupon_counts_once(self):
+        coupon = create_coupon()
+        order = Order.objects.get(pk=self.checkout().data['id'])
+        for _ in range(2):
+            response = self.client.post(f'/api/orders/{order.pk}/apply_coupon/', {'code': 'YAZ10'}, format='json')
+            self.assertEqual(response.status_code, 200)
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.usage_count, 1)
+        self.assertEqual(CouponRedemption.objects.count(), 1)
+
+    def test_reapplying_coupon_holding_last_slot(self):
+        coupon = create_coupon(max_usage=1)
+        order = Order.objects.get(pk=self.checkout(coupon_code='YAZ10').data['id'])
+        response = self.client.post(f'/api/orders/{order.pk}/apply_coupon/', {'code': 'YAZ10'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.usage_count, 1)
+
+        # Başka bir sipariş için tükenmiş kupon yine reddedilir
+        other = Order.objects.get(pk=self.checkout().data['id'])
+        response = self.client.post(f'/api/orders/{other.pk}/apply_coupon/', {'code': 'YAZ10'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_switching_coupons_returns_previous_usage(self):
+        first, second = create_coupon('YAZ10'), create_coupon('KIS20')
+        order = Order.objects.get(pk=self.checkout(coupon_code='YAZ10').data['id'])
+        response = self.client.post(f'/api/orders/{order.pk}/apply_coupon/', {'code': 'KIS20'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.usage_count, second.usage_count), (0, 1))
+        self.assertEqual(CouponRedemption.objects.get(order=order).coupon, second)
+
+    def test_per_user_limit(self):
+        coupon = create_coupon(max_usage_per_user=1)
+        self.assertEqual(self.checkout(coupon_code='YAZ10').status_code, 201)
+
+        response = self.checkout(coupon_code='YAZ10')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Bu kuponu kullanım hakkınız dolmuş.')
+        self.assertEqual(Order.objects.count(), 1)
+        # Aynı e-postayla misafir olarak da kullanılamaz
+        with self.assertRaises(CouponUnavailable):
+            claim_coupon(coupon, create_order(email='AYSE@example.com'))
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.usage_count, 1)
+
+        # İptal edilen siparişin hakkı geri verilir
+        release_coupon(Order.objects.filter(coupon=coupon).get())
+        claim_coupon(coupon, create_order(self.user))
+
+    def test_exhausted_coupon(self):
+        coupon = create_coupon(max_usage=1)
+        claim_coupon(coupon, create_order(email='ali@example.com'))
+        with self.assertRaises(CouponUnavailable):
+            claim_coupon(coupon, create_order())
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.usage_count, 1)
+
+
+@override_settings(CACHES=LOCAL_CACHE)
+class CouponServiceTests(TestCase):
+    """coupons.services ile önbellekli kupon doğrulama"""
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.client = APIClient()
+
+    def apply(self, code, cart_total='400'):
+        return self.client.post('/api/coupons/apply/', {'code': code, 'cart_total': cart_total}, format='json')
+
+    def test_repeated_lookups_use_cache(self):
+        create_coupon()
+        with self.assertNumQueries(2):  # kupon tanımı + kullanım sayacı
+            response = self.apply('YAZ10')
+        self.assertEqual(response.data['discount_amount'], 40.0)
+        with self.assertNumQueries(0):
+            self.apply('YAZ10')
+        # Süreç içi kopya olmadan da Redis'teki tanım kullanılır
+        clear_local_cache()
+        with self.assertNumQueries(0):
+            self.apply('YAZ10')
+
+    def test_unknown_codes_are_cached(self):
+        with self.assertNumQueries(1):
+            response = self.apply('YOK123')
+        self.assertEqual(response.status_code, 404)
+        with self.assertNumQueries(0):
+            self.apply('YOK123')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.apply('X' * 200).status_code, 400)
+
+        # Sonradan oluşturulan kupon hemen bulunur
+        with self.captureOnCommitCallbacks(execute=True):
+            create_coupon('YOK123')
+        self.assertEqual(self.apply('YOK123').status_code, 200)
+
+    def test_coupon_changes_invalidate_cache(self):
+        coupon = create_coupon()
+        self.apply('YAZ10')
+        with self.captureOnCommitCallbacks(execute=True):
+            coupon.discount_value = Decimal('25.00')
+            coupon.save()
+        self.assertEqual(self.apply('YAZ10').data['discount_amount'], 100.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            coupon.active = False
+            coupon.save()
+        self.assertEqual(self.apply('YAZ10').data['error'], 'Bu kupon aktif değil.')
+
+    def test_usage_count_comes_from_counter(self):
+        coupon = create_coupon(max_usage=1)
+        self.assertEqual(self.apply('YAZ10').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            claim_coupon(coupon, create_order())
+        # Tanım önbellekte kalsa da kullanım sayısı sayaçtan güncel okunur
+        with self.assertNumQueries(0):
+            response = self.apply('YAZ10')
+        self.assertEqual(response.data['error'], 'Bu kupon maksimum kullanım sayısına ulaşmış.')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            release_coupon(Order.objects.get())
+        self.assertEqual(self.apply('YAZ10').status_code, 200)
+
+    def test_check_endpoint_validates_for_user(self):
+        create_coupon(max_usage_per_user=1, min_purchase_amount=Decimal('300.00'))
+        user = User.objects.create_user(username='musteri', email='ayse@example.com', password='sifre12345')
+        token = Token.objects.create(user=user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        response = self.client.post('/api/coupons/check/', {'code': 'YAZ10', 'cart_total': '200'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('minimum 300.00 TL', response.data['error'])
+        response = self.client.post('/api/coupons/check/', {'code': 'YAZ10', 'cart_total': '500'}, format='json')
+        self.assertEqual(response.data['discount_amount'], 50.0)
+
+        claim_coupon(Coupon.objects.get(), create_order(user))
+        response = self.client.post('/api/coupons/check/', {'code': 'YAZ10', 'cart_total': '500'}, format='json')
+        self.assertEqual(response.data['error'], 'Bu kuponu kullanım hakkınız dolmuş.')
+
+
+@override_settings(CACHES=NO_CACHE)
+class CouponRedemptionConcurrencyTests(TransactionTestCase):
+    """Aynı kupona eşzamanlı gelen kullanımlar max_usage sınırını aşmaz"""
+
+    def redeem_in_parallel(self, coupon, orders):
+        """Tüm siparişler için kuponu aynı anda kullanmaya çalışır; başarılı sipariş id'lerini döndürür"""
+        barrier = threading.Barrier(len(orders))
+        claimed = []
+
+        def redeem(order):
+            try:
+                barrier.wait()
+                claim_coupon(coupon, order)
+                claimed.append(order.pk)
+            except CouponUnavailable:
+                pass
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=redeem, args=(order,)) for order in orders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return claimed
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_parallel_redemptions_respect_max_usage(self):
+        coupon = create_coupon(max_usage=5)
+        orders = [create_order(email=f'musteri{i}@example.com') for i in range(20)]
+
+        claimed = self.redeem_in_parallel(coupon, orders)
+        coupon.refresh_from_db()
+        self.assertEqual(len(claimed), 5)
+        self.assertEqual(coupon.usage_count, 5)
+        self.assertEqual(sorted(CouponRedemption.objects.values_list('order_id', flat=True)), sorted(claimed))
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_parallel_redemptions_respect_user_limit(self):
+        coupon = create_coupon(max_usage=100, max_usage_per_user=1)
+        users = [User.objects.create_user(username=f'musteri{i}', email=f'musteri{i}@example.com') for i in range(4)]
+        # Her kullanıcı beş sipariş için aynı anda kuponu kullanmaya çalışır
+        orders = [create_order(user, user.email) for user in users for _ in range(5)]
+
+        claimed = self.redeem_in_parallel(coupon, orders)
+        coupon.refresh_from_db()
+        self.assertEqual(len(claimed), 4)
+        self.assertEqual(coupon.usage_count, 4)
+        self.assertEqual(
+            sorted(CouponRedemption.objects.values_list('user_id', flat=True)), sorted(user.pk for user in users),
+        )
@@ -0,0 +1,149 @@
+"""
+Public (anonim) GET uç noktaları için sürümlü yanıt önbelleği.
+
+Her önbellek alanının (catalog, blog, announcements) bir sürüm numarası vardır ve
+anahtarlar bu sürümü içerir. Modeller değiştiğinde sürüm artırılır; eski anahtarlar
+bir daha okunmaz ve zaman aşımıyla kendiliğinden silinir.
+"""
+import hashlib
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAMESPACES = ('catalog', 'blog', 'announcements')
+
+
+def _version_key(namespace):
+    return f'api-cache:version:{namespace}'
+
+
+def _stats_key(namespace, kind):
+    return f'api-cache:stats:{namespace}:{kind}'
+
+
+def _increment(key, delta=1):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Anahtar yoksa (ilk kullanım veya bellekten atılmış) oluştur
+        cache.add(key, 0, timeout=None)
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            return None
+
+
+def get_namespace_version(namespace):
+    """Alanın geçerli sürümünü döndürür"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Sürüm anahtarı kaybolursa eski anahtarlarla çakışmaması için zaman tabanlı başlat
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_namespace(namespace):
+    """Alanın sürümünü artırarak önbellekteki tüm yanıtlarını geçersiz kılar"""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def invalidate_namespace_on_commit(namespace):
+    """
+    Geçersiz kılmayı işlem (transaction) tamamlandıktan sonra yapar; böylece işlem
+    sürerken gelen bir istek eski veriyi yeni sürüm altında önbelleğe yazamaz.
+    """
+    transaction.on_commit(lambda: invalidate_namespace(namespace))
+
+
+def normalize_query_params(request):
+    """Sorgu parametrelerini sıralı ve boş değerlerden arındırılmış liste olarak döndürür"""
+    params = sorted(
+        (key, sorted(value for value in values if value != ''))
+        for key, values in request.query_params.lists()
+    )
+    return [(key, values) for key, values in params if values]
+
+
+def build_cache_key(namespace, request):
+    """İstek yolu ve normalize edilmiş sorgu parametrelerinden önbellek anahtarı üretir"""
+    raw = f'{request.get_host()}|{request.path}|{normalize_query_params(request)}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'api-cache:{namespace}:{get_namespace_version(namespace)}:{digest}'
+
+
+def get_cache_stats():
+    """İzleme için alan bazında isabet/ıska sayılarını döndürür"""
+    stats = {}
+    for namespace in CACHE_NAMESPACES:
+        hits = cache.get(_stats_key(namespace, 'hits')) or 0
+        misses = cache.get(_stats_key(namespace, 'misses')) or 0
+        total = hits + misses
+        stats[namespace] = {
+            'version': cache.get(_version_key(namespace)),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+def _record_stat(namespace, kind):
+    """İsabet/ıska sayacını artırır; önbellek erişilemezse yalnızca loglar"""
+    try:
+        _increment(_stats_key(namespace, kind))
+    except Exception as e:
+        logger.warning(f"Önbellek istatistiği yazılamadı: {str(e)}")
+
+
+def cache_response(namespace, timeout=None):
+    """
+    View metodları için dekoratör. Yalnızca anonim kullanıcıların başarılı GET
+    yanıtlarını önbelleğe alır; giriş yapmış kullanıcılar (ör. admin) her zaman
+    güncel veriyi görür.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view_method(self, request, *args, **kwargs)
+
+            try:
+                key = build_cache_key(namespace, request)
+                cached = cache.get(key)
+            except Exception as e:
+                # Önbellek erişilemezse istek doğrudan veritabanından karşılanır
+                logger.warning(f"Yanıt önbelleği okunamadı: {str(e)}")
+                return view_method(self, request, *args, **kwargs)
+
+            if cached is not None:
+                _record_stat(namespace, 'hits')
+                return Response(cached['data'], status=cached['status'])
+
+            _record_stat(namespace, 'misses')
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                try:
+                    cache.set(
+                        key,
+                        {'data': response.data, 'status': response.status_code},
+                        timeout if timeout is not None else settings.API_CACHE_TIMEOUT,
+                    )
+                except Exception as e:
+                    # Başarılı yanıt önbelleğe yazılamadı diye hataya dönmez
+                    logger.warning(f"Yanıt önbelleğe yazılamadı: {str(e)}")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,153 @@
+"""
+Katalog ve blog API'leri için HTTP koşullu istek (ETag / Last-Modified / 304) desteği.
+
+Doğrulayıcı, serileştirme yapılmadan önce tek bir aggregate sorgusuyla hesaplanır:
+listelerde en son updated_at + kayıt sayısı, detaylarda satırın (ve ilişkili
+kayıtların) en son updated_at değeri. İstemcinin elindeki sürüm hâlâ güncelse
+yanıt gövdesi hiç üretilmeden 304 döndürülür.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .cache import build_cache_key, normalize_query_params
+
+logger = logging.getLogger(__name__)
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = ''
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet/APIView'lere eklenen koşullu GET desteği.
+
+    conditional_list_actions: doğrulayıcısı filtrelenmiş sorgu kümesinden hesaplanan eylemler
+    conditional_object_actions: doğrulayıcısı tek bir satırdan hesaplanan eylemler
+    conditional_timestamp_fields: en büyük değeri doğrulayıcıya katılan tarih alanları
+        (ilişkili kayıtlar için 'category__updated_at' gibi lookup'lar kullanılabilir)
+    conditional_cache_namespace: verilirse anonim isteklerin doğrulayıcısı da
+        ecommerce.cache'teki sürümlü alan altında saklanır
+    """
+    conditional_list_actions = ('list',)
+    conditional_object_actions = ('retrieve',)
+    conditional_timestamp_fields = ('updated_at',)
+    conditional_cache_namespace = None
+    conditional_max_age = 60
+
+    def get_conditional_action(self):
+        # APIView'lerde action olmadığı için HTTP metodu (ör. 'get') kullanılır
+        return getattr(self, 'action', None) or self.request.method.lower()
+
+    def get_conditional_timestamp_fields(self):
+        return self.conditional_timestamp_fields
+
+    def get_conditional_queryset(self):
+        """Doğrulayıcının hesaplanacağı sorgu kümesi; özel eylemler bunu override edebilir"""
+        queryset = self.get_queryset()
+        if self.get_conditional_action() in self.conditional_object_actions:
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            return queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.filter_queryset(queryset)
+
+    def compute_validator(self, request):
+        """(etag, last_modified) çiftini tek sorguyla hesaplar"""
+        fields = self.get_conditional_timestamp_fields()
+        aggregates = {f'modified_{index}': Max(field) for index, field in enumerate(fields)}
+        aggregates['row_count'] = Count('pk', distinct=True)
+        values = self.get_conditional_queryset().order_by().aggregate(**aggregates)
+
+        row_count = values.pop('row_count')
+        timestamps = [value for value in values.values() if value]
+        last_modified = max(timestamps) if timestamps else None
+
+        # Sorgu parametreleri ve yetki seviyesi farklı içerik ürettiği için etikete dahil edilir
+        raw = '|'.join([
+            request.path,
+            str(normalize_query_params(request)),
+            str(bool(request.user and request.user.is_staff)),
+            str(row_count),
+            *[value.isoformat() if value else '' for value in values.values()],
+        ])
+        etag = 'W/' + quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+        return etag, last_modified
+
+    def get_validator(self, request):
+        namespace = self.conditional_cache_namespace
+        if namespace is None or request.user.is_authenticated:
+            return self.compute_validator(request)
+
+        try:
+            key = f'{build_cache_key(namespace, request)}:validator'
+            validator = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Doğrulayıcı önbelleği okunamadı: {str(e)}")
+            return self.compute_validator(request)
+
+        if validator is None:
+            validator = self.compute_validator(request)
+            try:
+                cache.set(key, validator, settings.API_CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Doğrulayıcı önbelleğe yazılamadı: {str(e)}")
+        return validator
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in tags or etag.removeprefix('W/') in tags
+
+        # Listelerde silinen kayıtlar son değişiklik tarihini değiştirmediği için
+        # If-Modified-Since yalnızca tek kayıtlık yanıtlarda dikkate alınır
+        if_modified_since = request.headers.get('If-Modified-Since')
+        if if_modified_since and last_modified and self.get_conditional_action() in self.conditional_object_actions:
+            if_modified_since = parse_http_date_safe(if_modified_since)
+            return if_modified_since is not None and int(last_modified.timestamp()) <= if_modified_since
+        return False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._conditional_validator = None
+
+        action = self.get_conditional_action()
+        if request.method not in ('GET', 'HEAD'):
+            return
+        if action not in self.conditional_list_actions and action not in self.conditional_object_actions:
+            return
+
+        etag, last_modified = self.get_validator(request)
+        self._conditional_validator = (etag, last_modified)
+        if self.is_not_modified(request, etag, last_modified):
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validator = getattr(self, '_conditional_validator', None)
+        if validator and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            etag, last_modified = validator
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            if request.user and request.user.is_authenticated:
+                # Kullanıcıya özel yanıtlar paylaşılan önbelleklerde (nginx) saklanmaz
+                response['Cache-Control'] = 'private, no-cache'
+            else:
+                response['Cache-Control'] = f'public, max-age={self.conditional_max_age}, must-revalidate'
+            patch_vary_headers(response, ['Authorization'])
+        return response
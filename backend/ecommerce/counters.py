@@ -0,0 +1,183 @@
+"""
+Tamponlu görüntülenme sayaçları.
+
+Her detay görüntülemesinde satırı okuyup view_count'u artırarak kaydetmek eşzamanlı
+isteklerde artışları kaybeder ve her okumayı sık güncellenen bir satıra yazmaya
+çevirir. Bunun yerine görüntülenmeler Redis'te sayaç adına ait bir hash'te
+(HINCRBY) biriktirilir; celery beat görevi (ör. blog.tasks.flush_blog_view_counts)
+biriken farkları her aralıkta tek bir UPDATE ile veritabanına yazar:
+
+    UPDATE blog_blog
+       SET view_count = view_count + CASE id WHEN 3 THEN 12 WHEN 8 THEN 1 END
+     WHERE id IN (3, 8)
+
+  - Aynı ziyaretçinin (kullanıcı veya IP + tarayıcı) VIEW_COUNTER_DEDUP_SECONDS
+    içindeki tekrar görüntülemeleri sayılmaz (0 ise her görüntüleme sayılır).
+  - Yazma sırasında hash atomik olarak yeniden adlandırılır (RENAME); bu arada
+    gelen görüntülenmeler yeni hash'e yazılır. Veritabanı güncellemesi başarısız
+    olursa yeniden adlandırılan hash bir sonraki çalıştırmada tekrar işlenir.
+  - Önbellek Redis değilse (geliştirme/test) farklar tek bir önbellek anahtarında
+    tutulur; önbelleğe hiç erişilemezse görüntülenme doğrudan F() ile yazılır.
+
+Sayaçlar modelden bağımsızdır; başka bir model için ViewCounter('product', Product)
+gibi bir örnek oluşturmak ve flush() çağıran bir görev eklemek yeterlidir.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+logger = logging.getLogger(__name__)
+
+# Tek UPDATE ile yazılacak en fazla satır
+FLUSH_BATCH_SIZE = 500
+# Aynı anda yalnızca bir flush çalışır; süreç ölürse kilit bu süre (saniye) sonra açılır
+FLUSH_LOCK_TIMEOUT = 300
+
+
+def get_visitor_id(request):
+    """Kullanıcıyı veya (anonim ise) IP + tarayıcı bilgisini özetleyen kimlik"""
+    if request.user and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    # nginx istemci adresini X-Real-IP ile iletir
+    ip = request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR', '')
+    agent = request.META.get('HTTP_USER_AGENT', '')
+    return hashlib.sha1(f'{ip}|{agent}'.encode('utf-8')).hexdigest()
+
+
+def get_redis_client():
+    """Varsayılan önbellek Django'nun RedisCache'i ise redis istemcisini döndürür"""
+    client = getattr(cache, '_cache', None)
+    if client is None or not hasattr(client, 'get_client'):
+        return None
+    return client.get_client(write=True)
+
+
+class RedisStore:
+    def __init__(self, client, key):
+        self.client = client
+        self.key = cache.make_key(key)
+        self.flushing_key = cache.make_key(f'{key}:flushing')
+
+    def increment(self, pk):
+        self.client.hincrby(self.key, pk, 1)
+
+    def get_pending(self, pk):
+        return int(self.client.hget(self.key, pk) or 0) + int(self.client.hget(self.flushing_key, pk) or 0)
+
+    def take(self):
+        """Biriken farkları yazılmak üzere ayırır ve {pk: fark} olarak döndürür"""
+        if not self.client.exists(self.flushing_key):
+            if not self.client.exists(self.key):
+                return {}
+            # RENAME atomiktir; bundan sonraki artışlar yeni hash'e yazılır
+            self.client.rename(self.key, self.flushing_key)
+        return {int(pk): int(delta) for pk, delta in self.client.hgetall(self.flushing_key).items()}
+
+    def done(self):
+        self.client.delete(self.flushing_key)
+
+
+class CacheStore:
+    """Redis olmayan önbellekler için (tek süreçli geliştirme ve test ortamları)"""
+
+    def __init__(self, key):
+        self.key = key
+        self.flushing_key = f'{key}:flushing'
+
+    def increment(self, pk):
+        pending = cache.get(self.key) or {}
+        pending[pk] = pending.get(pk, 0) + 1
+        cache.set(self.key, pending, None)
+
+    def get_pending(self, pk):
+        return (cache.get(self.key) or {}).get(pk, 0) + (cache.get(self.flushing_key) or {}).get(pk, 0)
+
+    def take(self):
+        pending = cache.get(self.flushing_key)
+        if pending is None:
+            pending = cache.get(self.key) or {}
+            cache.set(self.flushing_key, pending, None)
+            cache.delete(self.key)
+        return pending
+
+    def done(self):
+        cache.delete(self.flushing_key)
+
+
+class ViewCounter:
+    def __init__(self, name, model, field='view_count'):
+        self.name = name
+        self.model = model
+        self.field = field
+
+    def _key(self, suffix=''):
+        return f'view-counter:{self.name}{suffix}'
+
+    def get_store(self):
+        client = get_redis_client()
+        if client is not None:
+            return RedisStore(client, self._key())
+        return CacheStore(self._key())
+
+    def _write(self, deltas):
+        """Farkları toplu UPDATE'lerle veritabanına yazar; güncellenen satır sayısını döndürür"""
+        items = sorted(deltas.items())
+        updated = 0
+        # Gruplar tek işlemde yazılır: hata olursa hiçbiri kalmaz ve farklar bir sonraki
+        # çalıştırmada iki kez sayılmadan yeniden yazılır
+        with transaction.atomic():
+            for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                batch = items[start:start + FLUSH_BATCH_SIZE]
+                delta = Case(*[When(pk=pk, then=Value(value)) for pk, value in batch], output_field=IntegerField())
+                # updated_at ve sinyaller tetiklenmez; görüntülenme önbellekleri/ETag'leri geçersiz kılmaz
+                updated += self.model.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                    **{self.field: F(self.field) + delta}
+                )
+        return updated
+
+    def hit(self, pk, request=None):
+        """
+        Görüntülenmeyi sayar; ziyaretçi pencere içinde zaten sayıldıysa saymaz.
+        Sayıldıysa True döndürür.
+        """
+        window = getattr(settings, 'VIEW_COUNTER_DEDUP_SECONDS', 0)
+        try:
+            if request is not None and window:
+                seen_key = self._key(f':seen:{pk}:{get_visitor_id(request)}')
+                if not cache.add(seen_key, 1, window):
+                    return False
+            self.get_store().increment(pk)
+        except Exception as e:
+            # Önbelleğe erişilemezse görüntülenme kaybolmasın
+            logger.warning(f"{self.name} görüntülenme sayacı önbelleğe yazılamadı: {str(e)}")
+            self._write({pk: 1})
+        return True
+
+    def get_pending(self, pk):
+        """Henüz veritabanına yazılmamış görüntülenme sayısı"""
+        try:
+            return self.get_store().get_pending(pk)
+        except Exception as e:
+            logger.warning(f"{self.name} görüntülenme sayacı okunamadı: {str(e)}")
+            return 0
+
+    def flush(self):
+        """Biriken görüntülenmeleri veritabanına yazar; güncellenen satır sayısını döndürür"""
+        lock_key = self._key(':flush-lock')
+        if not cache.add(lock_key, 1, FLUSH_LOCK_TIMEOUT):
+            return 0
+        try:
+            store = self.get_store()
+            deltas = store.take()
+            if not deltas:
+                return 0
+            # Veritabanı hatasında ayrılan farklar silinmez, bir sonraki çalıştırmada yeniden yazılır
+            updated = self._write(deltas)
+            store.done()
+            return updated
+        finally:
+            cache.delete(lock_key)
@@ -0,0 +1,212 @@
+"""
+Yazma uç noktaları için Idempotency-Key desteği.
+
+İstemci (veya zaman aşımında isteği tekrarlayan nginx) aynı Idempotency-Key
+başlığıyla isteği yeniden gönderdiğinde işlem tekrar çalıştırılmaz; ilk isteğin
+yanıtı IDEMPOTENCY_KEY_TTL saniye boyunca saklanır ve aynen döndürülür.
+
+  - Anahtar kapsam, kullanıcı ve istek yoluna göre ayrılır; farklı kullanıcılar
+    aynı anahtarı kullansa da birbirinin yanıtını göremez.
+  - Aynı anahtar farklı bir istek gövdesiyle kullanılırsa 422 döndürülür.
+  - İlk istek hâlâ işleniyorsa tekrarlar 409 alır (istemci kısa süre sonra tekrar dener).
+  - 5xx yanıtlar saklanmaz; sunucu hatasından sonra aynı anahtarla yeniden denenebilir.
+
+Kayıtlar Redis önbelleğinde tutulur. Önbelleğe erişilemezse veya
+IDEMPOTENCY_STORE='database' ise orders.IdempotencyRecord tablosu kullanılır.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# İşlenmekte olan isteğin anahtarı bu süre (saniye) sonra sahipsiz kabul edilir
+# (ör. worker isteğin ortasında öldüyse)
+PROCESSING_TIMEOUT = 60
+
+
+def get_key_ttl():
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+
+
+def build_storage_key(scope, request, idempotency_key):
+    user = request.user.pk if request.user and request.user.is_authenticated else 'anon'
+    raw = f'{scope}|{user}|{request.path}|{idempotency_key}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def build_fingerprint(request):
+    """İstek gövdesinin (alan sırasından bağımsız) özeti"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    raw = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method}|{raw}'.encode('utf-8')).hexdigest()
+
+
+class CacheStore:
+    """Kayıtları Redis önbelleğinde tutar"""
+
+    def _key(self, key):
+        return f'idempotency:{key}'
+
+    def begin(self, key, fingerprint):
+        """
+        Anahtarı bu istek adına ayırmaya çalışır. Ayrıldıysa None, anahtar daha önce
+        kullanıldıysa mevcut kaydı döndürür.
+        """
+        record = {'fingerprint': fingerprint, 'status': None, 'data': None}
+        if cache.add(self._key(key), record, PROCESSING_TIMEOUT):
+            return None
+        existing = cache.get(self._key(key))
+        if existing is None:
+            # Kayıt bu arada süresi dolup silindiyse tekrar dene
+            return None if cache.add(self._key(key), record, PROCESSING_TIMEOUT) else cache.get(self._key(key))
+        return existing
+
+    def complete(self, key, fingerprint, status_code, data):
+        cache.set(self._key(key), {'fingerprint': fingerprint, 'status': status_code, 'data': data}, get_key_ttl())
+
+    def abort(self, key):
+        cache.delete(self._key(key))
+
+
+class DatabaseStore:
+    """Kayıtları orders.IdempotencyRecord tablosunda tutar"""
+
+    def _as_record(self, instance):
+        return {'fingerprint': instance.fingerprint, 'status': instance.status_code, 'data': instance.response_data}
+
+    def begin(self, key, fingerprint):
+        from orders.models import IdempotencyRecord
+
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                IdempotencyRecord.objects.create(
+                    key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=PROCESSING_TIMEOUT),
+                )
+            return None
+        except IntegrityError:
+            pass
+
+        with transaction.atomic():
+            existing = IdempotencyRecord.objects.select_for_update().filter(key=key).first()
+            if existing is None:
+                IdempotencyRecord.objects.create(
+                    key=key, fingerprint=fingerprint, expires_at=now + timedelta(seconds=PROCESSING_TIMEOUT),
+                )
+                return None
+            if existing.expires_at <= now:
+                # Süresi dolan (veya sahipsiz kalan) kayıt bu isteğe devredilir
+                existing.fingerprint = fingerprint
+                existing.status_code = None
+                existing.response_data = None
+                existing.expires_at = now + timedelta(seconds=PROCESSING_TIMEOUT)
+                existing.save()
+                return None
+            return self._as_record(existing)
+
+    def complete(self, key, fingerprint, status_code, data):
+        from orders.models import IdempotencyRecord
+
+        IdempotencyRecord.objects.filter(key=key).update(
+            fingerprint=fingerprint, status_code=status_code, response_data=data,
+            expires_at=timezone.now() + timedelta(seconds=get_key_ttl()),
+        )
+
+    def abort(self, key):
+        from orders.models import IdempotencyRecord
+
+        IdempotencyRecord.objects.filter(key=key, status_code__isnull=True).delete()
+
+
+def get_store():
+    if getattr(settings, 'IDEMPOTENCY_STORE', 'cache') == 'database':
+        return DatabaseStore()
+    return CacheStore()
+
+
+def begin_request(key, fingerprint):
+    """(store, mevcut kayıt) döndürür; önbellek erişilemezse veritabanına düşer"""
+    store = get_store()
+    try:
+        return store, store.begin(key, fingerprint)
+    except Exception as e:
+        if isinstance(store, DatabaseStore):
+            raise
+        logger.warning(f"Idempotency önbelleği kullanılamıyor, veritabanı kullanılacak: {str(e)}")
+        store = DatabaseStore()
+        return store, store.begin(key, fingerprint)
+
+
+def replay(record):
+    response = Response(record['data'], status=record['status'])
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(scope):
+    """
+    Yazma işlemi yapan view metodları için dekoratör. Idempotency-Key başlığı
+    olmayan istekler her zamanki gibi işlenir.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                return view_method(self, request, *args, **kwargs)
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                return Response(
+                    {'error': f'{IDEMPOTENCY_HEADER} en fazla {MAX_KEY_LENGTH} karakter olabilir.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            key = build_storage_key(scope, request, idempotency_key)
+            fingerprint = build_fingerprint(request)
+            store, record = begin_request(key, fingerprint)
+
+            if record is not None:
+                if record['fingerprint'] != fingerprint:
+                    return Response(
+                        {'error': f'Bu {IDEMPOTENCY_HEADER} farklı bir istek için kullanılmış.'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if record['status'] is None:
+                    return Response(
+                        {'error': 'Aynı istek hâlâ işleniyor, lütfen biraz sonra tekrar deneyin.'},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                return replay(record)
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            except Exception:
+                store.abort(key)
+                raise
+
+            try:
+                if response.status_code >= 500:
+                    store.abort(key)
+                else:
+                    store.complete(key, fingerprint, response.status_code, response.data)
+            except Exception as e:
+                # İşlem tamamlandı; yanıtın saklanamaması istemciye hata olarak yansıtılmaz
+                logger.warning(f"Idempotency yanıtı saklanamadı: {str(e)}")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,193 @@
+"""
+Sayfa numaralı sayfalamaya isteğe bağlı iki mod ekleyen ortak sayfalama sınıfı.
+
+  ?pagination=cursor (veya ?cursor=...) : keyset sayfalama. Sayfa, önceki sayfanın
+      son satırının sıralama değerlerinden (ör. created_at, id) devam eder; OFFSET
+      taraması ve COUNT(*) yapılmaz. Yanıt: {next, previous, results}
+      Keyset'e çevrilemeyen sıralamalar (cursor_orderings dışındaki ?ordering=
+      değerleri, ör. alaka sıralı arama) 400 ile reddedilir; bunlar ?page= ile
+      sayfalanır.
+  ?count=false : sayfa numaralı sayfalama, COUNT(*) atlanır. Bir sonraki sayfanın
+      varlığı page_size + 1 satır okunarak anlaşılır. Yanıt: {next, previous, results}
+
+Parametre verilmezse mevcut istemciler için PageNumberPagination davranışı
+({count, next, previous, results}) aynen korunur.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    # Keyset modunda kullanılan sıralama; son alan benzersiz olmalı (genelde id)
+    cursor_ordering = ('-id',)
+    # ?ordering= değerinden keyset sıralamasına eşleme; ?ordering= verilmezse cursor_ordering
+    # kullanılır, eşleşmeyen değerler reddedilir
+    cursor_orderings = {}
+    # ?ordering= verilmediğinde sıralamayı keyset'e çevrilemeyecek şekilde değiştiren
+    # parametreler (ör. alakaya göre sıralayan ?search=)
+    cursor_unsupported_params = ()
+    # False ise hiçbir sayfalama parametresi verilmediğinde sayfalama yapılmaz (liste döner)
+    paginate_by_default = True
+    invalid_cursor_message = 'Geçersiz cursor.'
+    invalid_cursor_ordering_message = 'Bu sıralama cursor sayfalamasıyla kullanılamaz; ?page= ile sayfalayın.'
+
+    def get_mode(self, request):
+        params = request.query_params
+        if self.cursor_query_param in params or params.get(self.mode_query_param) == 'cursor':
+            return 'cursor'
+        if params.get(self.count_query_param, '').lower() in ('false', '0'):
+            return 'nocount'
+        if self.paginate_by_default or self.page_query_param in params:
+            return 'page'
+        return None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = self.get_mode(request)
+        if self.mode == 'cursor':
+            return self.paginate_keyset(queryset, request)
+        if self.mode == 'nocount':
+            return self.paginate_without_count(queryset, request)
+        if self.mode == 'page':
+            return super().paginate_queryset(queryset, request, view)
+        return None
+
+    # Keyset modu
+
+    def get_cursor_ordering(self, request):
+        params = request.query_params
+        ordering = params.get('ordering')
+        if ordering:
+            if ordering not in self.cursor_orderings:
+                raise ValidationError({'error': self.invalid_cursor_ordering_message})
+            return self.cursor_orderings[ordering]
+        if any(params.get(param) for param in self.cursor_unsupported_params):
+            raise ValidationError({'error': self.invalid_cursor_ordering_message})
+        return self.cursor_ordering
+
+    def encode_cursor(self, row, reverse, ordering=None):
+        values = [getattr(row, field.lstrip('-')) for field in ordering or self.ordering]
+        # DjangoJSONEncoder tarihleri milisaniyeye yuvarlar; keyset karşılaştırması için tam değer gerekir
+        payload = json.dumps(
+            {'v': values, 'r': reverse},
+            default=lambda value: value.isoformat() if hasattr(value, 'isoformat') else str(value),
+        )
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            raw_values = payload['v']
+            if len(raw_values) != len(self.ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, raw_values)
+            ]
+            return values, bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def keyset_filter(ordering, values):
+        """(a, b) > (x, y) karşılaştırmasını alan yönlerine göre Q nesnesine çevirir"""
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for previous_field, previous_value in zip(ordering[:index], values[:index]):
+                step &= Q(**{previous_field.lstrip('-'): previous_value})
+            condition |= step
+        return condition
+
+    def paginate_keyset(self, queryset, request):
+        self.page_size = self.get_page_size(request) or self.page_size
+        self.ordering = self.get_cursor_ordering(request)
+        values, reverse = self.decode_cursor(request, queryset.model)
+
+        # Geri gidilirken sıralama ters çevrilip ilk sayfa gibi okunur
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, values))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+
+        self.next_cursor = self.encode_cursor(rows[-1], False) if rows and self.has_next else None
+        self.previous_cursor = self.encode_cursor(rows[0], True) if rows and self.has_previous else None
+        return rows
+
+    # COUNT(*) olmadan sayfa numaralı mod
+
+    def paginate_without_count(self, queryset, request):
+        self.page_size = self.get_page_size(request) or self.page_size
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+            if self.page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (self.page_number - 1) * self.page_size
+        rows = list(queryset[offset:offset + self.page_size + 1])
+        if not rows and self.page_number > 1:
+            raise NotFound(self.invalid_page_message)
+        self.has_next = len(rows) > self.page_size
+        self.has_previous = self.page_number > 1
+        return rows[:self.page_size]
+
+    # Bağlantılar ve yanıt
+
+    def get_next_link(self):
+        if self.mode == 'page':
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.mode == 'cursor':
+            return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+        return replace_query_param(url, self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.mode == 'page':
+            return super().get_previous_link()
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.mode == 'cursor':
+            return replace_query_param(url, self.cursor_query_param, self.previous_cursor)
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_response(self, data):
+        if self.mode == 'page':
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
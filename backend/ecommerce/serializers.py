@@ -0,0 +1,134 @@
+"""
+Serileştiriciler için seyrek alan seçimi (sparse fieldsets) ve ilişki genişletme.
+
+  ?fields=id,name,price : yanıtta yalnızca bu üst düzey alanlar bulunur
+  ?omit=description     : bu alanlar yanıttan çıkarılır
+  ?expand=category      : serileştiricinin expandable_fields sözlüğündeki ilişki,
+      kimlik yerine iç içe nesne olarak döndürülür (veya varsayılanda olmayan alan eklenir)
+
+Çıkarılan SerializerMethodField'lar hiç çalıştırılmaz. Parametreler yalnızca okuma
+isteklerinde ve en dıştaki serileştiriciye uygulanır; iç içe serileştiriciler her
+zaman tam döner.
+
+Görünümler sorgu kümesini SparseFieldsetsMixin.optimize_queryset ile (veya
+SparseFieldsetsViewMixin ile) istenen alanlara göre kırpar: field_requirements
+sözlüğündeki select_related/prefetch_related yalnızca istenen alanlar için
+uygulanır ve hangi sütunların gerektiği biliniyorsa only() ile diğerleri okunmaz.
+"""
+from rest_framework import permissions, serializers
+
+
+def parse_field_list(request, param):
+    """Virgülle ayrılmış sorgu parametresini küme olarak döndürür; parametre yoksa None"""
+    if request is None:
+        return None
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def is_field_requested(request, name):
+    """Alan ?fields= / ?omit= ile dışarıda bırakılmadıysa True döner (görünümlerde sorgu kırpmak için)"""
+    fields = parse_field_list(request, 'fields')
+    omit = parse_field_list(request, 'omit') or set()
+    return (fields is None or name in fields) and name not in omit
+
+
+class SparseFieldsetsMixin:
+    # {'alan': (SerializerSınıfı, {serializer argümanları})}
+    expandable_fields = {}
+    # Alanın ihtiyaç duyduğu ilişkiler ve model sütunları:
+    # {'alan': {'select_related': (...), 'prefetch_related': (...), 'only': (...)}}
+    # Model sütunu olmayan alanlar (ör. SerializerMethodField) 'only' belirtmezse only() uygulanmaz
+    field_requirements = {}
+
+    def is_root_serializer(self):
+        serializer = self.parent if isinstance(self.parent, serializers.ListSerializer) else self
+        return serializer.parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS or not self.is_root_serializer():
+            return fields
+
+        expand = parse_field_list(request, 'expand') or set()
+        for name in expand & set(self.expandable_fields):
+            serializer_class, kwargs = self.expandable_fields[name]
+            fields[name] = serializer_class(**{'read_only': True, **kwargs})
+
+        allowed = parse_field_list(request, 'fields')
+        omit = parse_field_list(request, 'omit') or set()
+        for name in list(fields):
+            if (allowed is not None and name not in allowed | expand) or name in omit:
+                fields.pop(name)
+        return fields
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request):
+        """
+        Sorgu kümesini istenen alanlara göre kırpar. Parametre verilmemişse sorgu kümesi
+        olduğu gibi döner (görünümler tam yanıt için zaten gerekli ilişkileri yükler).
+        """
+        allowed = parse_field_list(request, 'fields')
+        omit = parse_field_list(request, 'omit')
+        expand = parse_field_list(request, 'expand') or set()
+        sparse = allowed is not None or omit is not None
+        if not sparse and not expand:
+            return queryset
+
+        model = queryset.model
+        relations = {field.name for field in model._meta.get_fields() if field.is_relation}
+        concrete = {field.name for field in model._meta.concrete_fields}
+        # prefetch_related aynı hedefe iki kez eklenemez; hedef adına göre tekilleştirilir
+        select_related, prefetch_related = set(), {}
+        only = {model._meta.pk.name}
+
+        fields = cls(context={'request': request}).fields
+        for name, field in fields.items():
+            # Yalnızca genişletmede tam yanıtın ilişkileri zaten yüklüdür; sadece eklenenlere bakılır
+            if not sparse and name not in expand:
+                continue
+            requirements = cls.field_requirements.get(name, {})
+            select_related.update(requirements.get('select_related', ()))
+            for lookup in requirements.get('prefetch_related', ()):
+                prefetch_related.setdefault(getattr(lookup, 'prefetch_to', lookup), lookup)
+            if isinstance(field, serializers.BaseSerializer) and field.source in relations and 'prefetch_related' not in requirements:
+                # İç içe serileştirilen ilişki: tekil ise JOIN, çoğul ise ayrı sorgu
+                if getattr(field, 'many', False) or isinstance(field, serializers.ListSerializer):
+                    prefetch_related.setdefault(field.source, field.source)
+                else:
+                    select_related.add(field.source)
+            if only is None:
+                continue
+            if 'only' in requirements:
+                only.update(requirements['only'])
+            elif field.source in concrete:
+                only.add(field.source)
+            elif field.source not in relations:
+                # Hangi sütunlara ihtiyaç duyduğu bilinmiyor; güvenli tarafta kalınır
+                only = None
+
+        if sparse:
+            queryset = queryset.select_related(None).prefetch_related(None)
+        if select_related:
+            queryset = queryset.select_related(*sorted(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related.values())
+        if sparse and only is not None:
+            # select_related ile izlenen ilişkiler ertelenemez
+            only.update(path.split('__')[0] for path in select_related)
+            queryset = queryset.only(*only)
+        return queryset
+
+
+class SparseFieldsetsViewMixin:
+    """filter_queryset sonucunu serileştiricinin optimize_queryset'i ile kırpar (okuma isteklerinde)"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if self.request.method in permissions.SAFE_METHODS and hasattr(serializer_class, 'optimize_queryset'):
+            queryset = serializer_class.optimize_queryset(queryset, self.request)
+        return queryset
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from pathlib import Path
 import os
 from decouple import config
+from celery.schedules import crontab
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -39,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # REST Framework
     "rest_framework",
     "rest_framework.authtoken",
@@ -53,6 +56,7 @@ INSTALLED_APPS = [
     # Uygulama Modülleri
     "products",
     "orders",
+    "carts",
     "payments",
     "coupons",
     "users",
@@ -64,6 +68,11 @@ CORS_ALLOW_ALL_ORIGINS = False
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Frontend sipariş/ödeme isteklerini güvenle tekrarlayabilmek için Idempotency-Key,
+# misafir sepeti için X-Cart-Token gönderir
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key', 'x-cart-token')
+CORS_EXPOSE_HEADERS = ['Idempotent-Replayed', 'X-Cart-Token']
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://localhost",
@@ -255,6 +264,52 @@ X_FRAME_OPTIONS = 'SAMEORIGIN'
 # Frontend URL
 FRONTEND_URL = config('FRONTEND_URL', default='https://kasarcim.com')
 
+# Önbellek ayarları (Redis - Celery ile aynı sunucu, farklı veritabanı)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('REDIS_CACHE_URL', default='redis://redis:6379/1'),
+        'KEY_PREFIX': 'kasarcim',
+    }
+}
+
+# Public katalog/blog yanıtlarının önbellekte kalma süresi (saniye)
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=300, cast=int)
+
+# Arama önerisi indeksinin diğer worker'lardaki değişiklikleri kontrol etme aralığı (saniye)
+SUGGEST_INDEX_CHECK_INTERVAL = config('SUGGEST_INDEX_CHECK_INTERVAL', default=5, cast=int)
+
+# Online ödemeli siparişlerde stoğun ödeme için ayrılı tutulacağı süre (dakika)
+STOCK_RESERVATION_TTL_MINUTES = config('STOCK_RESERVATION_TTL_MINUTES', default=30, cast=int)
+
+# Misafir sepetlerinin Redis'te saklanma süresi (gün)
+CART_GUEST_TTL_DAYS = config('CART_GUEST_TTL_DAYS', default=30, cast=int)
+
+# Idempotency-Key ile gelen sipariş/ödeme yanıtlarının saklanma süresi (saniye)
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+# Yanıtların tutulacağı yer: 'cache' (Redis, erişilemezse veritabanı) veya 'database'
+IDEMPOTENCY_STORE = config('IDEMPOTENCY_STORE', default='cache')
+
+# Kupon tanımlarının süreç içi ve Redis önbelleğinde kalma süreleri ile bulunamayan
+# kodların saklanma süresi (saniye), bkz. coupons.services
+COUPON_LOCAL_CACHE_TIMEOUT = config('COUPON_LOCAL_CACHE_TIMEOUT', default=5, cast=int)
+COUPON_CACHE_TIMEOUT = config('COUPON_CACHE_TIMEOUT', default=300, cast=int)
+COUPON_NEGATIVE_CACHE_TIMEOUT = config('COUPON_NEGATIVE_CACHE_TIMEOUT', default=60, cast=int)
+
+# Kuyruklu checkout: açıkken siparişler HTTP isteğinde değil checkout.N kuyruklarını
+# dinleyen celery worker'larında oluşturulur (bkz. orders.checkout_queue)
+CHECKOUT_QUEUE_ENABLED = config('CHECKOUT_QUEUE_ENABLED', default=False, cast=bool)
+# Kuyruk sayısı; docker-compose.yml'deki checkout worker sayısıyla aynı olmalı
+CHECKOUT_QUEUE_PARTITIONS = config('CHECKOUT_QUEUE_PARTITIONS', default=2, cast=int)
+# Bu süre (saniye) içinde işlenmeyen istekler başarısız sayılır
+CHECKOUT_QUEUE_TIMEOUT = config('CHECKOUT_QUEUE_TIMEOUT', default=120, cast=int)
+# Bekleyen istekler için durum uç noktasının Retry-After başlığı (saniye)
+CHECKOUT_STATUS_RETRY_AFTER = config('CHECKOUT_STATUS_RETRY_AFTER', default=1, cast=int)
+
+# Aynı ziyaretçinin (kullanıcı veya IP + tarayıcı) bir yazıyı tekrar görüntülemesinin
+# sayılmadığı süre (saniye); 0 her görüntülemeyi sayar (bkz. ecommerce.counters)
+VIEW_COUNTER_DEDUP_SECONDS = config('VIEW_COUNTER_DEDUP_SECONDS', default=1800, cast=int)
+
 # Celery ayarları
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://redis:6379/0')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://redis:6379/0')
@@ -263,6 +318,40 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Periyodik görevler (celery beat)
+CELERY_BEAT_SCHEDULE = {
+    # İndirim dönemleri gün bazlı olduğu için indirimli fiyatlar her gece yarısı (Europe/Istanbul) yenilenir
+    'refresh-effective-prices': {
+        'task': 'products.tasks.refresh_effective_prices',
+        'schedule': crontab(hour=0, minute=0),
+    },
+    # Süresi dolan stok ayırmaları her dakika stoğa iade edilir
+    'release-expired-stock-reservations': {
+        'task': 'orders.tasks.release_expired_stock_reservations',
+        'schedule': crontab(),
+    },
+    # Veritabanında tutulan süresi dolmuş idempotency kayıtları her gece temizlenir
+    'purge-expired-idempotency-records': {
+        'task': 'orders.tasks.purge_expired_idempotency_records',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    # Önbellekte biriken blog görüntülenmeleri her dakika veritabanına yazılır
+    'flush-blog-view-counts': {
+        'task': 'blog.tasks.flush_blog_view_counts',
+        'schedule': crontab(),
+    },
+    # Benzer yazı listeleri yenilik puanı güncel kalsın diye her gece baştan hesaplanır
+    'rebuild-blog-related-posts': {
+        'task': 'blog.tasks.rebuild_blog_related_posts',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    # Sonuçlanmış eski kuyruklu checkout istekleri her gece temizlenir
+    'purge-checkout-requests': {
+        'task': 'orders.tasks.purge_checkout_requests',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
+
 # E-posta ayarları
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -29,8 +29,9 @@ from users.views import (
     UserViewSet, AddressViewSet, CurrentUserView
 )
 from coupons.views import CouponViewSet, check_coupon
-from orders.views import OrderViewSet, ShipmentViewSet
+from orders.views import CheckoutRequestView, OrderViewSet, ShipmentViewSet
 from payments.views import PaymentViewSet
+from .views import CacheStatsView
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet)
@@ -46,6 +47,8 @@ router.register(r'shipments', ShipmentViewSet, basename='shipments')
 
 urlpatterns = [
     path('km-admin/', admin.site.urls),
+    # Router'daki coupons/<pk>/ deseninden önce gelmeli
+    path('api/coupons/check/', check_coupon, name='check-coupon'),
     path('api/', include(router.urls)),
     path('api/auth/', include('rest_framework.urls')),
     path('api/token/', token_views.obtain_auth_token, name='api-token'),
@@ -54,7 +57,9 @@ urlpatterns = [
     path('api/logout/', LogoutView.as_view(), name='logout'),
     path('api/user/', CurrentUserView.as_view(), name='current-user'),
     path('api/contact/', ContactMessageCreateView.as_view(), name='contact'),
-    path('api/coupons/check/', check_coupon, name='check-coupon'),
+    path('api/cart/', include('carts.urls')),
+    path('api/orders/queue/<uuid:pk>/', CheckoutRequestView.as_view(), name='checkout-request'),
+    path('api/cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
     path('api/password-reset/', csrf_exempt(PasswordResetRequestView.as_view()), name='password-reset'),
     path('api/password-reset-confirm/', csrf_exempt(PasswordResetConfirmView.as_view()), name='password-reset-confirm'),
     path('', include('announcements.urls')),
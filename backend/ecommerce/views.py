@@ -0,0 +1,12 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser
+from .cache import get_cache_stats
+
+
+class CacheStatsView(APIView):
+    """Yanıt önbelleğinin alan bazında isabet/ıska sayılarını döndürür (izleme için)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_cache_stats())
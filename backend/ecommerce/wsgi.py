@@ -7,6 +7,7 @@ For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
 """
 
+import logging
 import os
 
 from django.core.wsgi import get_wsgi_application
@@ -14,3 +15,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ecommerce.settings")
 
 application = get_wsgi_application()
+
+# Arama önerisi indeksini worker açılırken kur; başarısız olursa ilk istekte kurulur
+try:
+    from products.suggest import suggestion_index
+    suggestion_index.ensure_fresh()
+except Exception as e:
+    logging.getLogger(__name__).warning(f"Öneri indeksi kurulamadı: {str(e)}")
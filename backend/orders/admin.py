@@ -1,5 +1,7 @@
-from django.contrib import admin
-from .models import Order, OrderItem, Shipment
+from django.contrib import admin, messages
+from products.inventory import InsufficientStock
+from .models import CheckoutRequest, Order, OrderItem, Shipment, StockReservation
+from .transitions import InvalidTransition, transition
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -25,6 +27,19 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        # Durum değişikliği durum makinesi üzerinden yapılır (geçiş kontrolü, stok
+        # ayırmaları, kupon iadesi ve e-postalar için)
+        new_status = obj.status
+        if change and 'status' in form.changed_data:
+            obj.status = form.initial['status']
+        super().save_model(request, obj, form, change)
+        if obj.status != new_status:
+            try:
+                transition(obj, new_status)
+            except (InvalidTransition, InsufficientStock) as e:
+                self.message_user(request, str(e), level=messages.ERROR)
+
 @admin.register(Shipment)
 class ShipmentAdmin(admin.ModelAdmin):
     list_display = ['id', 'order', 'status', 'shipping_company', 'tracking_number', 'shipped_at', 'estimated_delivery', 'delivered_at']
@@ -42,3 +57,18 @@ class ShipmentAdmin(admin.ModelAdmin):
             'fields': ('notes',)
         }),
     )
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'order', 'product', 'quantity', 'status', 'expires_at', 'created_at']
+    list_filter = ['status']
+    search_fields = ['order__id', 'product__name']
+    raw_id_fields = ['order', 'product']
+
+@admin.register(CheckoutRequest)
+class CheckoutRequestAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'status', 'queue', 'order', 'created_at', 'completed_at']
+    list_filter = ['status', 'queue']
+    search_fields = ['id', 'user__username', 'order__id']
+    raw_id_fields = ['user', 'order']
+    readonly_fields = ['payload', 'error']
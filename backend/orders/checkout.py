@@ -0,0 +1,231 @@
+"""
+Sipariş oluşturma (checkout) akışı.
+
+OrderViewSet.create isteği şu adımlarla işlenir:
+  1. parse_cart_lines     : sepet satırlarını doğrular (istek satır göndermediyse
+                            sunucudaki sepet, bkz. carts.cart, kullanılır)
+  2. build_customer_data  : kayıtlı kullanıcının adresinden veya misafir bilgilerinden
+                            teslimat bilgilerini oluşturur
+  3. lock_products        : sepetteki tüm ürünleri tek sorguda, birincil anahtar
+                            sırasıyla SELECT ... FOR UPDATE ile kilitleyerek yükler
+  4. get_unit_prices      : satır fiyatlarını saklanan indirimli fiyattan alır (eksik
+                            olanların indirimleri tek sorguda bulunur); sunucu
+                            sepetinde fiyatlar ve toplam zaten hazırdır
+  5. reserve_stock        : tüm sepetin stoğunu tek bir koşullu UPDATE ile düşer
+                            (bkz. products.inventory); yetersiz satırlar raporlanır
+  6. get_coupon_discount  : kupon indirimini hesaplar
+  7. sipariş ve tüm kalemler tek bir bulk_create ile yazılır
+  8. create_reservations  : düşülen stok için süreli ayırma kayıtları oluşturulur
+                            (bkz. orders.reservations)
+  9. claim_coupon         : kupon kullanımı koşullu UPDATE ile alınır (bkz.
+                            coupons.redemptions); kupon bu arada tükendiyse
+                            sipariş oluşturulmaz
+
+Eşzamanlı siparişler ürün satırlarını her zaman aynı sırada kilitlediği için
+birbirini kilitlenmeye (deadlock) sokmaz. Sorgu sayısı sepetteki satır sayısından
+bağımsızdır (bkz. benchmark_checkout komutu).
+
+CHECKOUT_QUEUE_ENABLED açıkken aynı akış HTTP isteği yerine celery worker'ında
+çalıştırılır (bkz. orders.checkout_queue).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+
+from coupons.models import Coupon
+from coupons.redemptions import CouponUnavailable, claim_coupon
+from coupons.services import calculate_discount
+from products.inventory import InsufficientStock, reserve_stock
+from products.models import Discount, Product
+from users.models import Address
+from .models import Order, OrderItem
+from .reservations import create_reservations
+
+PAYMENT_METHODS = ('online', 'cash_on_delivery')
+GUEST_REQUIRED_FIELDS = ['full_name', 'email', 'phone', 'address', 'city', 'district']
+
+
+class CheckoutError(Exception):
+    """Sipariş oluşturulamadığında istemciye döndürülecek hata"""
+
+    def __init__(self, message, status_code=400, **extra):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.extra = extra
+
+    def as_response_data(self):
+        return {'error': self.message, **self.extra}
+
+
+def parse_cart_lines(items_data):
+    """Sepet satırlarını (ürün id, adet) listesine çevirir"""
+    if not items_data:
+        raise CheckoutError('Sepetiniz boş.')
+
+    lines = []
+    for item in items_data:
+        product_id = item.get('product_id')
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise CheckoutError(f'Ürün bulunamadı: {product_id}')
+        try:
+            quantity = int(item.get('quantity', 1))
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity < 1:
+            raise CheckoutError(f'Geçersiz ürün adedi: {item.get("quantity")}')
+        lines.append((product_id, quantity))
+    return lines
+
+
+def build_customer_data(user, data):
+    """Siparişin müşteri ve teslimat alanlarını döndürür"""
+    if user:
+        try:
+            address = Address.objects.get(id=data.get('address_id'), user=user)
+        except (Address.DoesNotExist, ValueError, TypeError):
+            raise CheckoutError('Geçersiz adres.')
+        return {
+            'user': user,
+            'first_name': address.first_name,
+            'last_name': address.last_name,
+            'email': user.email,
+            'address': address.address,
+            'city': address.city,
+            'postal_code': address.postal_code or '',
+            'country': address.country,
+            'phone_number': address.phone_number,
+            'is_guest_order': False,
+        }
+
+    # Misafir kullanıcı
+    guest_info = data.get('guest_info', {})
+    if not guest_info:
+        raise CheckoutError('Misafir kullanıcı bilgileri eksik.')
+
+    missing_fields = [field for field in GUEST_REQUIRED_FIELDS if not guest_info.get(field)]
+    if missing_fields:
+        raise CheckoutError('Eksik bilgiler mevcut.', missing_fields=missing_fields)
+
+    name_parts = guest_info.get('full_name', '').split(' ', 1)
+    return {
+        'user': None,
+        'first_name': name_parts[0],
+        'last_name': name_parts[1] if len(name_parts) > 1 else '',
+        'email': guest_info.get('email', ''),
+        'address': guest_info.get('address', ''),
+        'city': guest_info.get('city', ''),
+        'postal_code': guest_info.get('postal_code', ''),
+        'country': 'Türkiye',
+        'phone_number': guest_info.get('phone', ''),
+        'is_guest_order': True,
+        'guest_email': guest_info.get('email', ''),
+    }
+
+
+def lock_products(product_ids):
+    """
+    Ürünleri birincil anahtar sırasıyla kilitleyerek {id: ürün} olarak döndürür.
+    Açık bir transaction içinde çağrılmalıdır.
+    """
+    products = {
+        product.pk: product
+        for product in Product.objects.select_for_update().filter(pk__in=set(product_ids)).order_by('pk')
+    }
+    for product_id in product_ids:
+        if product_id not in products:
+            raise CheckoutError(f'Ürün bulunamadı: {product_id}')
+    return products
+
+
+def get_unit_prices(products):
+    """Ürünlerin indirimli birim fiyatlarını {id: fiyat} olarak döndürür"""
+    # İndirimli fiyat ürün üzerinde saklanır; yalnızca henüz hesaplanmamış ürünler için
+    # bugünün indirimleri tek sorguda alınır (find_active_discount ile aynı sıralama)
+    missing = [product.pk for product in products.values() if product.current_price is None]
+    discounts = {}
+    if missing:
+        for discount in Discount.objects.active().filter(product_id__in=missing):
+            discounts.setdefault(discount.product_id, discount)
+
+    return {
+        product.pk: product.current_price if product.current_price is not None
+        else product.calculate_price(discounts.get(product.pk))
+        for product in products.values()
+    }
+
+
+def get_coupon_discount(coupon_code, total_price):
+    """Geçerli kupon ve indirim tutarını döndürür; kupon geçersizse yok sayılır"""
+    if not coupon_code:
+        return None, Decimal('0')
+
+    coupon = Coupon.objects.filter(code=coupon_code).first()
+    # Kupon minimum tutarı indirimli fiyat üzerinden kontrol edilir
+    if coupon is None or not coupon.is_valid or total_price < coupon.min_purchase_amount:
+        return None, Decimal('0')
+
+    return coupon, calculate_discount(coupon.discount_type, coupon.discount_value, total_price)
+
+
+def place_order(user, data, cart=None):
+    """
+    Sepetten sipariş oluşturur ve siparişi döndürür. İstek satır içermiyorsa
+    verilen sunucu sepeti (carts.cart) kullanılır. Doğrulama hatalarında
+    CheckoutError fırlatır.
+    """
+    unit_prices = total_price = None
+    if cart is not None and not data.get('items'):
+        cart_lines = cart.get_lines()
+        if not cart_lines:
+            raise CheckoutError('Sepetiniz boş.')
+        lines = [(product_id, quantity) for product_id, (quantity, _) in cart_lines.items()]
+        unit_prices = {product_id: unit_price for product_id, (_, unit_price) in cart_lines.items()}
+        total_price = cart.total
+    else:
+        lines = parse_cart_lines(data.get('items', []))
+    customer = build_customer_data(user, data)
+    payment_method = data.get('payment_method', 'online')
+    if payment_method not in PAYMENT_METHODS:
+        payment_method = 'online'
+
+    with transaction.atomic():
+        products = lock_products([product_id for product_id, _ in lines])
+        if unit_prices is None:
+            unit_prices = get_unit_prices(products)
+        try:
+            reserve_stock(lines)
+        except InsufficientStock as e:
+            raise CheckoutError(str(e), failed_items=e.failures)
+        if total_price is None:
+            # İndirimli toplam
+            total_price = sum(
+                (unit_prices[product_id] * Decimal(quantity) for product_id, quantity in lines), Decimal('0')
+            )
+        coupon, coupon_discount = get_coupon_discount(data.get('coupon_code'), total_price)
+
+        # NOT: order.discount sadece kupon indirimidir (ürün indirimleri total_price'da zaten dahil);
+        # kargo, kapıda ödeme ücreti ve final_price Order.save() içinde hesaplanır
+        order = Order.objects.create(
+            **customer,
+            payment_method=payment_method,
+            total_price=total_price,
+            discount=coupon_discount,
+            coupon=coupon,
+            notes=data.get('notes', ''),
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=products[product_id], price=unit_prices[product_id], quantity=quantity)
+            for product_id, quantity in lines
+        ])
+        create_reservations(order, lines)
+
+        if coupon:
+            try:
+                claim_coupon(coupon, order)
+            except CouponUnavailable as e:
+                raise CheckoutError(str(e))
+
+    return order
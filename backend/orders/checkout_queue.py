@@ -0,0 +1,147 @@
+"""
+Kuyruklu checkout (kampanya dönemlerindeki yoğun trafik için).
+
+CHECKOUT_QUEUE_ENABLED açıkken OrderViewSet.create siparişi HTTP isteği içinde
+oluşturmaz; gunicorn worker'ları aynı ürün satırlarının kilitlerini beklerken
+tükenmesin diye:
+  1. enqueue_checkout : sepet satırları ve teslimat bilgileri doğrulanır, bir
+                        CheckoutRequest kaydı oluşturulur ve istek bir celery
+                        kuyruğuna (checkout.N) gönderilir. İstemci hemen 202 ve
+                        isteğin id'sini alır.
+  2. process_checkout : kuyruğu dinleyen worker siparişi her zamanki gibi
+                        (orders.checkout.place_order) oluşturur ve sonucu kayda yazar.
+  3. İstemci sonucu /api/orders/queue/<id>/ adresinden sorgular. Uç nokta
+     beklemeden yanıt verir; sonuç hazır değilse Retry-After başlığındaki süre
+     (CHECKOUT_STATUS_RETRY_AFTER) sonra yeniden sorulur. Senkron gunicorn
+     worker'larında istek içinde beklemek (long-poll) worker'ları yine tüketirdi.
+
+Kuyruk, sepetteki kampanyalı (indirimli) ürüne göre seçilir; yoksa en küçük ürün
+id'si kullanılır. Aynı kampanya ürününü içeren siparişler böylece aynı kuyruğa
+düşer ve (her kuyruğu tek süreçli bir worker dinlediği için) satır kilidi için
+birbirini beklemeden sırayla işlenir. Checkout hızı HTTP worker sayısıyla değil
+checkout worker sayısıyla belirlenir.
+
+CHECKOUT_QUEUE_TIMEOUT saniye içinde işlenmeyen istekler başarısız sayılır;
+istek kaydının satırı kilitlenerek işlendiği için zaman aşımı ile worker
+arasında yarış olmaz (biri kazanır).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from carts.cart import DatabaseCart, GuestCart
+from products.models import Product
+from .checkout import CheckoutError, build_customer_data, parse_cart_lines, place_order
+from .models import CheckoutRequest
+
+# Kuyruktaki işe aktarılan istek alanları (satırlar ayrıca eklenir)
+PAYLOAD_FIELDS = ('address_id', 'guest_info', 'payment_method', 'coupon_code', 'notes')
+
+TIMEOUT_ERROR = {'error': 'Sipariş zamanında işlenemedi, lütfen tekrar deneyin.', 'status_code': 503}
+
+
+def is_enabled():
+    return getattr(settings, 'CHECKOUT_QUEUE_ENABLED', False)
+
+
+def get_checkout_queue(lines):
+    """Sepet satırlarının gönderileceği kuyruğun adını döndürür"""
+    product_ids = sorted({product_id for product_id, _ in lines})
+    partitions = max(getattr(settings, 'CHECKOUT_QUEUE_PARTITIONS', 1), 1)
+    # Kampanya ürünleri: saklanan indirimli fiyatı liste fiyatından düşük olanlar
+    hot_product_id = (
+        Product.objects.filter(pk__in=product_ids, current_price__lt=F('price'))
+        .order_by('pk').values_list('pk', flat=True).first()
+    )
+    return f'checkout.{(hot_product_id or product_ids[0]) % partitions}'
+
+
+def enqueue_checkout(user, data, cart=None):
+    """
+    Siparişi doğrulayıp kuyruğa alır ve CheckoutRequest kaydını döndürür.
+    Doğrulama hatalarında (boş sepet, eksik bilgiler) CheckoutError fırlatır.
+    """
+    from .tasks import process_checkout_request
+
+    if cart is not None and not data.get('items'):
+        lines = [(product_id, quantity) for product_id, (quantity, _) in cart.get_lines().items()]
+        if not lines:
+            raise CheckoutError('Sepetiniz boş.')
+    else:
+        cart = None
+        lines = parse_cart_lines(data.get('items', []))
+    # Adres / misafir bilgileri istemci beklerken doğrulanır
+    build_customer_data(user, data)
+
+    payload = {field: data.get(field) for field in PAYLOAD_FIELDS if data.get(field) is not None}
+    payload['items'] = [{'product_id': product_id, 'quantity': quantity} for product_id, quantity in lines]
+    checkout_request = CheckoutRequest.objects.create(
+        user=user,
+        queue=get_checkout_queue(lines),
+        payload=payload,
+        from_cart=cart is not None,
+        cart_token=getattr(cart, 'token', None) or '',
+    )
+    request_id, queue = str(checkout_request.pk), checkout_request.queue
+    transaction.on_commit(lambda: process_checkout_request.apply_async(
+        args=[request_id], queue=queue, expires=settings.CHECKOUT_QUEUE_TIMEOUT,
+    ))
+    return checkout_request
+
+
+def get_deadline(checkout_request):
+    return checkout_request.created_at + timedelta(seconds=settings.CHECKOUT_QUEUE_TIMEOUT)
+
+
+def process_checkout(request_id):
+    """
+    Kuyruktaki isteği işler ve kaydı döndürür. İstek daha önce sonuçlandıysa
+    (tekrar teslim edilen mesaj veya zaman aşımı) hiçbir şey yapmadan None döner.
+    """
+    with transaction.atomic():
+        checkout_request = CheckoutRequest.objects.select_for_update().filter(pk=request_id, status='pending').first()
+        if checkout_request is None:
+            return None
+
+        now = timezone.now()
+        if now > get_deadline(checkout_request):
+            checkout_request.status, checkout_request.error = 'failed', TIMEOUT_ERROR
+        else:
+            try:
+                checkout_request.order = place_order(checkout_request.user, checkout_request.payload)
+                checkout_request.status = 'completed'
+            except CheckoutError as e:
+                checkout_request.status = 'failed'
+                checkout_request.error = {**e.as_response_data(), 'status_code': e.status_code}
+        checkout_request.completed_at = now
+        checkout_request.save(update_fields=['status', 'order', 'error', 'completed_at'])
+
+    if checkout_request.status == 'completed' and checkout_request.from_cart:
+        clear_cart(checkout_request)
+    return checkout_request
+
+
+def clear_cart(checkout_request):
+    """Siparişe dönüşen sunucu sepetini boşaltır"""
+    if checkout_request.user_id:
+        cart = DatabaseCart.for_user(checkout_request.user, create=False)
+    else:
+        cart = GuestCart.load(checkout_request.cart_token)
+    if cart is not None:
+        cart.clear()
+
+
+def expire_if_stale(checkout_request):
+    """Süresi içinde işlenmeyen isteği başarısız olarak işaretler"""
+    if checkout_request.status != 'pending' or timezone.now() <= get_deadline(checkout_request):
+        return checkout_request
+    # İstek o anda işleniyorsa UPDATE worker'ın transaction'ını bekler ve durum artık
+    # pending olmadığı için hiçbir satırı değiştirmez
+    CheckoutRequest.objects.filter(pk=checkout_request.pk, status='pending').update(
+        status='failed', error=TIMEOUT_ERROR, completed_at=timezone.now(),
+    )
+    checkout_request.refresh_from_db(fields=['status', 'order', 'error', 'completed_at'])
+    return checkout_request
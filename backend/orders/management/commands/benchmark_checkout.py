@@ -0,0 +1,69 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from orders.checkout import place_order
+from products.models import Category, Product
+
+GUEST_INFO = {
+    'full_name': 'Benchmark Müşteri',
+    'email': 'benchmark@example.com',
+    'phone': '5550000000',
+    'address': 'Benchmark Mah. No: 1',
+    'city': 'İstanbul',
+    'district': 'Kadıköy',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Sipariş oluşturma akışının (orders.checkout.place_order) farklı sepet '
+        'büyüklüklerinde sorgu sayısını ve süresini ölçer. Oluşturulan veriler geri alınır.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lines', type=int, nargs='+', default=[1, 10, 25, 50, 100],
+            help='Ölçülecek sepet satırı sayıları (varsayılan: 1 10 25 50 100)',
+        )
+        parser.add_argument('--repeat', type=int, default=10, help='Her sepet büyüklüğü için tekrar sayısı (varsayılan: 10)')
+
+    def handle(self, *args, **options):
+        # Üretilen veri kalıcı olmasın diye tüm ölçüm tek işlemde yapılıp geri alınır
+        with transaction.atomic():
+            products = self.generate_products(max(options['lines']))
+            for line_count in options['lines']:
+                self.measure(products[:line_count], options['repeat'])
+            transaction.set_rollback(True)
+
+    def generate_products(self, count):
+        category = Category.objects.create(name='Benchmark', slug='benchmark-checkout')
+        return Product.objects.bulk_create([
+            Product(
+                category=category, name=f'Benchmark Ürün {i}', slug=f'benchmark-checkout-{i}',
+                price=Decimal('100.00'), current_price=Decimal('90.00'), stock=1000,
+            )
+            for i in range(count)
+        ])
+
+    def measure(self, products, repeat):
+        data = {
+            'items': [{'product_id': product.pk, 'quantity': 2} for product in products],
+            'guest_info': GUEST_INFO,
+        }
+        durations = []
+        query_counts = set()
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                place_order(None, data)
+                durations.append((time.perf_counter() - start) * 1000)
+            query_counts.add(len(context.captured_queries))
+
+        self.stdout.write(
+            f'{len(products):>4} satır  sorgu={"/".join(str(count) for count in sorted(query_counts))}  '
+            f'ort={statistics.mean(durations):7.2f} ms  en fazla={max(durations):7.2f} ms'
+        )
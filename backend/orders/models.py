@@ -1,9 +1,29 @@
+import uuid
+
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import User
 from products.models import Product
 from coupons.models import Coupon
 from django.utils import timezone
 
+class OrderQuerySet(models.QuerySet):
+    def with_summary_data(self):
+        """
+        Sipariş geçmişi özeti için kalem sayısı, toplam adet ve ilk kalemin ürün
+        bilgilerini tek sorguda ekler; ödeme ve kargo aynı sorguda birleştirilir.
+        """
+        first_item = OrderItem.objects.filter(order=OuterRef('pk')).order_by('id')
+        return self.select_related('payment', 'shipment').annotate(
+            item_count=Count('items'),
+            total_quantity=Sum('items__quantity'),
+            first_item_name=Subquery(first_item.values('product__name')[:1]),
+            first_item_slug=Subquery(first_item.values('product__slug')[:1]),
+            first_item_img_url=Subquery(first_item.values('product__img_url')[:1]),
+        )
+
+
 class Order(models.Model):
     ORDER_STATUS = (
         ('created', 'Oluşturuldu'),
@@ -40,10 +60,16 @@ class Order(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_guest_order = models.BooleanField(default=False)
     guest_email = models.EmailField(blank=True, null=True)
+
+    objects = OrderQuerySet.as_manager()
     
     class Meta:
         verbose_name_plural = 'Siparişler'
         ordering = ('-created_at',)
+        indexes = [
+            # Kullanıcının sipariş geçmişi (created_at, id) keyset sıralamasıyla sayfalanır
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_history_idx'),
+        ]
         
     def __str__(self):
         if self.user:
@@ -140,21 +166,12 @@ class Shipment(models.Model):
         # Kargoya verildiğinde shipped_at alanını otomatik doldur
         if self.status == 'shipped' and not self.shipped_at:
             self.shipped_at = timezone.now()
-            
-            # Siparişin durumunu da güncelle
-            if self.order.status != 'shipped':
-                self.order.status = 'shipped'
-                self.order.save(update_fields=['status'])
                 
         # Teslim edildiğinde delivered_at alanını otomatik doldur
         if self.status == 'delivered' and not self.delivered_at:
             self.delivered_at = timezone.now()
-            
-            # Siparişin durumunu da güncelle
-            if self.order.status != 'delivered':
-                self.order.status = 'delivered'
-                self.order.save(update_fields=['status'])
-                
+        
+        # Siparişin durumu post_save sinyalinde orders.transitions ile tek seferde güncellenir
         super().save(*args, **kwargs)
     
     @property
@@ -208,3 +225,87 @@ class OrderItem(models.Model):
         return self.price * self.quantity
 
 
+
+
+class StockReservation(models.Model):
+    """
+    Sipariş için stoktan düşülmüş adetler. Online ödemeli siparişlerde ayrım
+    expires_at'e kadar geçerlidir; ödeme alınırsa kesinleşir (committed), alınmazsa
+    release_expired_stock_reservations görevi stoğu iade eder (released).
+    """
+    STATUS = (
+        ('active', 'Aktif'),
+        ('committed', 'Kesinleşti'),
+        ('released', 'Serbest Bırakıldı'),
+    )
+
+    order = models.ForeignKey(Order, related_name='stock_reservations', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='stock_reservations', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS, default='active')
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Stok Ayırmaları'
+        indexes = [
+            # Süresi dolan ayırmaları tarayan görev yalnızca aktif kayıtlara bakar
+            models.Index(
+                fields=['expires_at'], condition=models.Q(status='active'),
+                name='reservation_active_expiry_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} - Sipariş {self.order_id} ({self.status})"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Idempotency-Key başlığıyla gelen yazma isteklerinin yanıtları (önbellek
+    kullanılamadığında veya IDEMPOTENCY_STORE='database' iken). Bkz. ecommerce.idempotency
+    """
+    key = models.CharField(max_length=64, unique=True)  # kapsam + kullanıcı + yol + anahtar özeti
+    fingerprint = models.CharField(max_length=64)  # istek gövdesinin özeti
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # boşsa istek hâlâ işleniyor
+    response_data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name_plural = 'Idempotency Kayıtları'
+
+    def __str__(self):
+        return f"{self.key} ({self.status_code or 'işleniyor'})"
+
+
+class CheckoutRequest(models.Model):
+    """
+    Kuyruklu checkout isteği (CHECKOUT_QUEUE_ENABLED). İstemci siparişin sonucunu
+    bu kaydın id'si ile sorgular. Bkz. orders.checkout_queue
+    """
+    STATUS = (
+        ('pending', 'Bekliyor'),
+        ('completed', 'Tamamlandı'),
+        ('failed', 'Başarısız'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='checkout_requests')
+    status = models.CharField(max_length=10, choices=STATUS, default='pending')
+    queue = models.CharField(max_length=50)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)  # doğrulanmış sipariş verisi (satırlar dahil)
+    from_cart = models.BooleanField(default=False)  # sipariş sunucudaki sepetten mi oluşturuldu
+    cart_token = models.CharField(max_length=32, blank=True)  # misafir sepeti anahtarı
+    order = models.OneToOneField(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='checkout_request')
+    error = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Checkout İstekleri'
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
@@ -0,0 +1,108 @@
+"""
+Siparişlere bağlı süreli stok ayırmaları (StockReservation).
+
+Checkout sırasında stok products.inventory.reserve_stock ile düşülür ve her ürün
+için bir ayırma kaydı oluşturulur:
+  - Online ödemeli siparişlerde kayıt STOCK_RESERVATION_TTL_MINUTES dakika
+    geçerlidir (active). Ödeme yönlendirmesi boyunca ürün satırları kilitli tutulmaz.
+  - Kapıda ödemeli siparişlerde ödeme teslimatta alındığı için kayıt doğrudan
+    kesinleşir (committed).
+Sipariş ödendi, kargoya verildi veya teslim edildi durumuna geçtiğinde
+commit_reservations aktif kayıtları kesinleştirir. Süresi dolan kayıtlar
+release_expired_reservations (celery beat görevi) ile toplu olarak stoğa iade edilir.
+Sipariş iptal edilirse release_reservations stoğu geri verir. Her iki çağrı da
+order_status_changed alıcısında yapılır (bkz. orders.signals).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from products.inventory import merge_lines, release_stock, reserve_stock
+from .models import StockReservation
+
+
+def get_reservation_ttl():
+    return timedelta(minutes=getattr(settings, 'STOCK_RESERVATION_TTL_MINUTES', 30))
+
+
+def create_reservations(order, lines):
+    """Stoğu zaten düşülmüş sepet satırları için ayırma kayıtlarını oluşturur"""
+    if order.payment_method == 'online':
+        status, expires_at = 'active', timezone.now() + get_reservation_ttl()
+    else:
+        status, expires_at = 'committed', None
+    return StockReservation.objects.bulk_create([
+        StockReservation(order=order, product_id=product_id, quantity=quantity, status=status, expires_at=expires_at)
+        for product_id, quantity in merge_lines(lines).items()
+    ])
+
+
+def reserve_for_order(order, lines):
+    """Stoğu düşer ve ayırma kayıtlarını oluşturur; stok yetersizse InsufficientStock fırlatır"""
+    with transaction.atomic():
+        reserve_stock(lines)
+        return create_reservations(order, lines)
+
+
+def commit_reservations(order):
+    """
+    Ödemesi alınan siparişin ayırmalarını kalıcı hale getirir. Ödeme gecikip süresi
+    dolmuş (stoğa iade edilmiş) satırlar için stok yeniden düşülür; stok kalmadıysa
+    InsufficientStock fırlatılır.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Önce aktif kayıtlar kesinleştirilir; süpürme görevi aynı kaydı işliyorsa UPDATE
+        # onun kilidini bekler ve kayıt serbest bırakılmışsa aşağıda yeniden ayrılır
+        order.stock_reservations.filter(status='active').update(status='committed', expires_at=None, updated_at=now)
+
+        expired = list(
+            order.stock_reservations.select_for_update().filter(status='released').values_list('pk', 'product_id', 'quantity')
+        )
+        if expired:
+            reserve_stock([(product_id, quantity) for _, product_id, quantity in expired])
+            StockReservation.objects.filter(pk__in=[pk for pk, _, _ in expired]).update(status='committed', updated_at=now)
+
+
+def release_reservations(order):
+    """İptal edilen siparişin stoğunu (aktif veya kesinleşmiş ayırmalar) iade eder"""
+    with transaction.atomic():
+        reservations = list(
+            order.stock_reservations.select_for_update()
+            .filter(status__in=['active', 'committed']).values_list('pk', 'product_id', 'quantity')
+        )
+        if not reservations:
+            return 0
+        release_stock([(product_id, quantity) for _, product_id, quantity in reservations])
+        StockReservation.objects.filter(pk__in=[pk for pk, _, _ in reservations]).update(
+            status='released', updated_at=timezone.now()
+        )
+    return len(reservations)
+
+
+def release_expired_reservations(batch_size=500):
+    """
+    Süresi dolan aktif ayırmaları batch_size'lık gruplar halinde stoğa iade eder ve
+    serbest bırakılan kayıt sayısını döndürür. Başka bir işlemin (ör. ödeme) kilitlediği
+    kayıtlar atlanır.
+    """
+    now = timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(status='active', expires_at__lte=now)
+                .order_by('expires_at')
+                .values_list('pk', 'product_id', 'quantity')[:batch_size]
+            )
+            if not batch:
+                break
+            release_stock([(product_id, quantity) for _, product_id, quantity in batch])
+            StockReservation.objects.filter(pk__in=[pk for pk, _, _ in batch]).update(status='released', updated_at=now)
+        released += len(batch)
+        if len(batch) < batch_size:
+            break
+    return released
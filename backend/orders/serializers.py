@@ -1,8 +1,20 @@
+from django.db.models import Prefetch
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Order, OrderItem, Shipment
+from .models import CheckoutRequest, Order, OrderItem, Shipment
+from products.models import Product
 from products.serializers import ProductSerializer, ProductDetailSerializer
 from coupons.serializers import CouponSerializer
 from payments.models import Payment
+from ecommerce.serializers import SparseFieldsetsMixin
+
+
+def order_items_prefetch(lookup='items'):
+    """Sipariş kalemlerini, iç içe ürün detayının ihtiyaç duyduğu verilerle birlikte yükler"""
+    return Prefetch(lookup, queryset=OrderItem.objects.prefetch_related(
+        Prefetch('product', queryset=Product.objects.with_detail_data())
+    ))
+
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product_detail = ProductDetailSerializer(source='product', read_only=True)
@@ -18,7 +30,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         validated_data['price'] = product.get_current_price()
         return super().create(validated_data)
 
-class ShipmentSerializer(serializers.ModelSerializer):
+class ShipmentSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     formatted_status = serializers.SerializerMethodField()
     formatted_shipping_company = serializers.SerializerMethodField()
     formatted_shipped_at = serializers.SerializerMethodField()
@@ -37,6 +49,16 @@ class ShipmentSerializer(serializers.ModelSerializer):
             'formatted_delivered_at', 'notes'
         ]
         read_only_fields = ['order', 'shipped_at', 'delivered_at']
+
+    field_requirements = {
+        'formatted_status': {'only': ('status',)},
+        'status_description': {'only': ('status',)},
+        'formatted_shipping_company': {'only': ('shipping_company',)},
+        'tracking_url': {'only': ('tracking_url', 'tracking_number', 'shipping_company')},
+        'formatted_shipped_at': {'only': ('shipped_at',)},
+        'formatted_delivered_at': {'only': ('delivered_at',)},
+        'formatted_estimated_delivery': {'only': ('estimated_delivery',)},
+    }
         
     def get_formatted_status(self, obj):
         status_mapping = dict(Shipment.SHIPMENT_STATUS)
@@ -80,7 +102,7 @@ class ShipmentSerializer(serializers.ModelSerializer):
             return obj.tracking_url
         return obj.get_tracking_url()
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     coupon_detail = CouponSerializer(source='coupon', read_only=True)
     user_username = serializers.ReadOnlyField(source='user.username')
@@ -101,6 +123,17 @@ class OrderSerializer(serializers.ModelSerializer):
                   'formatted_created_at', 'notes', 'payment_info', 'shipment_info',
                   'shipment_tracking_info']
         read_only_fields = ['user', 'discount', 'shipping_cost', 'cod_fee', 'final_price']
+
+    field_requirements = {
+        'items': {'prefetch_related': (order_items_prefetch(),)},
+        'user_username': {'select_related': ('user',), 'only': ()},
+        'formatted_created_at': {'only': ('created_at',)},
+        'formatted_status': {'only': ('status',)},
+        'formatted_payment_method': {'only': ('payment_method',)},
+        'payment_info': {'select_related': ('payment',), 'only': ()},
+        'shipment_info': {'select_related': ('shipment',), 'only': ()},
+        'shipment_tracking_info': {'select_related': ('shipment',), 'only': ()},
+    }
         
     def get_formatted_payment_method(self, obj):
         payment_mapping = dict(Order.PAYMENT_METHODS)
@@ -117,7 +150,7 @@ class OrderSerializer(serializers.ModelSerializer):
     def get_payment_info(self, obj):
         """Sipariş için ödeme bilgisini döndürür."""
         try:
-            payment = Payment.objects.filter(order=obj).first()
+            payment = obj.payment
             if payment:
                 return {
                     'id': payment.id,
@@ -128,6 +161,8 @@ class OrderSerializer(serializers.ModelSerializer):
                     'date': payment.payment_date.strftime('%d.%m.%Y %H:%M') if payment.payment_date else None,
                 }
             return None
+        except Payment.DoesNotExist:
+            return None
         except Exception:
             return None
         
@@ -189,6 +224,93 @@ class OrderSerializer(serializers.ModelSerializer):
         # Order.save() metodu tüm hesaplamaları otomatik yapar
         return super().update(instance, validated_data)
 
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """
+    Sipariş geçmişi listesi için hafif özet. Order.objects.with_summary_data()
+    ile yüklenen sorgu kümesi beklenir; kalemler ve ürün detayları yüklenmez.
+    """
+    formatted_created_at = serializers.SerializerMethodField()
+    formatted_status = serializers.SerializerMethodField()
+    item_count = serializers.IntegerField(read_only=True)
+    total_quantity = serializers.SerializerMethodField()
+    first_item = serializers.SerializerMethodField()
+    payment_status = serializers.SerializerMethodField()
+    shipment_status = serializers.SerializerMethodField()
+    tracking_number = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Order
+        fields = ['id', 'status', 'formatted_status', 'payment_method', 'total_price', 'discount',
+                  'shipping_cost', 'cod_fee', 'final_price', 'item_count', 'total_quantity',
+                  'first_item', 'payment_status', 'shipment_status', 'tracking_number',
+                  'created_at', 'formatted_created_at']
+        read_only_fields = fields
+
+    def get_formatted_created_at(self, obj):
+        return obj.created_at.strftime('%d.%m.%Y %H:%M')
+
+    def get_formatted_status(self, obj):
+        return dict(Order.ORDER_STATUS).get(obj.status, obj.status)
+
+    def get_total_quantity(self, obj):
+        return obj.total_quantity or 0
+
+    def get_first_item(self, obj):
+        """İlk kalemin ürün adı ve görseli (liste küçük resmi için)"""
+        if not obj.first_item_name:
+            return None
+        return {
+            'product_name': obj.first_item_name,
+            'product_slug': obj.first_item_slug,
+            'img_url': obj.first_item_img_url,
+        }
+
+    def get_payment_status(self, obj):
+        try:
+            return obj.payment.status
+        except Payment.DoesNotExist:
+            return None
+
+    def get_shipment_status(self, obj):
+        try:
+            return obj.shipment.status
+        except Shipment.DoesNotExist:
+            return None
+
+    def get_tracking_number(self, obj):
+        try:
+            return obj.shipment.tracking_number
+        except Shipment.DoesNotExist:
+            return None
+
+class CheckoutRequestSerializer(serializers.ModelSerializer):
+    """
+    Kuyruklu checkout isteğinin durumu. Sipariş oluştuysa sipariş, başarısız
+    olduysa senkron checkout'taki hata yanıtı (error, failed_items, ...) döner.
+    """
+    order = serializers.SerializerMethodField()
+    error = serializers.SerializerMethodField()
+    status_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CheckoutRequest
+        fields = ['id', 'status', 'order', 'error', 'status_url', 'created_at', 'completed_at']
+        read_only_fields = fields
+
+    def get_status_url(self, obj):
+        return reverse('checkout-request', args=[obj.pk])
+
+    def get_order(self, obj):
+        if obj.order_id is None:
+            return None
+        return OrderSerializer(obj.order, context=self.context).data
+
+    def get_error(self, obj):
+        if not obj.error:
+            return None
+        return {key: value for key, value in obj.error.items() if key != 'status_code'}
+
+
 class OrderItemCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
@@ -1,69 +1,79 @@
+import logging
+
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.db import transaction
+from coupons.redemptions import release_coupon
+from products.inventory import InsufficientStock
 from .models import Order, Shipment
+from .reservations import commit_reservations, release_reservations
+from .transitions import InvalidTransition, can_transition, order_status_changed, transition
 from users.tasks import send_order_created_email, send_order_shipped_email, send_payment_confirmed_email
 
+logger = logging.getLogger(__name__)
+
+# Kargo durumlarının sipariş üzerindeki karşılıkları
+SHIPMENT_ORDER_STATUS = {
+    'shipped': 'shipped',
+    'delivered': 'delivered',
+}
+
+
+def _user_id(order):
+    # Kullanıcı varsa user_id, yoksa 0 (misafir sipariş olduğunu belirtmek için)
+    return order.user_id or 0
+
+
 @receiver(post_save, sender=Order)
-def handle_order_status_change(sender, instance, created, **kwargs):
+def handle_order_created(sender, instance, created, **kwargs):
+    """Yeni sipariş için onay e-postasını gönderir (durum değişiklikleri transitions üzerinden gelir)"""
+    if created:
+        order_id, user_id = instance.id, _user_id(instance)
+        transaction.on_commit(lambda: send_order_created_email.delay(order_id, user_id))
+
+
+@receiver(order_status_changed, sender=Order)
+def handle_order_status_change(sender, order, previous_status, status, **kwargs):
     """
-    Sipariş durum değişikliklerini izler ve gerekli e-postaları gönderir
+    Her durum geçişi için bir kez çağrılır ve gerekli e-postaları kuyruğa alır
     """
-    # Yeni sipariş oluşturulduğunda
-    if created:
-        # Kullanıcı varsa user_id, yoksa 0 (misafir sipariş olduğunu belirtmek için)
-        user_id = instance.user.id if instance.user else 0
-        transaction.on_commit(lambda: send_order_created_email.delay(instance.id, user_id))
-        return
-    
-    # Daha önce var olan siparişler için statüs değişikliklerini izle
-    try:
-        # Önbellekten değil, veritabanından mevcut durumu al
-        if 'update_fields' in kwargs and kwargs['update_fields'] is not None and 'status' not in kwargs['update_fields']:
-            # Eğer status alanı güncellenmediyse, hiçbir şey yapma
-            return
-            
-        # Sipariş ödendi olarak işaretlendiyse
-        if instance.status == 'paid':
-            # Kullanıcı varsa user_id, yoksa 0 (misafir sipariş olduğunu belirtmek için)
-            user_id = instance.user.id if instance.user else 0
-            transaction.on_commit(lambda: send_payment_confirmed_email.delay(instance.id, user_id))
-            
-    except Exception as e:
-        # Hata durumunda loglama yapmak için
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Sipariş durum değişikliği sinyali işlenirken hata: {str(e)}")
+    order_id, user_id = order.id, _user_id(order)
+    if status == 'paid':
+        transaction.on_commit(lambda: send_payment_confirmed_email.delay(order_id, user_id))
+    elif status == 'shipped':
+        transaction.on_commit(lambda: send_order_shipped_email.delay(order_id, user_id))
+
+
+@receiver(order_status_changed, sender=Order)
+def handle_order_reservations(sender, order, previous_status, status, **kwargs):
+    """
+    Ödenen, kargoya verilen veya teslim edilen siparişin stok ayırmalarını kesinleştirir
+    (süresi dolanlar yeniden düşülür, stok yoksa InsufficientStock); iptal edilen
+    siparişin stoğunu ve kupon kullanımını iade eder. API, ödeme, admin ve kargo
+    yollarının hepsi transition() üzerinden buraya gelir.
+    """
+    if status in ('paid', 'shipped', 'delivered'):
+        commit_reservations(order)
+    elif status == 'cancelled':
+        release_reservations(order)
+        release_coupon(order)
+
 
 @receiver(post_save, sender=Shipment)
 def handle_shipment_status_change(sender, instance, created, **kwargs):
     """
-    Kargo durum değişikliklerini izler ve gerekli e-postaları gönderir
+    Kargo kargoya verildi / teslim edildi durumuna geldiğinde siparişin durumunu da ilerletir
     """
+    status = SHIPMENT_ORDER_STATUS.get(instance.status)
+    if status is None:
+        return
+
+    order = instance.order
+    if order.status == status or not can_transition(order, status):
+        return
     try:
-        # Yeni kargo oluşturulduğunda veya güncellenmesinde, durumu 'shipped' ise
-        if instance.status == 'shipped':
-            # Kargoyla ilişkili siparişin durumunu güncelle
-            order = instance.order
-            # Sipariş durumu zaten shipped değilse güncelle
-            if order.status != 'shipped':
-                order.status = 'shipped'
-                order.save(update_fields=['status'])
-                
-            # E-posta gönderimi - kullanıcı varsa user_id, yoksa 0
-            user_id = order.user.id if order.user else 0
-            transaction.on_commit(lambda: send_order_shipped_email.delay(order.id, user_id))
-            
-        # Kargo teslim edildi olarak işaretlendiyse
-        elif instance.status == 'delivered':
-            # Siparişin durumunu güncelle
-            order = instance.order
-            if order.status != 'delivered':
-                order.status = 'delivered'
-                order.save(update_fields=['status'])
-            
-    except Exception as e:
-        # Hata durumunda loglama yapmak için
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Kargo durum değişikliği sinyali işlenirken hata: {str(e)}") 
\ No newline at end of file
+        transition(order, status)
+    except (InvalidTransition, InsufficientStock) as e:
+        # Sipariş bu arada başka bir istekle değiştirildiyse veya süresi dolan ayırmalar
+        # yeniden düşülemediyse kargo kaydı yine de saklanır
+        logger.warning(f"Kargo #{instance.id} sipariş durumuna yansıtılamadı: {str(e)}")
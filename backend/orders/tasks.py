@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.utils import timezone
+from .checkout_queue import process_checkout
+from .models import CheckoutRequest, IdempotencyRecord
+from .reservations import release_expired_reservations
+
+
+@shared_task
+def release_expired_stock_reservations():
+    """Ödemesi süresi içinde alınmayan siparişlerin stok ayırmalarını stoğa iade eder."""
+    released = release_expired_reservations()
+    return f"{released} süresi dolan stok ayırması serbest bırakıldı."
+
+
+@shared_task
+def purge_expired_idempotency_records():
+    """Saklama süresi dolan Idempotency-Key kayıtlarını siler."""
+    deleted, _ = IdempotencyRecord.objects.filter(expires_at__lte=timezone.now()).delete()
+    return f"{deleted} süresi dolan idempotency kaydı silindi."
+
+
+@shared_task(acks_late=True)
+def process_checkout_request(request_id):
+    """
+    Kuyruklu checkout isteğinden siparişi oluşturur. checkout.N kuyruklarından
+    çalıştırılır (bkz. orders.checkout_queue); worker işin ortasında ölürse mesaj
+    yeniden teslim edilir, istek kaydı kilitlenerek işlendiği için sipariş iki kez oluşmaz.
+    """
+    checkout_request = process_checkout(request_id)
+    if checkout_request is None:
+        return f"Checkout isteği {request_id} daha önce sonuçlanmış."
+    return f"Checkout isteği {request_id}: {checkout_request.status}"
+
+
+@shared_task
+def purge_checkout_requests(days=7):
+    """Sonuçlanalı belirtilen günden fazla olan kuyruklu checkout isteklerini siler."""
+    deleted, _ = CheckoutRequest.objects.exclude(status='pending').filter(
+        created_at__lt=timezone.now() - timedelta(days=days),
+    ).delete()
+    return f"{deleted} eski checkout isteği silindi."
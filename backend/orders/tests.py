@@ -1,3 +1,638 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from coupons.models import Coupon
+from ecommerce.idempotency import CacheStore, build_fingerprint, build_storage_key
+from payments.models import Payment
+from products.models import Category, Discount, Product, ProductReview
+from .models import CheckoutRequest, IdempotencyRecord, Order, OrderItem, Shipment, StockReservation
+from .reservations import release_expired_reservations
+from .tasks import process_checkout_request, release_expired_stock_reservations
+from .transitions import InvalidTransition, transition
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'orders-tests'}}
+
+
+@override_settings(CACHES=NO_CACHE)
+class OrderSparseFieldsetsTests(TestCase):
+    """Sipariş listesinde ?fields= / ?omit= yalnızca istenen verileri yüklemeli"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='musteri', password='sifre12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        products = [
+            Product.objects.create(category=category, name=f'Ürün {i}', slug=f'urun-{i}', price=Decimal('100.00'), stock=10)
+            for i in range(3)
+        ]
+        for product in products:
+            ProductReview.objects.create(product=product, user=self.user, review='Güzel')
+        for _ in range(3):
+            order = Order.objects.create(
+                user=self.user, first_name='Ayşe', last_name='Yılmaz', email='ayse@example.com',
+                address='Adres', city='İstanbul', phone_number='5550000000', total_price=Decimal('300.00'),
+            )
+            for product in products:
+                OrderItem.objects.create(order=order, product=product, price=product.price, quantity=1)
+
+    def get(self, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/orders/', params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_full_list_query_count_is_constant(self):
+        _, small = self.get()
+        order = Order.objects.first()
+        for item in order.items.all():
+            OrderItem.objects.create(order=order, product=item.product, price=item.price, quantity=2)
+        response, large = self.get()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['results'][0]['items'][0]['product_detail']['reviews']), 1)
+
+    def test_fields_limits_payload_and_queries(self):
+        _, full = self.get()
+        response, sparse = self.get({'fields': 'id,status,final_price,formatted_created_at'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status', 'final_price', 'formatted_created_at'})
+        self.assertLess(sparse, full)
+
+    def test_omit_skips_items(self):
+        response, _ = self.get({'omit': 'items,payment_info'})
+        order = response.data['results'][0]
+        self.assertNotIn('items', order)
+        self.assertNotIn('payment_info', order)
+        self.assertIn('shipment_info', order)
+
+
+@override_settings(CACHES=NO_CACHE)
+class CheckoutTests(TestCase):
+    """orders.checkout.place_order ile sipariş oluşturma"""
+
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.products = [
+            Product.objects.create(category=category, name=f'Ürün {i}', slug=f'urun-{i}', price=Decimal('100.00'), stock=50)
+            for i in range(30)
+        ]
+        self.guest_info = {
+            'full_name': 'Ayşe Yılmaz', 'email': 'ayse@example.com', 'phone': '5550000000',
+            'address': 'Adres', 'city': 'İstanbul', 'district': 'Kadıköy',
+        }
+
+    def checkout(self, items, **extra):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/orders/', {'items': items, 'guest_info': self.guest_info, **extra}, format='json')
+        return response, context.captured_queries
+
+    def test_query_count_is_independent_of_cart_size(self):
+        _, small = self.checkout([{'product_id': self.products[0].pk, 'quantity': 1}])
+        response, large = self.checkout([{'product_id': product.pk, 'quantity': 2} for product in self.products])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(response.data['items']), 30)
+        self.assertEqual(Decimal(response.data['total_price']), Decimal('6000.00'))
+
+        # Ürünler birincil anahtar sırasıyla tek sorguda kilitlenir, kalemler tek INSERT ile yazılır
+        locks = [query['sql'] for query in large if 'FOR UPDATE' in query['sql']]
+        self.assertEqual(len(locks), 1)
+        self.assertIn('ORDER BY "products_product"."id" ASC', locks[0])
+        self.assertEqual(sum('INSERT INTO "orders_orderitem"' in query['sql'] for query in large), 1)
+
+    def test_discount_and_coupon(self):
+        today = timezone.now().date()
+        Discount.objects.create(
+            product=self.products[0], discount_percentage=Decimal('10.00'),
+            start_date=today - timedelta(days=1), end_date=today + timedelta(days=1),
+        )
+        coupon = Coupon.objects.create(
+            code='YAZ10', discount_type='percentage', discount_value=Decimal('10.00'), max_usage=5,
+            valid_from=timezone.now() - timedelta(days=1), valid_to=timezone.now() + timedelta(days=1),
+        )
+        response, _ = self.checkout(
+            [{'product_id': self.products[0].pk, 'quantity': 2}, {'product_id': self.products[1].pk, 'quantity': 1}],
+            coupon_code='YAZ10',
+        )
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual(order.total_price, Decimal('280.00'))
+        self.assertEqual(order.discount, Decimal('28.00'))
+        self.assertEqual(order.coupon, coupon)
+        self.assertEqual(sorted(order.items.values_list('price', flat=True)), [Decimal('90.00'), Decimal('100.00')])
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.usage_count, 1)
+
+    def test_unknown_product_creates_nothing(self):
+        response, _ = self.checkout([{'product_id': self.products[0].pk}, {'product_id': 999999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Ürün bulunamadı: 999999')
+        self.assertFalse(Order.objects.exists())
+
+    def test_guest_missing_fields(self):
+        self.guest_info.pop('city')
+        response, _ = self.checkout([{'product_id': self.products[0].pk}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['missing_fields'], ['city'])
+
+    def test_checkout_reserves_stock(self):
+        response, _ = self.checkout([{'product_id': self.products[0].pk, 'quantity': 3}])
+        self.assertEqual(response.status_code, 201)
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].stock, 47)
+
+    def test_insufficient_stock_reports_lines(self):
+        response, _ = self.checkout([
+            {'product_id': self.products[0].pk, 'quantity': 1},
+            {'product_id': self.products[1].pk, 'quantity': 51},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['failed_items'], [{'product_id': self.products[1].pk, 'requested': 51, 'available': 50}])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 50)
+
+    def test_cancel_releases_stock(self):
+        response, _ = self.checkout([{'product_id': self.products[0].pk, 'quantity': 2}])
+        order = Order.objects.get(pk=response.data['id'])
+        order.user = User.objects.create_user(username='musteri', password='sifre12345')
+        order.save()
+        self.client.force_authenticate(order.user)
+        response = self.client.post(f'/api/orders/{order.pk}/cancel_order/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 50)
+        self.assertEqual(set(order.stock_reservations.values_list('status', flat=True)), {'released'})
+
+
+@override_settings(CACHES=NO_CACHE, STOCK_RESERVATION_TTL_MINUTES=30)
+class StockReservationTests(TestCase):
+    """Checkout'ta oluşturulan süreli stok ayırmaları"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='yonetici', password='sifre12345', is_staff=True)
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.products = [
+            Product.objects.create(category=category, name=f'Ürün {i}', slug=f'urun-{i}', price=Decimal('100.00'), stock=10)
+            for i in range(2)
+        ]
+        self.guest_info = {
+            'full_name': 'Ayşe Yılmaz', 'email': 'ayse@example.com', 'phone': '5550000000',
+            'address': 'Adres', 'city': 'İstanbul', 'district': 'Kadıköy',
+        }
+
+    def checkout(self, payment_method='online'):
+        response = self.client.post('/api/orders/', {
+            'items': [{'product_id': self.products[0].pk, 'quantity': 3}, {'product_id': self.products[1].pk, 'quantity': 1}],
+            'guest_info': self.guest_info,
+            'payment_method': payment_method,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(pk=response.data['id'])
+
+    def expire(self, order):
+        order.stock_reservations.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+    def stocks(self):
+        return [Product.objects.get(pk=product.pk).stock for product in self.products]
+
+    def mark_as_paid(self, order):
+        # Sipariş listesi kullanıcının kendi siparişleriyle sınırlıdır
+        Order.objects.filter(pk=order.pk).update(user=self.admin)
+        self.client.force_authenticate(self.admin)
+        return self.client.post(f'/api/orders/{order.pk}/mark_as_paid/')
+
+    def test_online_order_reservation_expires(self):
+        before = timezone.now()
+        order = self.checkout()
+        reservations = list(order.stock_reservations.order_by('product_id'))
+        self.assertEqual([(r.product_id, r.quantity, r.status) for r in reservations], [
+            (self.products[0].pk, 3, 'active'), (self.products[1].pk, 1, 'active'),
+        ])
+        self.assertGreaterEqual(reservations[0].expires_at, before + timedelta(minutes=30))
+        self.assertEqual(self.stocks(), [7, 9])
+
+    def test_cash_on_delivery_is_committed(self):
+        order = self.checkout('cash_on_delivery')
+        self.assertEqual(set(order.stock_reservations.values_list('status', 'expires_at')), {('committed', None)})
+        self.expire(order)
+        self.assertEqual(release_expired_reservations(), 0)
+        self.assertEqual(self.stocks(), [7, 9])
+
+    def test_sweeper_releases_only_expired(self):
+        expired = self.checkout()
+        live = self.checkout()
+        self.expire(expired)
+        self.assertEqual(release_expired_stock_reservations(), '2 süresi dolan stok ayırması serbest bırakıldı.')
+        self.assertEqual(set(expired.stock_reservations.values_list('status', flat=True)), {'released'})
+        self.assertEqual(set(live.stock_reservations.values_list('status', flat=True)), {'active'})
+        self.assertEqual(self.stocks(), [7, 9])
+
+    def test_sweeper_batches(self):
+        for _ in range(3):
+            self.expire(self.checkout())
+        self.assertEqual(release_expired_reservations(batch_size=4), 6)
+        self.assertEqual(self.stocks(), [10, 10])
+
+    def test_paid_order_is_committed(self):
+        order = self.checkout()
+        response = self.mark_as_paid(order)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(order.stock_reservations.values_list('status', 'expires_at')), {('committed', None)})
+        self.expire(order)
+        self.assertEqual(release_expired_reservations(), 0)
+        self.assertEqual(self.stocks(), [7, 9])
+
+    def test_payment_after_expiry_reserves_again(self):
+        order = self.checkout()
+        self.expire(order)
+        release_expired_reservations()
+        response = self.mark_as_paid(order)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(order.stock_reservations.values_list('status', flat=True)), {'committed'})
+        self.assertEqual(self.stocks(), [7, 9])
+
+    def test_payment_after_expiry_without_stock(self):
+        order = self.checkout()
+        self.expire(order)
+        release_expired_reservations()
+        Product.objects.filter(pk=self.products[0].pk).update(stock=2)
+        response = self.mark_as_paid(order)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['failed_items'], [{'product_id': self.products[0].pk, 'requested': 3, 'available': 2}])
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'created')
+        self.assertEqual(self.stocks(), [2, 10])
+
+    def test_payment_endpoint_commits(self):
+        order = self.checkout()
+        Order.objects.filter(pk=order.pk).update(user=self.admin)
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/payments/', {'order_id': order.pk, 'payment_method': 'credit_card'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(set(order.stock_reservations.values_list('status', flat=True)), {'committed'})
+
+    def test_shipped_order_is_committed(self):
+        # Online ödemeli sipariş ödeme alınmadan kargoya verilebilir
+        order = self.checkout()
+        Shipment.objects.create(order=order, status='shipped')
+        self.assertEqual(Order.objects.get(pk=order.pk).status, 'shipped')
+        self.expire(order)
+        self.assertEqual(release_expired_reservations(), 0)
+        self.assertEqual(self.stocks(), [7, 9])
+
+    def test_cancel_outside_api_releases_stock(self):
+        # Admin paneli gibi doğrudan transition() kullanan yollar
+        order = self.checkout()
+        transition(order, 'cancelled')
+        self.assertEqual(set(order.stock_reservations.values_list('status', flat=True)), {'released'})
+        self.assertEqual(self.stocks(), [10, 10])
+
+
+@override_settings(CACHES=LOCAL_CACHE, IDEMPOTENCY_STORE='cache')
+class IdempotencyTests(TestCase):
+    """Idempotency-Key ile tekrarlanan sipariş ve ödeme istekleri"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='musteri', password='sifre12345')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.product = Product.objects.create(category=category, name='Ürün', slug='urun', price=Decimal('100.00'), stock=10)
+        self.payload = {
+            'items': [{'product_id': self.product.pk, 'quantity': 2}],
+            'guest_info': {
+                'full_name': 'Ayşe Yılmaz', 'email': 'ayse@example.com', 'phone': '5550000000',
+                'address': 'Adres', 'city': 'İstanbul', 'district': 'Kadıköy',
+            },
+        }
+
+    def create_order(self, key=None, payload=None):
+        self.client.force_authenticate(None)
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post('/api/orders/', payload or self.payload, format='json', **headers)
+
+    def test_retry_replays_response(self):
+        first = self.create_order('siparis-1')
+        retry = self.create_order('siparis-1')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 8)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.create_order()
+        self.create_order()
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_key_reused_with_different_body(self):
+        self.create_order('siparis-1')
+        self.payload['items'][0]['quantity'] = 3
+        response = self.create_order('siparis-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_request_in_progress(self):
+        # İlk istek henüz tamamlanmamışken gelen tekrar işlenmez
+        request = SimpleNamespace(user=AnonymousUser(), path='/api/orders/', method='POST', data=self.payload)
+        CacheStore().begin(build_storage_key('orders.create', request, 'siparis-1'), build_fingerprint(request))
+        response = self.create_order('siparis-1')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(IDEMPOTENCY_STORE='database')
+    def test_database_store(self):
+        first = self.create_order('siparis-1')
+        retry = self.create_order('siparis-1')
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Order.objects.count(), 1)
+        record = IdempotencyRecord.objects.get()
+        self.assertEqual(record.status_code, 201)
+
+    def test_payment_retry_creates_single_payment(self):
+        order = Order.objects.get(pk=self.create_order().data['id'])
+        Order.objects.filter(pk=order.pk).update(user=self.user)
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            response = self.client.post(
+                '/api/payments/', {'order_id': order.pk, 'payment_method': 'credit_card'},
+                format='json', HTTP_IDEMPOTENCY_KEY='odeme-1',
+            )
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(Payment.objects.filter(order=order).count(), 1)
+
+
+@override_settings(CACHES=NO_CACHE)
+@mock.patch('orders.signals.send_order_shipped_email')
+@mock.patch('orders.signals.send_payment_confirmed_email')
+class OrderTransitionTests(TestCase):
+    """Her durum geçişi tek UPDATE, tek olay ve tek e-posta görevi üretmeli"""
+
+    def setUp(self):
+        self.admin = User.objects.create_user(username='yonetici', password='sifre12345', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.order = Order.objects.create(
+            user=self.admin, first_name='Ayşe', last_name='Yılmaz', email='ayse@example.com',
+            address='Adres', city='İstanbul', phone_number='5550000000', total_price=Decimal('200.00'),
+        )
+
+    def post(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, data or {}, format='json')
+        order_writes = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "orders_order"')]
+        return response, order_writes
+
+    def test_mark_as_paid(self, paid_email, shipped_email):
+        response, writes = self.post(f'/api/orders/{self.order.pk}/mark_as_paid/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(writes), 1)
+        paid_email.delay.assert_called_once_with(self.order.pk, self.admin.pk)
+        shipped_email.delay.assert_not_called()
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'paid')
+
+    def test_shipment_lifecycle(self, paid_email, shipped_email):
+        transition(self.order, 'paid')
+        response, writes = self.post('/api/shipments/', {'order_id': self.order.pk})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(writes, [])
+
+        shipment = Shipment.objects.get(order=self.order)
+        response, writes = self.post(f'/api/shipments/{shipment.pk}/mark_as_shipped/', {'tracking_number': '123'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(writes), 1)
+        shipped_email.delay.assert_called_once_with(self.order.pk, self.admin.pk)
+
+        # Kargo bilgisi güncellemesi siparişe yeniden yazılmaz ve e-postayı tekrarlamaz
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/shipments/{shipment.pk}/', {'tracking_number': '456'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(shipped_email.delay.call_count, 1)
+
+        response, writes = self.post(f'/api/shipments/{shipment.pk}/mark_as_delivered/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(writes), 1)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, 'delivered')
+        self.assertEqual(shipped_email.delay.call_count, 1)
+
+    def test_payment_marks_order_paid_once(self, paid_email, shipped_email):
+        response, writes = self.post('/api/payments/', {'order_id': self.order.pk, 'payment_method': 'cash_on_delivery'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(len(writes), 1)
+        paid_email.delay.assert_called_once()
+
+    def test_invalid_transition(self, paid_email, shipped_email):
+        transition(self.order, 'cancelled')
+        with self.assertRaises(InvalidTransition):
+            transition(self.order, 'paid')
+
+    def test_stale_order_is_rejected(self, paid_email, shipped_email):
+        stale = Order.objects.get(pk=self.order.pk)
+        transition(self.order, 'cancelled')
+        with self.assertRaises(InvalidTransition):
+            transition(stale, 'paid')
+        self.assertEqual(stale.status, 'cancelled')
+        paid_email.delay.assert_not_called()
+
+
+@override_settings(CACHES=NO_CACHE)
+class OrderHistoryTests(TestCase):
+    """Sayfalı ve özet sipariş geçmişi"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='musteri', password='sifre12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.products = [
+            Product.objects.create(
+                category=category, name=f'Ürün {i}', slug=f'urun-{i}', img_url=f'/img/{i}.jpg',
+                price=Decimal('100.00'), stock=10,
+            )
+            for i in range(3)
+        ]
+
+    def create_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(
+                user=self.user, first_name='Ayşe', last_name='Yılmaz', email='ayse@example.com',
+                address='Adres', city='İstanbul', phone_number='5550000000', total_price=Decimal('300.00'),
+            )
+            for index, product in enumerate(self.products):
+                OrderItem.objects.create(order=order, product=product, price=product.price, quantity=index + 1)
+            Payment.objects.create(order=order, amount=order.final_price, payment_method='credit_card', status='completed')
+            Shipment.objects.create(order=order, tracking_number=f'T{order.pk}')
+
+    def get(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_summary_fields(self):
+        self.create_orders(1)
+        response, _ = self.get('/api/orders/history/')
+        self.assertEqual(response.data['count'], 1)
+        summary = response.data['results'][0]
+        self.assertNotIn('items', summary)
+        self.assertEqual(summary['item_count'], 3)
+        self.assertEqual(summary['total_quantity'], 6)
+        self.assertEqual(summary['first_item'], {'product_name': 'Ürün 0', 'product_slug': 'urun-0', 'img_url': '/img/0.jpg'})
+        self.assertEqual(summary['payment_status'], 'completed')
+        self.assertEqual(summary['shipment_status'], 'preparing')
+        self.assertEqual(summary['tracking_number'], f'T{summary["id"]}')
+
+    def test_history_is_paginated_with_constant_queries(self):
+        self.create_orders(2)
+        _, small = self.get('/api/orders/history/')
+        self.create_orders(13)
+        response, large = self.get('/api/orders/history/')
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 10)
+
+        response, _ = self.get('/api/orders/history/', {'pagination': 'cursor', 'page_size': 5})
+        self.assertNotIn('count', response.data)
+        ids = [order['id'] for order in response.data['results']]
+        self.assertEqual(ids, list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)[:5]))
+
+    def test_list_has_no_per_order_payment_queries(self):
+        self.create_orders(1)
+        _, small = self.get('/api/orders/')
+        self.create_orders(4)
+        response, large = self.get('/api/orders/')
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(response.data['results'][0]['payment_info']['status'], 'completed')
+
+
+@override_settings(
+    CACHES=LOCAL_CACHE, CHECKOUT_QUEUE_ENABLED=True, CHECKOUT_QUEUE_PARTITIONS=2,
+    CHECKOUT_QUEUE_TIMEOUT=120, CHECKOUT_STATUS_RETRY_AFTER=2,
+)
+class CheckoutQueueTests(TestCase):
+    """Kuyruklu checkout (CHECKOUT_QUEUE_ENABLED)"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.cheese = Product.objects.create(category=category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('200.00'), stock=5)
+        self.butter = Product.objects.create(category=category, name='Tereyağı', slug='tereyagi', price=Decimal('50.00'), stock=5)
+        self.guest_info = {
+            'full_name': 'Ayşe Yılmaz', 'email': 'ayse@example.com', 'phone': '5550000000',
+            'address': 'Adres', 'city': 'İstanbul', 'district': 'Kadıköy',
+        }
+
+    def enqueue(self, items=None, **headers):
+        data = {'guest_info': self.guest_info}
+        if items is not None:
+            data['items'] = items
+        with mock.patch('orders.tasks.process_checkout_request.apply_async') as apply_async:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post('/api/orders/', data, format='json', **headers)
+        return response, apply_async
+
+    def test_order_is_created_by_worker(self):
+        response, apply_async = self.enqueue([{'product_id': self.cheese.pk, 'quantity': 2}])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(response['Location'], f'/api/orders/queue/{response.data["id"]}/')
+        self.assertFalse(Order.objects.exists())
+
+        request_id = response.data['id']
+        apply_async.assert_called_once_with(args=[request_id], queue=f'checkout.{self.cheese.pk % 2}', expires=120)
+        self.assertEqual(process_checkout_request(request_id), f"Checkout isteği {request_id}: completed")
+        # Tekrar teslim edilen mesaj ikinci bir sipariş oluşturmaz
+        process_checkout_request(request_id)
+
+        response = self.client.get(f'/api/orders/queue/{request_id}/')
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(Decimal(response.data['order']['total_price']), Decimal('400.00'))
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(Product.objects.get(pk=self.cheese.pk).stock, 3)
+
+    def test_campaign_product_selects_queue(self):
+        today = timezone.now().date()
+        Discount.objects.create(
+            product=self.butter, discount_percentage=Decimal('20.00'),
+            start_date=today - timedelta(days=1), end_date=today + timedelta(days=1),
+        )
+        _, apply_async = self.enqueue([{'product_id': self.cheese.pk}, {'product_id': self.butter.pk}])
+        self.assertEqual(apply_async.call_args.kwargs['queue'], f'checkout.{self.butter.pk % 2}')
+
+    def test_validation_errors_are_returned_immediately(self):
+        self.guest_info.pop('city')
+        response, apply_async = self.enqueue([{'product_id': self.cheese.pk}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['missing_fields'], ['city'])
+        self.assertFalse(CheckoutRequest.objects.exists())
+        apply_async.assert_not_called()
+
+    def test_insufficient_stock_is_reported_in_status(self):
+        response, _ = self.enqueue([{'product_id': self.cheese.pk, 'quantity': 6}])
+        process_checkout_request(response.data['id'])
+        response = self.client.get(f'/api/orders/queue/{response.data["id"]}/')
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertEqual(response.data['error']['failed_items'], [{'product_id': self.cheese.pk, 'requested': 6, 'available': 5}])
+        self.assertFalse(Order.objects.exists())
+
+    def test_stale_request_times_out(self):
+        response, _ = self.enqueue([{'product_id': self.cheese.pk}])
+        request_id = response.data['id']
+        CheckoutRequest.objects.filter(pk=request_id).update(created_at=timezone.now() - timedelta(minutes=5))
+
+        response = self.client.get(f'/api/orders/queue/{request_id}/')
+        self.assertEqual(response.data['status'], 'failed')
+        self.assertIn('error', response.data['error'])
+        # Zaman aşımından sonra gelen mesaj sipariş oluşturmaz
+        process_checkout_request(request_id)
+        self.assertFalse(Order.objects.exists())
+
+    def test_status_returns_immediately_with_retry_hint(self):
+        response, _ = self.enqueue([{'product_id': self.cheese.pk}])
+        request_id = response.data['id']
+
+        # Sonuç hazır değilse istek içinde beklenmez; istemci Retry-After ile tekrar sorar
+        with mock.patch('time.sleep') as sleep:
+            response = self.client.get(f'/api/orders/queue/{request_id}/', {'wait': '30'})
+        sleep.assert_not_called()
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(response['Retry-After'], '2')
+
+        process_checkout_request(request_id)
+        response = self.client.get(f'/api/orders/queue/{request_id}/')
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertFalse(response.has_header('Retry-After'))
+
+    def test_cart_is_cleared_after_order(self):
+        token = self.client.post('/api/cart/items/', {'product_id': self.butter.pk, 'quantity': 2}, format='json')['X-Cart-Token']
+        response, _ = self.enqueue(HTTP_X_CART_TOKEN=token)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.get('/api/cart/', HTTP_X_CART_TOKEN=token).data['item_count'], 2)
+
+        process_checkout_request(response.data['id'])
+        self.assertEqual(Order.objects.get().total_price, Decimal('100.00'))
+        self.assertEqual(self.client.get('/api/cart/', HTTP_X_CART_TOKEN=token).data['item_count'], 0)
+
+    def test_user_request_is_private(self):
+        user = User.objects.create_user(username='musteri', password='sifre12345')
+        request = CheckoutRequest.objects.create(user=user, queue='checkout.0', payload={})
+        self.assertEqual(self.client.get(f'/api/orders/queue/{request.pk}/').status_code, 404)
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get(f'/api/orders/queue/{request.pk}/').data['status'], 'pending')
@@ -0,0 +1,76 @@
+"""
+Sipariş durum makinesi.
+
+    created ──► paid ──► shipped ──► delivered
+       │          │
+       └──────────┴──► cancelled
+
+Kapıda ödemeli siparişler ödeme alınmadan kargoya verilebildiği için created'dan
+doğrudan shipped'a, kargo tek adımda teslim edildi işaretlenebildiği için de
+created/paid'den delivered'a geçilebilir.
+
+Durum yalnızca transition() ile değiştirilir: geçiş tek bir koşullu UPDATE ile
+yazılır (post_save tetiklenmez), ardından order_status_changed olayı bir kez
+gönderilir. Stok ayırmalarının kesinleştirilmesi/iadesi ve kupon iadesi bu olayın
+alıcılarında (orders/signals.py) geçişle aynı işlemde yapılır; alıcı hata fırlatırsa
+geçiş de geri alınır. E-posta gibi yan etkiler transaction.on_commit ile kuyruğa alınır.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Order
+
+ORDER_TRANSITIONS = {
+    'created': ('paid', 'shipped', 'delivered', 'cancelled'),
+    'paid': ('shipped', 'delivered', 'cancelled'),
+    'shipped': ('delivered',),
+    'delivered': (),
+    'cancelled': (),
+}
+
+# Gönderilen argümanlar: order, previous_status, status
+order_status_changed = Signal()
+
+
+class InvalidTransition(Exception):
+    """Sipariş mevcut durumundan istenen duruma geçemiyorsa fırlatılır"""
+
+    def __init__(self, order, status):
+        super().__init__(
+            f"Sipariş {order.get_status_display()} durumundan "
+            f"{dict(Order.ORDER_STATUS).get(status, status)} durumuna geçirilemez."
+        )
+        self.order = order
+        self.status = status
+
+
+def can_transition(order, status):
+    return status in ORDER_TRANSITIONS.get(order.status, ())
+
+
+def transition(order, status):
+    """
+    Siparişi verilen duruma geçirir. Sipariş bu arada başka bir istek tarafından
+    değiştirildiyse (durum artık beklenen değil) InvalidTransition fırlatılır.
+    """
+    if not can_transition(order, status):
+        raise InvalidTransition(order, status)
+
+    previous_status = order.status
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order.pk, status=previous_status).update(status=status, updated_at=now)
+        if not updated:
+            order.refresh_from_db(fields=['status'])
+            raise InvalidTransition(order, status)
+
+        order.status = status
+        order.updated_at = now
+        try:
+            order_status_changed.send(sender=Order, order=order, previous_status=previous_status, status=status)
+        except Exception:
+            # Savepoint geri alınır; nesne de veritabanıyla tutarlı kalsın
+            order.status = previous_status
+            raise
+    return order
@@ -1,18 +1,71 @@
+
+from django.conf import settings
 from django.shortcuts import render
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from .models import Order, OrderItem, Shipment
-from products.models import Product
+from .models import CheckoutRequest, Order, OrderItem, Shipment
 from coupons.models import Coupon
-from users.models import Address
-from .serializers import OrderSerializer, OrderItemSerializer, OrderItemCreateSerializer, ShipmentSerializer
+from coupons.redemptions import CouponUnavailable, claim_coupon
+from coupons.services import calculate_discount
+from .serializers import (
+    CheckoutRequestSerializer, OrderSerializer, OrderItemSerializer, OrderItemCreateSerializer, OrderSummarySerializer,
+    ShipmentSerializer, order_items_prefetch,
+)
+from .checkout import CheckoutError, place_order
+from . import checkout_queue
+from carts.cart import get_request_cart
+from products.inventory import InsufficientStock
+from .reservations import reserve_for_order
+from .transitions import InvalidTransition, transition
+from ecommerce.serializers import SparseFieldsetsViewMixin
+from ecommerce.idempotency import idempotent
+from ecommerce.pagination import KeysetPagination
 from django.utils import timezone
 from decimal import Decimal
 
 
+class OrderPagination(KeysetPagination):
+    # Sipariş geçmişi; ?pagination=cursor ile keyset (bkz. order_user_history_idx)
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    cursor_ordering = ('-created_at', '-id')
+
+
+def checkout_request_response(checkout_request, request, status_code=status.HTTP_200_OK):
+    if checkout_request.order_id:
+        checkout_request.order = (
+            Order.objects.prefetch_related(order_items_prefetch()).select_related('coupon').get(pk=checkout_request.order_id)
+        )
+    serializer = CheckoutRequestSerializer(checkout_request, context={'request': request})
+    response = Response(serializer.data, status=status_code)
+    if checkout_request.status == 'pending':
+        response['Location'] = serializer.data['status_url']
+        response['Retry-After'] = str(settings.CHECKOUT_STATUS_RETRY_AFTER)
+    return response
+
+
+class CheckoutRequestView(APIView):
+    """
+    Kuyruklu checkout isteğinin sonucu. Hemen yanıt verir; istek beklemedeyse
+    istemci Retry-After süresi sonra tekrar sorar.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, pk):
+        checkout_request = CheckoutRequest.objects.filter(pk=pk).first()
+        # Üye siparişlerini yalnızca sahibi görebilir; misafir isteklerinde tahmin edilemeyen id yeterlidir
+        if checkout_request is None or (checkout_request.user_id and checkout_request.user_id != request.user.pk):
+            return Response({'error': 'Checkout isteği bulunamadı.'}, status=status.HTTP_404_NOT_FOUND)
+
+        checkout_queue.expire_if_stale(checkout_request)
+        return checkout_request_response(checkout_request, request)
+
+
 class IsAuthenticatedOrCreateOnly(permissions.BasePermission):
     """
     Kullanıcı giriş yapmışsa tam erişim sağlar.
@@ -41,167 +94,68 @@ class OrderViewSet(viewsets.ModelViewSet):
         # Kullanıcı bazlı filtreleme
         queryset = self.get_queryset()
         
-        # Prefetch related items and coupon for better performance
-        queryset = queryset.prefetch_related('items', 'items__product').select_related('coupon')
+        # Kalemler ürün detaylarıyla birlikte önceden yüklenir; ?fields=/?omit= verildiyse
+        # yalnızca istenen alanların ihtiyaç duyduğu veriler yüklenir
+        queryset = queryset.prefetch_related(order_items_prefetch()).select_related('user', 'coupon', 'payment', 'shipment')
+        queryset = OrderSerializer.optimize_queryset(queryset, request)
         
         # Serileştir ve siparişlerin detaylarını içerecek şekilde ayarla
-        serializer = OrderSerializer(queryset, many=True, context={'request': request})
+        results = OrderSerializer(queryset, many=True, context={'request': request}).data
         
-        # Detaylı yanıt
+        # Detaylı yanıt (sayı, yüklenen listeden alınır; ayrıca COUNT sorgusu çalıştırılmaz)
         return Response({
-            'count': queryset.count(),
-            'results': serializer.data
+            'count': len(results),
+            'results': results
         })
     
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """
+        Sayfalı sipariş geçmişi. Her sipariş kalemleri yüklenmeden özet olarak döner;
+        tüm ayrıntılar için retrieve kullanılır.
+        """
+        queryset = self.get_queryset().with_summary_data().order_by('-created_at', '-id')
+        paginator = OrderPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = OrderSummarySerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+    
     def retrieve(self, request, pk=None):
         # Özel sipariş detayı görüntüleme
         try:
-            order = self.get_queryset().prefetch_related('items', 'items__product').select_related('coupon', 'shipment').get(pk=pk)
+            queryset = self.get_queryset().prefetch_related(order_items_prefetch()).select_related('user', 'coupon', 'payment', 'shipment')
+            order = OrderSerializer.optimize_queryset(queryset, request).get(pk=pk)
         except Order.DoesNotExist:
             return Response({'error': 'Sipariş bulunamadı.'}, status=status.HTTP_404_NOT_FOUND)
         
         serializer = OrderSerializer(order, context={'request': request})
         return Response(serializer.data)
     
+    @idempotent('orders.create')
     def create(self, request, *args, **kwargs):
-        data = request.data
-        items_data = data.get('items', [])
-        coupon_code = data.get('coupon_code')
-        notes = data.get('notes', '')
-        payment_method = data.get('payment_method', 'online')
-        if payment_method not in ['online', 'cash_on_delivery']:
-            payment_method = 'online'
-
         user = request.user if request.user.is_authenticated else None
-
-        # Ürünleri getir ve toplam tutarı hesapla
-        total_price = Decimal('0')  # İndirimli toplam
-        products = {}
-        for item in items_data:
-            product_id = item.get('product_id')
-            quantity = item.get('quantity', 1)
-            try:
-                product = Product.objects.get(id=product_id)
-                products[product_id] = product
-                # İndirimli fiyatı kullan
-                current_price = product.get_current_price()
-                
-                total_price += current_price * Decimal(quantity)
-            except Product.DoesNotExist:
-                return Response({'error': f'Ürün bulunamadı: {product_id}'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # Kupon indirimi hesapla (indirimli toplam üzerinden - doğru yaklaşım)
-        coupon_discount = Decimal('0')
-        applied_coupon = None
-        if coupon_code:
-            try:
-                coupon = Coupon.objects.get(code=coupon_code)
-                # Kupon minimum tutarı indirimli fiyat üzerinden kontrol et
-                if coupon.is_valid and total_price >= coupon.min_purchase_amount:
-                    if coupon.discount_type == 'percentage':
-                        coupon_discount = total_price * (Decimal(str(coupon.discount_value)) / Decimal('100'))
-                    else:
-                        coupon_discount = min(Decimal(str(coupon.discount_value)), total_price)
-                    applied_coupon = coupon
-            except Coupon.DoesNotExist:
-                pass  # Geçersiz kupon varsa yoksay
-
-        # NOT: order.discount sadece kupon indirimi (ürün indirimleri total_price'da zaten dahil)
-        
-        # Not: Final hesaplamalar Order.save() metodunda otomatik yapılır
-        
-        # Kayıtlı kullanıcı
-        if user:
-            address_id = data.get('address_id')
-            try:
-                address = Address.objects.get(id=address_id, user=user)
-            except Address.DoesNotExist:
-                return Response({'error': 'Geçersiz adres.'}, status=status.HTTP_400_BAD_REQUEST)
-
-            order_data = {
-                'user': user,
-                'first_name': address.first_name,
-                'last_name': address.last_name,
-                'email': user.email,
-                'address': address.address,
-                'city': address.city,
-                'postal_code': address.postal_code or '',
-                'country': address.country,
-                'phone_number': address.phone_number,
-                'payment_method': payment_method,
-                'total_price': total_price,  # İndirimli fiyat
-                'discount': coupon_discount,  # Sadece kupon indirimi (ürün indirimleri total_price'da zaten dahil)
-                'notes': notes,
-                'is_guest_order': False,
-            }
-
-        else:
-            # Misafir kullanıcı
-            guest_info = data.get('guest_info', {})
-            if not guest_info:
-                return Response({'error': 'Misafir kullanıcı bilgileri eksik.'}, status=status.HTTP_400_BAD_REQUEST)
-
-            full_name = guest_info.get('full_name', '')
-            name_parts = full_name.split(' ', 1)
-            first_name = name_parts[0]
-            last_name = name_parts[1] if len(name_parts) > 1 else ''
-
-            required_fields = ['full_name', 'email', 'phone', 'address', 'city', 'district']
-            missing_fields = [field for field in required_fields if not guest_info.get(field)]
-            if missing_fields:
-                return Response({
-                    'error': 'Eksik bilgiler mevcut.',
-                    'missing_fields': missing_fields
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            order_data = {
-                'user': None,
-                'first_name': first_name,
-                'last_name': last_name,
-                'email': guest_info.get('email', ''),
-                'address': guest_info.get('address', ''),
-                'city': guest_info.get('city', ''),
-                'postal_code': guest_info.get('postal_code', ''),
-                'country': 'Türkiye',
-                'phone_number': guest_info.get('phone', ''),
-                'payment_method': payment_method,
-                'total_price': total_price,  # İndirimli fiyat
-                'discount': coupon_discount,  # Sadece kupon indirimi (ürün indirimleri total_price'da zaten dahil)
-                'notes': notes,
-                'is_guest_order': True,
-                'guest_email': guest_info.get('email', ''),
-            }
-
-        # Sipariş ve sipariş ürünlerini oluştur
+        # Satır gönderilmediyse sunucudaki sepetten sipariş oluşturulur
+        cart = None if request.data.get('items') else get_request_cart(request, create=False)
         try:
-            with transaction.atomic():
-                order = Order.objects.create(**order_data)
-                for item in items_data:
-                    product_id = item.get('product_id')
-                    quantity = item.get('quantity', 1)
-                    product = products.get(product_id)
-                    if not product:
-                        raise ValueError("Ürün daha önce alınamamış.")
-
-                    OrderItem.objects.create(
-                        order=order,
-                        product=product,
-                        price=product.get_current_price(),
-                        quantity=quantity
-                    )
+            if checkout_queue.is_enabled():
+                # Kampanya modu: sipariş checkout worker'ında oluşturulur, istemci sonucu sorgular
+                checkout_request = checkout_queue.enqueue_checkout(user, request.data, cart=cart)
+                return checkout_request_response(checkout_request, request, status.HTTP_202_ACCEPTED)
+            order = place_order(user, request.data, cart=cart)
+        except CheckoutError as e:
+            return Response(e.as_response_data(), status=e.status_code)
+        except Exception as e:
+            return Response({'error': f'Sipariş oluşturulurken bir hata oluştu: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-                # Kuponu uygula
-                if applied_coupon:
-                    order.coupon = applied_coupon
-                    applied_coupon.usage_count += 1
-                    applied_coupon.save()
-                    order.save()
+        # Siparişe dönüşen sepet boşaltılır
+        if cart is not None:
+            cart.clear()
 
-                serializer = OrderSerializer(order)
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
+        # Yanıt için kalemler ürün detaylarıyla birlikte tek seferde yüklenir
+        order = Order.objects.prefetch_related(order_items_prefetch()).select_related('coupon').get(pk=order.pk)
+        serializer = OrderSerializer(order, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        except Exception as e:
-            return Response({'error': f'Sipariş oluşturulurken bir hata oluştu: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     @action(detail=True, methods=['post'])
     def add_item(self, request, pk=None):
         order = self.get_object()
@@ -215,13 +169,12 @@ class OrderViewSet(viewsets.ModelViewSet):
             product = serializer.validated_data['product']
             quantity = serializer.validated_data['quantity']
             
-            if not product.is_in_stock or product.stock < quantity:
-                return Response({'error': 'Yeterli stok yok.'}, status=status.HTTP_400_BAD_REQUEST)
-            
             with transaction.atomic():
-                # Ürün stoğunu güncelle
-                product.stock -= quantity
-                product.save()
+                # Ürün stoğunu koşullu UPDATE ile düş ve ayırma kaydını oluştur (stok yetersizse hiçbir şey değişmez)
+                try:
+                    reserve_for_order(order, [(product.pk, quantity)])
+                except InsufficientStock as e:
+                    return Response({'error': str(e), 'failed_items': e.failures}, status=status.HTTP_400_BAD_REQUEST)
                 
                 # Sipariş öğesini oluştur
                 order_item = OrderItem.objects.create(
@@ -241,10 +194,7 @@ class OrderViewSet(viewsets.ModelViewSet):
                 # Kupon indirimi hesapla
                 coupon_discount = Decimal('0')
                 if order.coupon:
-                    if order.coupon.discount_type == 'percentage':
-                        coupon_discount = total_price * (Decimal(str(order.coupon.discount_value)) / Decimal('100'))
-                    else:
-                        coupon_discount = min(Decimal(str(order.coupon.discount_value)), total_price)
+                    coupon_discount = calculate_discount(order.coupon.discount_type, order.coupon.discount_value, total_price)
                 
                 # Order'ı güncelle (Order.save() otomatik hesaplamalar yapar)
                 order.total_price = total_price
@@ -256,6 +206,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=True, methods=['post'])
+    @idempotent('orders.apply_coupon')
     def apply_coupon(self, request, pk=None):
         order = self.get_object()
         
@@ -267,11 +218,10 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Kupon kodu gereklidir.'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
+            # Geçerlilik ve kullanım sınırı claim_coupon'da kontrol edilir; coupon.is_valid ile
+            # ön kontrol, son kullanım hakkını zaten bu siparişte tutan kuponu reddederdi
             coupon = Coupon.objects.get(code=coupon_code)
             
-            if not coupon.is_valid:
-                return Response({'error': 'Kupon geçerli değil.'}, status=status.HTTP_400_BAD_REQUEST)
-            
             # Tüm sipariş tutarlarını yeniden hesapla
             total_price = Decimal('0')  # İndirimli toplam
             
@@ -285,25 +235,23 @@ class OrderViewSet(viewsets.ModelViewSet):
                                 status=status.HTTP_400_BAD_REQUEST)
             
             # Kupon indirimi hesapla
-            coupon_discount = Decimal('0')
-            if coupon.discount_type == 'percentage':
-                coupon_discount = total_price * (Decimal(str(coupon.discount_value)) / Decimal('100'))
-            else:
-                coupon_discount = min(Decimal(str(coupon.discount_value)), total_price)
-            
-            # Order'ı güncelle (Order.save() otomatik hesaplamalar yapar)
-            order.coupon = coupon
-            order.total_price = total_price
-            order.discount = coupon_discount  # Sadece kupon indirimi
-            order.save()
+            coupon_discount = calculate_discount(coupon.discount_type, coupon.discount_value, total_price)
             
-            # Kupon kullanım sayısını artır
-            coupon.usage_count += 1
-            coupon.save()
+            with transaction.atomic():
+                # Kupon kullanımı alınır (aynı kupon bu siparişe tekrar uygulanırsa sayaç artmaz)
+                claim_coupon(coupon, order)
+                
+                # Order'ı güncelle (Order.save() otomatik hesaplamalar yapar)
+                order.coupon = coupon
+                order.total_price = total_price
+                order.discount = coupon_discount  # Sadece kupon indirimi
+                order.save()
             
             return Response(OrderSerializer(order).data)
         except Coupon.DoesNotExist:
             return Response({'error': 'Geçersiz kupon kodu.'}, status=status.HTTP_404_NOT_FOUND)
+        except CouponUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=True, methods=['post'])
     def mark_as_paid(self, request, pk=None):
@@ -330,16 +278,19 @@ class OrderViewSet(viewsets.ModelViewSet):
             
         try:
             with transaction.atomic():
-                # Siparişi ödendi olarak işaretle
-                order.status = 'paid'
-                order.paid_at = timezone.now()
-                order.save()
+                # Siparişi ödendi olarak işaretle; stok ayırmaları kalıcı hale getirilir
+                # (süresi dolanlar yeniden düşülür, bkz. orders.signals)
+                transition(order, 'paid')
                 
             return Response({
                 'success': 'Ödeme başarıyla onaylandı.',
                 'order': OrderSerializer(order).data
             })
             
+        except InsufficientStock as e:
+            return Response({'error': str(e), 'failed_items': e.failures}, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidTransition as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({
                 'error': f'Ödeme onaylanırken bir hata oluştu: {str(e)}'
@@ -370,16 +321,8 @@ class OrderViewSet(viewsets.ModelViewSet):
             
         try:
             with transaction.atomic():
-                # Siparişi iptal et
-                order.status = 'cancelled'
-                order.save()
-                
-                # Stokları geri iade et
-                order_items = order.items.all()
-                for item in order_items:
-                    product = item.product
-                    product.stock += item.quantity
-                    product.save()
+                # Siparişi iptal et; ayrılan stoklar ve kupon kullanımı iade edilir (bkz. orders.signals)
+                transition(order, 'cancelled')
                 
                 # Eğer sipariş ödeme bilgisi varsa, ödeme durumunu güncelle
                 try:
@@ -395,12 +338,14 @@ class OrderViewSet(viewsets.ModelViewSet):
                 'order': OrderSerializer(order).data
             })
             
+        except InvalidTransition as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({
                 'error': f'Sipariş iptal edilirken bir hata oluştu: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class ShipmentViewSet(viewsets.ModelViewSet):
+class ShipmentViewSet(SparseFieldsetsViewMixin, viewsets.ModelViewSet):
     serializer_class = ShipmentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
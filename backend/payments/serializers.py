@@ -1,9 +1,17 @@
 from rest_framework import serializers
 from .models import Payment
-from orders.serializers import OrderSerializer
+from orders.serializers import OrderSerializer, order_items_prefetch
+from ecommerce.serializers import SparseFieldsetsMixin
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     order_detail = OrderSerializer(source='order', read_only=True)
+
+    field_requirements = {
+        'order_detail': {
+            'select_related': ('order__user', 'order__coupon', 'order__shipment'),
+            'prefetch_related': (order_items_prefetch('order__items'),),
+        },
+    }
     
     class Meta:
         model = Payment
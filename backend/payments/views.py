@@ -5,11 +5,15 @@ from rest_framework.response import Response
 from django.db import transaction
 from .models import Payment
 from orders.models import Order
+from orders.transitions import InvalidTransition, transition
+from products.inventory import InsufficientStock
 from .serializers import PaymentSerializer, PaymentCreateSerializer
+from ecommerce.serializers import SparseFieldsetsViewMixin
+from ecommerce.idempotency import idempotent
 
 # Create your views here.
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(SparseFieldsetsViewMixin, viewsets.ModelViewSet):
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
     # Ödeme API'si için istek sınırlandırması
@@ -26,6 +30,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
             return PaymentCreateSerializer
         return PaymentSerializer
     
+    @idempotent('payments.create')
     def create(self, request, *args, **kwargs):
         user = request.user
         data = request.data
@@ -54,45 +59,41 @@ class PaymentViewSet(viewsets.ModelViewSet):
             else:
                 final_amount = order.final_price
             
+            # Banka havalesi onay bekler; kapıda ödeme ve kredi kartı gibi anında işleme alınan
+            # ödemeler (gerçek entegrasyon durumunda) tamamlandı olarak kaydedilir
+            payment_status = 'pending' if payment_method == 'bank_transfer' else 'completed'
+            
             with transaction.atomic():
                 # Ödeme kaydı oluştur
                 payment = Payment.objects.create(
                     order=order,
                     amount=final_amount,
                     payment_method=payment_method,
+                    status=payment_status,
                     notes=notes
                 )
-                
-                # Banka havalesi ve kapıda ödeme durumları
-                if payment_method in ['bank_transfer', 'cash_on_delivery']:
-                    payment.status = 'pending'
-                else:
-                    # Kredi kartı ödemesi gibi anında işleme alınan ödemeler (gerçek entegrasyon durumunda)
-                    payment.status = 'completed'
-                
                 payment.transaction_id = f"TRX-{payment.id}"
-                payment.save()
-                
-                # Sipariş durumunu güncelle
-                if payment_method == 'cash_on_delivery':
-                    order.status = 'paid'  # Kapıda ödeme için de direkt ödendi olarak işaretle
-                    payment.status = 'completed'  # Ödeme tamamlandı olarak işaretle
-                elif payment_method == 'bank_transfer':
-                    order.status = 'created'  # Banka havalesi için oluşturuldu olarak kal
-                else:
-                    order.status = 'paid'  # Kredi kartı gibi anında ödeme için doğrudan ödendi olarak işaretle
+                payment.save(update_fields=['transaction_id'])
                 
-                payment.save()
-                order.save()
+                # Banka havalesinde sipariş oluşturuldu olarak kalır; kapıda ödeme ve kredi kartı
+                # gibi anında ödemelerde doğrudan ödendi olarak işaretlenir
+                if payment_method != 'bank_transfer':
+                    # Ödenen siparişin stok ayırmaları geçişle birlikte kalıcı hale getirilir
+                    transition(order, 'paid')
                 
             return Response(PaymentSerializer(payment).data, status=status.HTTP_201_CREATED)
         
         except Order.DoesNotExist:
             return Response({'error': 'Sipariş bulunamadı.'}, status=status.HTTP_404_NOT_FOUND)
+        except InsufficientStock as e:
+            return Response({'error': str(e), 'failed_items': e.failures}, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidTransition as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({'error': f'Ödeme işlemi sırasında bir hata oluştu: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
     @action(detail=True, methods=['post'])
+    @idempotent('payments.process_payment')
     def process_payment(self, request, pk=None):
         payment = self.get_object()
         
@@ -100,14 +101,19 @@ class PaymentViewSet(viewsets.ModelViewSet):
         if payment.status in ['completed', 'refunded']:
             return Response({'error': 'Bu ödeme zaten işlenmiş.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Burada gerçek ödeme işlemi simülasyonu yapılabilir
-        payment.status = request.data.get('status', 'completed')
-        payment.transaction_id = request.data.get('transaction_id', f"TRX-{payment.id}")
-        payment.save()
-        
-        # Ödeme başarılı ise siparişi güncelle
-        if payment.status == 'completed':
-            payment.order.status = 'paid'
-            payment.order.save()
+        try:
+            with transaction.atomic():
+                # Burada gerçek ödeme işlemi simülasyonu yapılabilir
+                payment.status = request.data.get('status', 'completed')
+                payment.transaction_id = request.data.get('transaction_id', f"TRX-{payment.id}")
+                payment.save()
+                
+                # Ödeme başarılı ise siparişi güncelle ve stok ayırmalarını kesinleştir
+                if payment.status == 'completed' and payment.order.status == 'created':
+                    transition(payment.order, 'paid')
+        except InsufficientStock as e:
+            return Response({'error': str(e), 'failed_items': e.failures}, status=status.HTTP_400_BAD_REQUEST)
+        except InvalidTransition as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
         
         return Response(PaymentSerializer(payment).data)
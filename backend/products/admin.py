@@ -26,7 +26,7 @@ class ProductRatingInline(admin.TabularInline):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'price', 'stock', 'available', 'created_at', 'has_active_discount', 'average_rating']
+    list_display = ['name', 'category', 'price', 'current_price', 'stock', 'available', 'created_at', 'has_active_discount', 'average_rating', 'review_count']
     list_filter = ['category', 'available', 'created_at']
     list_editable = ['price', 'stock', 'available']
     search_fields = ['name', 'description']
@@ -35,17 +35,13 @@ class ProductAdmin(admin.ModelAdmin):
     inlines = [DiscountInline, ProductReviewInline, ProductRatingInline]
     
     def has_active_discount(self, obj):
-        from django.utils import timezone
-        today = timezone.now().date()
-        has_discount = obj.discounts.filter(is_active=True, start_date__lte=today, end_date__gte=today).exists()
-        return has_discount
+        return obj.active_discount_id is not None
     
     has_active_discount.boolean = True
     has_active_discount.short_description = 'İndirimli'
     
     def average_rating(self, obj):
-        from django.db.models import Avg
-        avg_rating = obj.ratings.aggregate(Avg('rating'))['rating__avg']
+        avg_rating = obj.average_rating
         if avg_rating:
             return round(avg_rating, 1)
         return 0
@@ -0,0 +1,100 @@
+"""
+Stok ayırma ve iade.
+
+Stok, okunup Python'da azaltıldıktan sonra kaydedilmez (eşzamanlı siparişlerde fazla
+satışa yol açar). Bunun yerine tüm sepet için tek bir koşullu UPDATE çalıştırılır:
+
+    UPDATE products_product
+       SET stock = stock - CASE id WHEN 1 THEN 2 WHEN 5 THEN 1 END
+     WHERE (id = 1 AND stock >= 2) OR (id = 5 AND stock >= 1)
+
+Veritabanı her satırı güncellerken koşulu yeniden değerlendirdiği için stok hiçbir
+zaman negatife düşmez. Güncellenen satır sayısı istenenden azsa yetersiz kalan satırlar
+raporlanır ve yapılan düşüm geri alınır.
+"""
+from collections import OrderedDict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from ecommerce.cache import invalidate_namespace_on_commit
+from .models import Product
+
+
+class InsufficientStock(Exception):
+    """Bir veya daha fazla ürün için yeterli stok yoksa fırlatılır"""
+
+    def __init__(self, failures):
+        super().__init__('Yeterli stok yok.')
+        # [{'product_id': ..., 'requested': ..., 'available': ...}, ...]
+        self.failures = failures
+
+
+def merge_lines(lines):
+    """(ürün id, adet) satırlarını ürün başına toplam adede çevirir"""
+    if isinstance(lines, dict):
+        lines = lines.items()
+    quantities = OrderedDict()
+    for product_id, quantity in lines:
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def _adjust_stock(quantities, sign, condition=None):
+    delta = Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+    queryset = Product.objects.filter(pk__in=list(quantities))
+    if condition is not None:
+        queryset = queryset.filter(condition)
+    updated = queryset.update(stock=F('stock') + sign * delta, updated_at=timezone.now())
+    if updated:
+        # Stok bilgisi katalog yanıtlarında yer alır
+        invalidate_namespace_on_commit('catalog')
+    return updated
+
+
+def reserve_stock(lines):
+    """
+    Satırlardaki adetleri stoktan tek sorguda düşer. Herhangi bir ürün için stok
+    yetersizse hiçbir düşüm yapılmaz ve InsufficientStock fırlatılır.
+    Çok ürünlü sepetlerde çağıranın ürün satırlarını birincil anahtar sırasıyla
+    kilitlemiş olması gerekir (bkz. orders.checkout.lock_products).
+    """
+    quantities = merge_lines(lines)
+    if not quantities:
+        return
+
+    condition = reduce(or_, (
+        Q(pk=product_id, stock__gte=quantity) for product_id, quantity in quantities.items()
+    ))
+    try:
+        with transaction.atomic():
+            if _adjust_stock(quantities, -1, condition) != len(quantities):
+                # Savepoint geri alınır; koşulu sağlayan satırlardaki düşümler de iptal olur
+                raise InsufficientStock([])
+    except InsufficientStock:
+        stocks = dict(Product.objects.filter(pk__in=list(quantities)).values_list('pk', 'stock'))
+        failures = [
+            {'product_id': product_id, 'requested': quantity, 'available': stocks.get(product_id, 0)}
+            for product_id, quantity in quantities.items()
+            if stocks.get(product_id, 0) < quantity
+        ]
+        raise InsufficientStock(failures)
+
+
+def release_stock(lines):
+    """Daha önce ayrılmış adetleri stoğa geri ekler"""
+    quantities = merge_lines(lines)
+    if not quantities:
+        return
+    with transaction.atomic():
+        if len(quantities) > 1:
+            # Checkout ile aynı (birincil anahtar) sırada kilitlenir; aksi halde çok ürünlü
+            # iadeler eşzamanlı siparişlerle kilitlenebilir (deadlock)
+            list(Product.objects.select_for_update().filter(pk__in=list(quantities)).order_by('pk').values_list('pk'))
+        _adjust_stock(quantities, 1)
@@ -0,0 +1,111 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from products.models import Category, Product
+
+CATEGORY_NAMES = [
+    'Kaşar Peyniri', 'Beyaz Peynir', 'Tulum Peyniri', 'Şarküteri', 'Zeytin',
+    'Bal ve Reçel', 'Tereyağı', 'Süt Ürünleri', 'Kuruyemiş', 'Kahvaltılık',
+]
+PRODUCT_WORDS = [
+    'Kaşar', 'Peynir', 'Tulum', 'Sucuk', 'Pastırma', 'Zeytin', 'Çiçek Balı', 'Tereyağı',
+    'Kaymak', 'Lor', 'Çökelek', 'Dil Peyniri', 'Örgü Peyniri', 'Çeçil', 'Gravyer', 'Keçi Peyniri',
+]
+ORIGIN_WORDS = ['Eski', 'Taze', 'Yıllanmış', 'Kars', 'Ezine', 'Erzincan', 'Trakya', 'Köy', 'Doğal', 'Keçi', 'Koyun', 'İnek']
+SYLLABLES = ['ka', 'ra', 'de', 'niz', 'ol', 'gun', 'ta', 'şı', 'yer', 'baş', 'mer', 'kez', 'can', 'li', 'dağ', 'göl']
+DEFAULT_TERMS = ['kaşar', 'kasar', 'ezine kaşar', 'peynirleri', 'erzincan tulum', 'gravyr', 'çiçek balı']
+
+
+class Command(BaseCommand):
+    help = (
+        'Ürün aramasını (tam metin) eski ILIKE yöntemiyle karşılaştırır. Verilen sayıda '
+        'ürün geçici olarak oluşturulur ve ölçüm sonunda geri alınır.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help='Oluşturulacak ürün sayısı (varsayılan: 100000)')
+        parser.add_argument('--repeat', type=int, default=20, help='Her terim için tekrar sayısı (varsayılan: 20)')
+        parser.add_argument('--term', action='append', dest='terms', help='Aranacak terim (birden fazla verilebilir)')
+        parser.add_argument('--explain', action='store_true', help='Her iki yöntemin sorgu planını da yazdır')
+
+    def handle(self, *args, **options):
+        terms = options['terms'] or DEFAULT_TERMS
+
+        # Üretilen veri kalıcı olmasın diye tüm ölçüm tek işlemde yapılıp geri alınır
+        with transaction.atomic():
+            self.generate_catalog(options['products'])
+            for term in terms:
+                self.compare(term, options['repeat'], options['explain'])
+            transaction.set_rollback(True)
+
+    def generate_catalog(self, count):
+        self.stdout.write(f'{count} ürün oluşturuluyor...')
+        rng = random.Random(42)
+        categories = Category.objects.bulk_create([
+            Category(name=f'{name} {i}', slug=f'benchmark-{i}')
+            for i, name in enumerate(CATEGORY_NAMES * 3)
+        ])
+
+        # Gerçek bir katalogdaki gibi seçici sonuçlar için ürünler sentetik marka/köy
+        # adları içerir; her ürün türü ürünlerin yalnızca küçük bir kısmında geçer
+        vocabulary = sorted({
+            ''.join(rng.sample(SYLLABLES, rng.randint(2, 3))).capitalize() for _ in range(5000)
+        })
+        batch = []
+        for i in range(count):
+            product_word = rng.choice(PRODUCT_WORDS) if rng.random() < 0.3 else rng.choice(vocabulary)
+            name = f'{rng.choice(vocabulary)} {rng.choice(ORIGIN_WORDS)} {product_word}'
+            description = ' '.join(rng.choices(vocabulary, k=20)).lower()
+            batch.append(Product(
+                category=rng.choice(categories),
+                name=name,
+                slug=f'benchmark-urun-{i}',
+                description=description,
+                price=Decimal(rng.randint(50, 1500)),
+                current_price=Decimal(rng.randint(50, 1500)),
+            ))
+            if len(batch) == 5000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+
+        Product.objects.update_search_vector()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE products_product')
+
+    def ilike_queryset(self, term):
+        """DRF SearchFilter'ın search_fields ile ürettiği sorgunun aynısı"""
+        queryset = Product.objects.filter(available=True)
+        for word in term.split():
+            queryset = queryset.filter(
+                Q(name__icontains=word) | Q(description__icontains=word) | Q(category__name__icontains=word)
+            )
+        return queryset
+
+    def measure(self, queryset, repeat):
+        durations = []
+        rows = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = len(list(queryset.values_list('pk', flat=True)))
+            durations.append((time.perf_counter() - start) * 1000)
+        durations.sort()
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        return statistics.mean(durations), p95, rows
+
+    def compare(self, term, repeat, explain):
+        methods = (
+            ('ILIKE', self.ilike_queryset(term)),
+            ('Tam metin', Product.objects.filter(available=True).search(term)),
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(f'"{term}"'))
+        for label, queryset in methods:
+            mean, p95, rows = self.measure(queryset, repeat)
+            self.stdout.write(f'  {label:<10} ort={mean:8.2f} ms  p95={p95:8.2f} ms  sonuç={rows}')
+            if explain:
+                self.stdout.write(queryset.values('pk').explain(analyze=True))
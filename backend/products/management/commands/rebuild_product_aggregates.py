@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Ürünlerin saklanan puan ve yorum istatistiklerini yeniden hesaplar veya doğrular'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Sadece tutarsız ürünleri raporla, veritabanını güncelleme',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Toplu güncelleme boyutu (varsayılan: 500)',
+        )
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        changed = Product.rebuild_feedback_aggregates(
+            batch_size=options['batch_size'],
+            dry_run=verify,
+        )
+
+        if not changed:
+            self.stdout.write(self.style.SUCCESS('Tüm ürün istatistikleri güncel.'))
+            return
+
+        for product in changed:
+            self.stdout.write(
+                f'{product.pk} - {product}: puan toplamı={product.rating_sum}, '
+                f'puan sayısı={product.rating_count}, yorum sayısı={product.review_count}'
+            )
+
+        if verify:
+            self.stdout.write(self.style.WARNING(f'{len(changed)} üründe tutarsız istatistik bulundu.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{len(changed)} ürünün istatistikleri güncellendi.'))
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:46
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_feedback_aggregates(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductRating = apps.get_model('products', 'ProductRating')
+    ProductReview = apps.get_model('products', 'ProductReview')
+
+    ratings = {
+        row['product']: (row['total'], row['count'])
+        for row in ProductRating.objects.values('product').annotate(total=Sum('rating'), count=Count('pk'))
+    }
+    reviews = dict(ProductReview.objects.values_list('product').annotate(count=Count('pk')))
+
+    products = []
+    for product in Product.objects.only('pk').iterator():
+        product.rating_sum, product.rating_count = ratings.get(product.pk, (0, 0))
+        product.review_count = reviews.get(product.pk, 0)
+        products.append(product)
+    Product.objects.bulk_update(products, ['rating_sum', 'rating_count', 'review_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_remove_product_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_feedback_aggregates, migrations.RunPython.noop),
+    ]
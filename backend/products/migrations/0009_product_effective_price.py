@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+from decimal import Decimal
+from django.utils import timezone
+
+
+def backfill_effective_prices(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Discount = apps.get_model('products', 'Discount')
+
+    today = timezone.localdate()
+    discounts = {}
+    for discount in Discount.objects.filter(
+        is_active=True, start_date__lte=today, end_date__gte=today
+    ).order_by('-start_date', '-pk'):
+        discounts.setdefault(discount.product_id, discount)
+
+    products = []
+    for product in Product.objects.only('pk', 'price').iterator():
+        discount = discounts.get(product.pk)
+        if discount:
+            multiplier = Decimal('1') - discount.discount_percentage / Decimal('100')
+            product.current_price = (product.price * multiplier).quantize(Decimal('0.01'))
+        else:
+            product.current_price = product.price
+        product.active_discount = discount
+        products.append(product)
+    Product.objects.bulk_update(products, ['current_price', 'active_discount'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_feedback_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='active_discount',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.discount'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='current_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_effective_prices, migrations.RunPython.noop),
+    ]
@@ -1,16 +1,26 @@
 from django.db import models
+from django.db.models import Case, Count, Exists, F, FloatField, Prefetch, Q, Sum, When
+from django.db.models.functions import Cast, NullIf
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchRank, SearchVectorField, TrigramWordSimilarity
 from django.utils.text import slugify
 from django.contrib.auth.models import User
+from django.dispatch import Signal
 from django.utils import timezone
 from decimal import Decimal
+from .search import TurkishFold, build_search_query, fold_turkish, product_search_vector
+from .suggest import SuggestionSnapshotMixin
 
-class Category(models.Model):
+class Category(SuggestionSnapshotMixin, models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=150, unique=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Arama önerilerinde görünen alanlar (bkz. products.suggest)
+    SUGGESTION_FIELDS = ('name', 'slug', 'image')
     
     class Meta:
         verbose_name_plural = 'Kategoriler'
@@ -24,7 +34,74 @@ class Category(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
-class Product(models.Model):
+# Ürünlerin indirimli fiyatı (current_price) değiştiğinde gönderilir; argüman: product_ids.
+# Toplu güncellemeler post_save tetiklemediği için fiyatı saklayan modüller (ör. sepetler) bunu dinler
+prices_changed = Signal()
+
+# Ürün detayında gömülü gelen yorum sayısı; devamı feedback uç noktasından sayfalı okunur
+REVIEW_PREVIEW_SIZE = 5
+
+
+def review_preview_prefetch():
+    """
+    En yeni REVIEW_PREVIEW_SIZE + 1 yorumu (sonraki sayfa olup olmadığını anlamak için
+    bir fazlası) kullanıcılarıyla birlikte product.review_preview'a yükler
+    """
+    return Prefetch(
+        'reviews',
+        queryset=ProductReview.objects.select_related('user').order_by('-created_at', '-id')[:REVIEW_PREVIEW_SIZE + 1],
+        to_attr='review_preview',
+    )
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_rating(self):
+        """Saklanan puan toplamı/sayısından ortalama puanı (sıralama ve filtreleme için) hesaplar"""
+        return self.annotate(
+            rating_avg=Cast('rating_sum', FloatField()) / NullIf(F('rating_count'), 0)
+        )
+
+    def with_listing_data(self):
+        """
+        Ürün serileştiricilerinin ihtiyaç duyduğu kategori ve aktif indirim bilgisini
+        satır başına sorgu atmadan tek seferde yükler
+        """
+        return self.with_rating().select_related('category', 'active_discount')
+
+    def with_detail_data(self):
+        """Detay serileştiricisi için ilk yorum sayfasını kullanıcılarıyla birlikte önceden yükler"""
+        return self.with_listing_data().prefetch_related(review_preview_prefetch())
+
+    def search(self, term):
+        """
+        Tam metin araması: search_vector üzerinde Türkçe kök/önek eşleşmesi, alaka
+        düzeyine göre sıralı. Hiç sonuç yoksa terim yazım hatası içeriyor olabilir;
+        bu durumda ürün adında trigram benzerliğine düşülür.
+
+        Karar ayrı bir exists() sorgusuyla değil, aynı sorgudaki bir alt sorguyla ve
+        sorgu kümesine daha önce uygulanmış filtrelerle (kategori, fiyat vb.) verilir;
+        bu yüzden filtrelerden sonra çağrılmalıdır.
+        """
+        query = build_search_query(term)
+        folded_term = fold_turkish(term)
+        matched = Q(search_vector=query)
+        return self.annotate(
+            folded_name=TurkishFold('name'),
+            search_rank=Case(
+                When(matched, then=SearchRank(F('search_vector'), query)),
+                default=TrigramWordSimilarity(folded_term, TurkishFold('name')),
+                output_field=FloatField(),
+            ),
+        ).filter(
+            matched | (~Exists(self.filter(matched)) & Q(folded_name__trigram_word_similar=folded_term))
+        ).order_by('-search_rank', 'name')
+
+    def update_search_vector(self):
+        """Sorgu kümesindeki ürünlerin arama vektörünü tek bir UPDATE ile yeniler"""
+        return self.update(search_vector=product_search_vector(Category))
+
+
+class Product(SuggestionSnapshotMixin, models.Model):
     category = models.ForeignKey(Category, related_name='products', on_delete=models.CASCADE)
     name = models.CharField(max_length=200)
     slug = models.SlugField(max_length=250, unique=True)
@@ -34,41 +111,209 @@ class Product(models.Model):
     stock = models.PositiveIntegerField(default=0)
     weight = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     available = models.BooleanField(default=True)
+    # Puan ve yorum istatistikleri - products.signals tarafından F() ile güncel tutulur
+    rating_sum = models.IntegerField(default=0, editable=False)
+    rating_count = models.IntegerField(default=0, editable=False)
+    review_count = models.IntegerField(default=0, editable=False)
+    # Aktif indirim uygulanmış fiyat - Discount sinyalleri ve gece çalışan
+    # refresh_effective_prices görevi tarafından güncel tutulur
+    current_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False, db_index=True)
+    active_discount = models.ForeignKey(
+        'Discount', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+'
+    )
+    # Ağırlıklı tam metin arama vektörü (ad > kategori > açıklama) - bkz. products.search
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductQuerySet.as_manager()
     
     class Meta:
         verbose_name_plural = 'Ürünler'
         ordering = ('name',)
+        indexes = [
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            # Yazım hatası toleransı için katlanmış ürün adı üzerinde trigram indeksi
+            GinIndex(OpClass(TurkishFold('name'), name='gin_trgm_ops'), name='product_name_trgm_idx'),
+            # Keyset sayfalama: (name, id) ve (created_at, id)
+            models.Index(fields=['available', 'name', 'id'], name='product_available_name_idx'),
+            models.Index(fields=['-created_at', '-id'], name='product_created_idx'),
+        ]
         
     def __str__(self):
         return self.name
+
+    # Arama önerilerinde görünen alanlar (bkz. products.suggest); stok ve puanlar dahil değildir
+    SUGGESTION_FIELDS = ('name', 'slug', 'img_url', 'price', 'current_price', 'available')
+    # search_vector'ün hesaplandığı alanlar (bkz. products.search.product_search_vector)
+    SEARCH_FIELDS = ('name', 'description', 'category_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Tam kayıtlarda vektörü yalnızca aranabilir alanlar değiştiyse yenilemek için sakla
+        instance._loaded_search = instance.get_search_values()
+        return instance
+
+    def get_search_values(self):
+        return [self.__dict__.get(name) for name in self.SEARCH_FIELDS]
         
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        
+        # Fiyat değişmiş olabileceği için indirimli fiyatı aynı yazma işleminde güncelle
+        update_fields = kwargs.get('update_fields')
+        price_changed = False
+        if update_fields is None or 'price' in update_fields:
+            is_existing = self.pk is not None
+            price_changed = self.apply_discount(self.find_active_discount() if is_existing else None) and is_existing
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'current_price', 'active_discount'}
         super().save(*args, **kwargs)
+
+        if price_changed:
+            prices_changed.send(sender=Product, product_ids=[self.pk])
+
+        # Aranabilir alanlar değiştiyse vektör veritabanında yeniden hesaplanır; tam
+        # kayıtlarda (ör. admin'de yalnızca available değişti) yüklenen değerlerle karşılaştırılır
+        search_values = self.get_search_values()
+        if update_fields is None:
+            search_changed = getattr(self, '_loaded_search', None) != search_values
+        else:
+            search_changed = bool({'name', 'description', 'category', 'category_id'} & set(update_fields))
+        if search_changed:
+            Product.objects.filter(pk=self.pk).update_search_vector()
+            self._loaded_search = search_values
         
     @property
     def is_in_stock(self):
         return self.stock > 0
 
+    @property
+    def average_rating(self):
+        """Saklanan toplamlardan ortalama puanı döndürür, puan yoksa None"""
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @classmethod
+    def adjust_rating_aggregates(cls, product_id, rating_delta=0, count_delta=0):
+        """Puan toplamı ve sayısını atomik olarak günceller"""
+        # updated_at da yenilenir; ETag/Last-Modified doğrulayıcıları buna dayanır
+        cls.objects.filter(pk=product_id).update(
+            rating_sum=F('rating_sum') + rating_delta,
+            rating_count=F('rating_count') + count_delta,
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def adjust_review_count(cls, product_id, delta):
+        """Yorum sayısını atomik olarak günceller"""
+        cls.objects.filter(pk=product_id).update(review_count=F('review_count') + delta, updated_at=timezone.now())
+
+    @classmethod
+    def rebuild_feedback_aggregates(cls, queryset=None, batch_size=500, dry_run=False):
+        """
+        Puan/yorum istatistiklerini ProductRating ve ProductReview tablolarından yeniden hesaplar.
+        Farklı olan ürünleri toplu olarak günceller ve bu ürünlerin listesini döndürür.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        ratings = {
+            row['product']: (row['total'], row['count'])
+            for row in ProductRating.objects.values('product').annotate(total=Sum('rating'), count=Count('pk'))
+        }
+        reviews = dict(
+            ProductReview.objects.values_list('product').annotate(count=Count('pk'))
+        )
+
+        now = timezone.now()
+        changed = []
+        fields = ['rating_sum', 'rating_count', 'review_count']
+        for product in queryset.only('pk', 'name', *fields).order_by('pk').iterator(chunk_size=batch_size):
+            rating_sum, rating_count = ratings.get(product.pk, (0, 0))
+            review_count = reviews.get(product.pk, 0)
+            if (product.rating_sum, product.rating_count, product.review_count) != (rating_sum, rating_count, review_count):
+                product.rating_sum = rating_sum
+                product.rating_count = rating_count
+                product.review_count = review_count
+                product.updated_at = now
+                changed.append(product)
+
+        if changed and not dry_run:
+            cls.objects.bulk_update(changed, fields + ['updated_at'], batch_size=batch_size)
+        return changed
+
+    def find_active_discount(self):
+        """Bugün geçerli olan indirimi veritabanından bulur"""
+        return self.discounts.active().first()
+
     def get_active_discount(self):
-        """Aktif indirimi döndürür"""
-        today = timezone.now().date()
-        return self.discounts.filter(
-            is_active=True,
-            start_date__lte=today,
-            end_date__gte=today
-        ).first()
+        """Aktif indirimi döndürür (current_price ile birlikte saklanan)"""
+        if self.active_discount_id is None:
+            return None
+        return self.active_discount
+
+    def calculate_price(self, discount):
+        """Verilen indirim uygulanmış fiyatı hesaplar"""
+        if discount is None:
+            return self.price
+        discount_percentage = discount.discount_percentage
+        price = self.price * (Decimal('1') - discount_percentage / Decimal('100'))
+        return price.quantize(Decimal('0.01'))
+
+    def apply_discount(self, discount):
+        """İndirimli fiyat alanlarını kaydetmeden günceller, değişiklik olduysa True döner"""
+        current_price = self.calculate_price(discount)
+        discount_id = discount.pk if discount else None
+        changed = self.current_price != current_price or self.active_discount_id != discount_id
+        self.current_price = current_price
+        self.active_discount = discount
+        return changed
     
     def get_current_price(self):
         """İndirimli fiyatı varsa indirimli fiyatı, yoksa normal fiyatı döndürür"""
-        active_discount = self.get_active_discount()
-        if active_discount:
-            discount_percentage = active_discount.discount_percentage
-            return self.price * (Decimal('1') - discount_percentage / Decimal('100'))
-        return self.price
+        if self.current_price is None:
+            return self.calculate_price(self.find_active_discount())
+        return self.current_price
+
+    @classmethod
+    def refresh_effective_prices(cls, queryset=None, batch_size=500):
+        """
+        Saklanan indirimli fiyatları bugünün indirimlerine göre toplu olarak yeniler.
+        Yalnızca değişen ürünler yazılır; güncellenen ürün sayısını döndürür.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+
+        # Her ürün için bugün geçerli ilk indirim (find_active_discount ile aynı sıralama)
+        discounts = {}
+        for discount in Discount.objects.active().filter(product__in=queryset.values('pk')):
+            discounts.setdefault(discount.product_id, discount)
+
+        now = timezone.now()
+        changed = []
+        fields = ['price', 'current_price', 'active_discount']
+        for product in queryset.only('pk', *fields).order_by('pk').iterator(chunk_size=batch_size):
+            if product.apply_discount(discounts.get(product.pk)):
+                product.updated_at = now
+                changed.append(product)
+
+        if changed:
+            cls.objects.bulk_update(changed, ['current_price', 'active_discount', 'updated_at'], batch_size=batch_size)
+            prices_changed.send(sender=cls, product_ids=[product.pk for product in changed])
+        return len(changed)
+
+class DiscountQuerySet(models.QuerySet):
+    def active(self, date=None):
+        """Verilen tarihte (varsayılan: bugün, Europe/Istanbul) geçerli indirimler"""
+        date = date or timezone.localdate()
+        return self.filter(
+            is_active=True,
+            start_date__lte=date,
+            end_date__gte=date
+        ).order_by('-start_date', '-pk')
 
 class Discount(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='discounts')
@@ -76,6 +321,8 @@ class Discount(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
     is_active = models.BooleanField(default=True)
+
+    objects = DiscountQuerySet.as_manager()
     
     class Meta:
         verbose_name_plural = 'İndirimler'
@@ -114,9 +361,21 @@ class ProductReview(models.Model):
     class Meta:
         verbose_name_plural = 'Ürün Değerlendirmeleri'
         ordering = ('-created_at',)
+        indexes = [
+            # Ürün yorumlarının keyset sayfalaması: (created_at, id)
+            models.Index(fields=['product', '-created_at', '-id'], name='review_product_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='review_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.user.username}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Ürün değişirse sayaçları doğru ürüne taşıyabilmek için yüklenen değeri sakla
+        instance._loaded_product_id = instance.__dict__.get('product_id')
+        return instance
     
 
 class ProductRating(models.Model):
@@ -132,3 +391,11 @@ class ProductRating(models.Model):
     
     def __str__(self):
         return f"{self.product.name} - {self.user.username}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Güncellemelerde puan farkını hesaplayabilmek için yüklenen değerleri sakla
+        instance._loaded_product_id = instance.__dict__.get('product_id')
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
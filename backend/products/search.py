@@ -0,0 +1,71 @@
+"""
+PostgreSQL tam metin ürün araması.
+
+Ürünlerin aranabilir metni Product.search_vector sütununda ağırlıklı olarak saklanır
+(ad > kategori > açıklama). Her alan iki kez indekslenir:
+  - 'turkish' yapılandırmasıyla: kök bulma (kaşar / kaşarı / kaşarlar aynı köke iner)
+  - 'simple' yapılandırmasıyla Türkçe karakterleri katlanmış halde: klavyesinde Türkçe
+    karakter olmayan kullanıcılar için (kasar -> kaşar, peynırı -> peyniri)
+Yazım hatalarına karşı ürün adının katlanmış hali üzerinde pg_trgm indeksi kullanılır.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db.models import F, Func, OuterRef, Subquery, TextField, Value
+from django.db.models.functions import Lower
+
+# Büyük/küçük Türkçe karakterlerin ASCII karşılıkları (İ/I -> i dahil)
+TURKISH_FOLD_FROM = 'ÇĞİIÖŞÜÂÎÛçğıöşüâîû'
+TURKISH_FOLD_TO = 'cgiiosuaiucgiosuaiu'
+TURKISH_FOLD_TABLE = str.maketrans(TURKISH_FOLD_FROM, TURKISH_FOLD_TO)
+
+
+def fold_turkish(text):
+    """Metni küçük harfe çevirip Türkçe karakterleri ASCII karşılıklarına katlar"""
+    return (text or '').translate(TURKISH_FOLD_TABLE).lower()
+
+
+class TurkishFold(Lower):
+    """
+    fold_turkish'in SQL karşılığı: LOWER(TRANSLATE(...)). TRANSLATE ve LOWER
+    IMMUTABLE olduğu için ifade indekslerinde kullanılabilir.
+    """
+
+    def __init__(self, expression, **extra):
+        translated = Func(
+            expression, Value(TURKISH_FOLD_FROM), Value(TURKISH_FOLD_TO),
+            function='TRANSLATE', output_field=TextField(),
+        )
+        super().__init__(translated, **extra)
+
+
+def product_search_vector(category_model):
+    """
+    Product.search_vector için UPDATE ifadesi. Kategori adı alt sorguyla alınır,
+    böylece tüm sorgu kümesi tek bir UPDATE ile yenilenebilir.
+    """
+    category_name = Subquery(
+        category_model.objects.filter(pk=OuterRef('category_id')).values('name')[:1]
+    )
+    vector = None
+    for expression, weight in ((F('name'), 'A'), (category_name, 'B'), (F('description'), 'C')):
+        part = (
+            SearchVector(expression, config='turkish', weight=weight)
+            + SearchVector(TurkishFold(expression), config='simple', weight=weight)
+        )
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def build_search_query(term):
+    """
+    Arama terimini tsquery'ye çevirir: Türkçe kök eşleşmesi VEYA katlanmış
+    kelimelerin önek eşleşmesi (yazarken sonuç gelmesi için 'kasa' -> 'kasar').
+    """
+    query = SearchQuery(term, config='turkish', search_type='plain')
+    words = re.findall(r'\w+', fold_turkish(term))
+    if words:
+        # Kelimeler \w+ ile ayrıldığı için tsquery sözdizimine zarar verecek karakter içermez
+        prefix_query = ' & '.join(f'{word}:*' for word in words)
+        query |= SearchQuery(prefix_query, config='simple', search_type='raw')
+    return query
@@ -1,9 +1,11 @@
 from rest_framework import serializers
-from .models import Category, Product, Discount, ProductReview, ProductRating
-from django.utils import timezone
-from django.db.models import Avg
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+from .models import REVIEW_PREVIEW_SIZE, review_preview_prefetch, Category, Product, Discount, ProductReview, ProductRating
 from django.contrib.auth.models import User
 from rest_framework.exceptions import PermissionDenied
+from ecommerce.pagination import KeysetPagination
+from ecommerce.serializers import SparseFieldsetsMixin
 
 # OrderItem modeline erişim için import 
 from orders.models import OrderItem
@@ -66,84 +68,107 @@ class ProductFeedbackSerializer(serializers.ModelSerializer):
         model = ProductReview
         fields = ['id', 'user', 'review', 'like', 'dislike', 'user_rating', 'created_at']
         
-class ProductSerializer(serializers.ModelSerializer):
-    category_name = serializers.ReadOnlyField(source='category.name')
-    active_discount = serializers.SerializerMethodField()
-    discounted_price = serializers.SerializerMethodField()
-    rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Product
-        fields = ['id', 'category', 'category_name', 'name', 'slug', 'description', 'img_url',
-                  'price', 'stock', 'weight', 'available', 'is_in_stock', 
-                  'created_at', 'active_discount', 'discounted_price', 'rating', 'review_count']
-                  
+# ProductListingFieldsMixin alanlarının ihtiyaç duyduğu sütun ve ilişkiler (bkz. SparseFieldsetsMixin)
+LISTING_FIELD_REQUIREMENTS = {
+    'active_discount': {'select_related': ('active_discount',), 'only': ()},
+    'discounted_price': {'select_related': ('active_discount',), 'only': ('price',)},
+    'rating': {'only': ('rating_sum', 'rating_count')},
+    'review_count': {'only': ('review_count',)},
+    'is_in_stock': {'only': ('stock',)},
+}
+
+class ProductListingFieldsMixin:
+    """
+    Ürün serileştiricilerinde ortak indirim, puan ve yorum sayısı alanları.
+    İndirimler Product.objects.with_listing_data() ile önceden yüklenmişse tekrar sorgulanmaz,
+    puan ve yorum sayısı ürün üzerinde saklanan istatistiklerden okunur.
+    """
     def get_active_discount(self, obj):
-        today = timezone.now().date()
-        discount = obj.discounts.filter(
-            is_active=True,
-            start_date__lte=today,
-            end_date__gte=today
-        ).first()
+        discount = obj.get_active_discount()
         
         if discount:
             return DiscountSerializer(discount).data
         return None
     
     def get_discounted_price(self, obj):
-        active_discount = self.get_active_discount(obj)
-        if active_discount:
-            discount_percentage = active_discount['discount_percentage']
-            return float(obj.price) * (1 - float(discount_percentage) / 100)
+        discount = obj.get_active_discount()
+        if discount:
+            return float(obj.price) * (1 - float(discount.discount_percentage) / 100)
         return None
         
     def get_rating(self, obj):
-        avg_rating = obj.ratings.aggregate(Avg('rating'))['rating__avg']
+        # Ortalama, ürün üzerinde saklanan puan toplamı ve sayısından hesaplanır
+        avg_rating = obj.average_rating
         return avg_rating if avg_rating else 4.0  # Default puanı 4 olarak ayarlıyoruz
         
     def get_review_count(self, obj):
-        return obj.reviews.count() or 0  # En az 0 değeri döndürür
+        return obj.review_count or 0  # En az 0 değeri döndürür
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetsMixin, ProductListingFieldsMixin, serializers.ModelSerializer):
+    category_name = serializers.ReadOnlyField(source='category.name')
+    active_discount = serializers.SerializerMethodField()
+    discounted_price = serializers.SerializerMethodField()
+    rating = serializers.SerializerMethodField()
+    review_count = serializers.SerializerMethodField()
+
+    expandable_fields = {'category': (CategorySerializer, {})}
+    field_requirements = {
+        **LISTING_FIELD_REQUIREMENTS,
+        'category_name': {'select_related': ('category',), 'only': ()},
+    }
+    
+    class Meta:
+        model = Product
+        fields = ['id', 'category', 'category_name', 'name', 'slug', 'description', 'img_url',
+                  'price', 'stock', 'weight', 'available', 'is_in_stock', 
+                  'created_at', 'active_discount', 'discounted_price', 'rating', 'review_count']
+
+class ProductDetailSerializer(SparseFieldsetsMixin, ProductListingFieldsMixin, serializers.ModelSerializer):
+    """
+    Ürün detayı. Yorumların yalnızca ilk REVIEW_PREVIEW_SIZE tanesi gömülür; devamı
+    reviews_next bağlantısıyla feedback uç noktasından cursor ile okunur.
+    """
     category = CategorySerializer(read_only=True)
     active_discount = serializers.SerializerMethodField()
     discounted_price = serializers.SerializerMethodField()
-    reviews = ProductReviewSerializer(many=True, read_only=True)
+    reviews = serializers.SerializerMethodField()
+    reviews_next = serializers.SerializerMethodField()
     rating = serializers.SerializerMethodField()
     review_count = serializers.SerializerMethodField()
+
+    field_requirements = {
+        **LISTING_FIELD_REQUIREMENTS,
+        'reviews': {'prefetch_related': (review_preview_prefetch(),), 'only': ()},
+        'reviews_next': {'prefetch_related': (review_preview_prefetch(),), 'only': ('slug',)},
+    }
     
     class Meta:
         model = Product
         fields = ['id', 'category', 'name', 'slug', 'description', 'img_url',
                   'price', 'stock', 'weight', 'available', 'is_in_stock', 
-                  'created_at', 'active_discount', 'discounted_price', 'reviews', 'rating', 'review_count']
-    
-    def get_active_discount(self, obj):
-        today = timezone.now().date()
-        discount = obj.discounts.filter(
-            is_active=True,
-            start_date__lte=today,
-            end_date__gte=today
-        ).first()
-        
-        if discount:
-            return DiscountSerializer(discount).data
-        return None
-    
-    def get_discounted_price(self, obj):
-        active_discount = self.get_active_discount(obj)
-        if active_discount:
-            discount_percentage = active_discount['discount_percentage']
-            return float(obj.price) * (1 - float(discount_percentage) / 100)
-        return None
-        
-    def get_rating(self, obj):
-        avg_rating = obj.ratings.aggregate(Avg('rating'))['rating__avg']
-        return avg_rating if avg_rating else 4.0  # Default puanı 4 olarak ayarlıyoruz
-        
-    def get_review_count(self, obj):
-        return obj.reviews.count() or 0  # En az 0 değeri döndürür
+                  'created_at', 'active_discount', 'discounted_price', 'reviews', 'reviews_next',
+                  'rating', 'review_count']
+
+    def get_review_preview(self, obj):
+        # Product.objects.with_detail_data() ile önceden yüklenmediyse tek sorguyla alınır
+        if not hasattr(obj, 'review_preview'):
+            obj.review_preview = list(
+                obj.reviews.select_related('user').order_by('-created_at', '-id')[:REVIEW_PREVIEW_SIZE + 1]
+            )
+        return obj.review_preview
+
+    def get_reviews(self, obj):
+        reviews = self.get_review_preview(obj)[:REVIEW_PREVIEW_SIZE]
+        return ProductReviewSerializer(reviews, many=True, context=self.context).data
+
+    def get_reviews_next(self, obj):
+        preview = self.get_review_preview(obj)
+        if len(preview) <= REVIEW_PREVIEW_SIZE:
+            return None
+        # feedback uç noktası yorumları aynı (created_at, id) sırasıyla sayfalar
+        cursor = KeysetPagination().encode_cursor(preview[REVIEW_PREVIEW_SIZE - 1], False, ('-created_at', '-id'))
+        url = reverse('product-feedback', kwargs={'slug': obj.slug}, request=self.context.get('request'))
+        return replace_query_param(url, KeysetPagination.cursor_query_param, cursor)
 
 # Ürün puanlaması için create serializer
 class ProductRatingCreateSerializer(serializers.ModelSerializer):
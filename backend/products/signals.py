@@ -0,0 +1,143 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from ecommerce.cache import invalidate_namespace_on_commit
+from .models import Category, Product, Discount, ProductRating, ProductReview, prices_changed
+from .suggest import (
+    category_entry, invalidate_suggestions_on_commit, product_entry, suggestion_changed, suggestion_index,
+)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Discount)
+@receiver(post_delete, sender=Discount)
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+@receiver(post_save, sender=ProductRating)
+@receiver(post_delete, sender=ProductRating)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Katalogla ilgili herhangi bir kayıt değiştiğinde public katalog önbelleğini geçersiz kılar"""
+    invalidate_namespace_on_commit('catalog')
+
+
+@receiver(post_save, sender=Category)
+def handle_category_saved(sender, instance, created, raw=False, **kwargs):
+    """Kategori adı ürünlerin arama vektörüne dahil olduğu için ürünlerin vektörünü yeniler"""
+    if raw or created:
+        return
+    Product.objects.filter(category=instance).update_search_vector()
+
+
+@receiver(post_save, sender=Discount)
+@receiver(post_delete, sender=Discount)
+def handle_discount_change(sender, instance, **kwargs):
+    """
+    İndirim eklendiğinde, değiştiğinde veya silindiğinde ilgili ürünün saklanan
+    indirimli fiyatını yeniler. İndirim başka bir ürüne taşındıysa eski ürün de
+    active_discount üzerinden yakalanır.
+    """
+    if kwargs.get('raw'):
+        return
+    Product.refresh_effective_prices(
+        Product.objects.filter(Q(pk=instance.product_id) | Q(active_discount=instance.pk))
+    )
+    # Fiyat değişmese de (ör. bitiş tarihi) yanıttaki indirim bilgisi değişir;
+    # ETag/Last-Modified doğrulayıcıları için ürünün updated_at alanı yenilenir
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ProductRating)
+def handle_rating_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Puan eklendiğinde veya güncellendiğinde ürünün puan toplamı/sayısını günceller
+    """
+    if raw:
+        # loaddata gibi ham kayıtlarda istatistikler rebuild_product_aggregates ile yeniden hesaplanır
+        return
+
+    loaded_product_id = getattr(instance, '_loaded_product_id', None)
+    loaded_rating = getattr(instance, '_loaded_rating', None)
+
+    if created:
+        Product.adjust_rating_aggregates(instance.product_id, instance.rating, 1)
+    elif loaded_product_id is None or loaded_rating is None:
+        # Eski değer bilinmiyorsa ürünün istatistiklerini baştan hesapla
+        Product.rebuild_feedback_aggregates(Product.objects.filter(pk=instance.product_id))
+    elif loaded_product_id != instance.product_id:
+        # Puan başka bir ürüne taşındı
+        Product.adjust_rating_aggregates(loaded_product_id, -loaded_rating, -1)
+        Product.adjust_rating_aggregates(instance.product_id, instance.rating, 1)
+    elif loaded_rating != instance.rating:
+        Product.adjust_rating_aggregates(instance.product_id, instance.rating - loaded_rating)
+
+    instance._loaded_product_id = instance.product_id
+    instance._loaded_rating = instance.rating
+
+
+@receiver(post_delete, sender=ProductRating)
+def handle_rating_deleted(sender, instance, **kwargs):
+    """Puan silindiğinde ürünün puan toplamı/sayısını azaltır"""
+    Product.adjust_rating_aggregates(instance.product_id, -instance.rating, -1)
+
+
+@receiver(post_save, sender=ProductReview)
+def handle_review_saved(sender, instance, created, raw=False, **kwargs):
+    """Yorum eklendiğinde veya başka ürüne taşındığında yorum sayısını günceller"""
+    if raw:
+        return
+
+    loaded_product_id = getattr(instance, '_loaded_product_id', None)
+
+    if created:
+        Product.adjust_review_count(instance.product_id, 1)
+    elif loaded_product_id is not None and loaded_product_id != instance.product_id:
+        Product.adjust_review_count(loaded_product_id, -1)
+        Product.adjust_review_count(instance.product_id, 1)
+
+    instance._loaded_product_id = instance.product_id
+
+
+@receiver(post_delete, sender=ProductReview)
+def handle_review_deleted(sender, instance, **kwargs):
+    """Yorum silindiğinde yorum sayısını azaltır"""
+    Product.adjust_review_count(instance.product_id, -1)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def update_product_suggestion(sender, instance, signal, raw=False, **kwargs):
+    """Öneri indeksindeki ürünü işlem tamamlanınca günceller (satıştan kalktıysa çıkarır)"""
+    if raw:
+        return
+    if signal is post_save and not suggestion_changed(instance):
+        # Stok gibi öneride görünmeyen alanlar değişti
+        return
+    pk = instance.pk
+    entry = product_entry(instance) if signal is post_save and instance.available else None
+    transaction.on_commit(lambda: suggestion_index.update('product', pk, entry))
+    invalidate_suggestions_on_commit()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def update_category_suggestion(sender, instance, signal, raw=False, **kwargs):
+    """Öneri indeksindeki kategoriyi işlem tamamlanınca günceller"""
+    if raw:
+        return
+    if signal is post_save and not suggestion_changed(instance):
+        return
+    pk = instance.pk
+    entry = category_entry(instance) if signal is post_save else None
+    transaction.on_commit(lambda: suggestion_index.update('category', pk, entry))
+    invalidate_suggestions_on_commit()
+
+
+@receiver(prices_changed)
+def invalidate_suggestions_on_price_change(sender, product_ids, **kwargs):
+    """Toplu fiyat yenilemeleri (indirimler) post_save tetiklemez; öneri fiyatları da eskir"""
+    invalidate_suggestions_on_commit()
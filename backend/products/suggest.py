@@ -0,0 +1,213 @@
+"""
+Arama kutusu (autocomplete) için bellek içi önek indeksi.
+
+Ürün adları, kategori adları ve yayınlanmış blog başlıkları Türkçe karakterleri
+katlanmış halde, her kelimeden başlayan anahtarlarla sıralı bir listede tutulur
+("eski kaşar" -> "eski kasar", "kasar"). Sorgu ikili arama ile çözülür; veritabanına
+gidilmez.
+
+Tazelik:
+  - Kaydı değiştiren süreçte sinyaller indeksi işlem tamamlanınca artımlı günceller.
+  - Diğer gunicorn worker'ları, ecommerce.cache'teki 'suggest' alan sürümünü en fazla
+    SUGGEST_INDEX_CHECK_INTERVAL saniyede bir kontrol eder ve sürüm değiştiyse
+    indeksi veritabanından yeniden kurar. Bu sürüm catalog sürümünden ayrıdır;
+    yalnızca öneride görünen alanlar (ad, slug, görsel, fiyat, satış durumu, blog
+    başlığı/durumu) değiştiğinde artırılır. Stok, yorum ve puan değişiklikleri
+    indeksi yeniden kurdurmaz.
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from ecommerce.cache import get_namespace_version, invalidate_namespace_on_commit
+from .search import fold_turkish
+
+logger = logging.getLogger(__name__)
+
+# Sonuçlarda önce ürünler, sonra kategoriler, sonra blog yazıları gelir
+ENTRY_TYPES = ('product', 'category', 'blog')
+# Kısa öneklerde (ör. "k") gecikmeyi sınırlamak için taranacak en fazla anahtar
+MAX_SCAN = 200
+SUGGEST_NAMESPACE = 'suggest'
+
+
+def make_keys(text):
+    """Metindeki her kelimeden başlayan katlanmış anahtarları döndürür"""
+    words = re.findall(r'\w+', fold_turkish(text))
+    return [' '.join(words[position:]) for position in range(len(words))]
+
+
+class SuggestionSnapshotMixin:
+    """
+    Öneride görünen alanların (SUGGESTION_FIELDS) veritabanından yüklenen değerlerini
+    saklar; sinyaller indeksi yalnızca bu alanlar değiştiğinde yeniler (bkz.
+    suggestion_changed).
+    """
+    SUGGESTION_FIELDS = ()
+
+    def get_suggestion_values(self):
+        # Ertelenmiş alanlar sorgu atmadan None olarak alınır
+        return [self.__dict__.get(name) for name in self.SUGGESTION_FIELDS]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_suggestion = instance.get_suggestion_values()
+        return instance
+
+
+def suggestion_changed(instance):
+    """
+    Kaydın öneride görünen alanları yüklendiğinden veya son kontrolden beri
+    değiştiyse True döndürür; yeni kayıtlar için her zaman True.
+    """
+    loaded = getattr(instance, '_loaded_suggestion', None)
+    current = instance.get_suggestion_values()
+    instance._loaded_suggestion = current
+    return loaded != current
+
+
+def invalidate_suggestions_on_commit():
+    """Diğer süreçlerdeki indekslerin yeniden kurulması için öneri sürümünü artırır"""
+    invalidate_namespace_on_commit(SUGGEST_NAMESPACE)
+
+
+def product_entry(product):
+    # Saklanan indirimli fiyat kullanılır; get_current_price() eksik satırlarda sorgu atar
+    price = product.current_price if product.current_price is not None else product.price
+    return {
+        'type': 'product',
+        'slug': product.slug,
+        'name': product.name,
+        'img_url': product.img_url,
+        'price': str(price),
+    }
+
+
+def category_entry(category):
+    return {
+        'type': 'category',
+        'slug': category.slug,
+        'name': category.name,
+        'img_url': category.image.url if category.image else None,
+        'price': None,
+    }
+
+
+def blog_entry(blog):
+    return {
+        'type': 'blog',
+        'slug': blog.slug,
+        'name': blog.title,
+        'img_url': blog.featured_image,
+        'price': None,
+    }
+
+
+class SuggestionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # Okuyucular kilit almaz; yazarlar yeni bir (anahtarlar, girişler) çifti
+        # oluşturup tek atamayla değiştirir
+        self._state = None
+        self._versions = None
+        self._checked_at = 0
+
+    def _current_versions(self):
+        try:
+            return get_namespace_version(SUGGEST_NAMESPACE)
+        except Exception as e:
+            logger.warning(f"Öneri indeksi sürümü okunamadı: {str(e)}")
+            return None
+
+    def rebuild(self, versions=None):
+        """İndeksi veritabanından baştan kurar"""
+        from blog.models import Blog
+        from .models import Category, Product
+
+        entries = {}
+        for product in Product.objects.filter(available=True).only(
+            'pk', 'slug', 'name', 'img_url', 'price', 'current_price'
+        ):
+            entries[('product', product.pk)] = product_entry(product)
+        for category in Category.objects.only('pk', 'slug', 'name', 'image'):
+            entries[('category', category.pk)] = category_entry(category)
+        for blog in Blog.objects.filter(status='published').only('pk', 'slug', 'title', 'featured_image'):
+            entries[('blog', blog.pk)] = blog_entry(blog)
+
+        keys = sorted(
+            (key, position, entry_id)
+            for entry_id, entry in entries.items()
+            for position, key in enumerate(make_keys(entry['name']))
+        )
+        self._state = (keys, entries)
+        self._versions = versions if versions is not None else self._current_versions()
+        self._checked_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Gerekirse (ilk kullanım veya başka süreçte değişiklik) indeksi yeniden kurar"""
+        now = time.monotonic()
+        interval = getattr(settings, 'SUGGEST_INDEX_CHECK_INTERVAL', 5)
+        if self._state is not None and now - self._checked_at < interval:
+            return
+        self._checked_at = now
+
+        versions = self._current_versions()
+        if self._state is not None and (versions is None or versions == self._versions):
+            return
+
+        # İlk kurulumda beklenir; sonraki yenilemeler sürerken diğer istekler eski indeksi kullanır
+        if self._lock.acquire(blocking=self._state is None):
+            try:
+                if self._state is None or versions != self._versions:
+                    self.rebuild(versions)
+            finally:
+                self._lock.release()
+
+    def update(self, entry_type, pk, entry=None):
+        """Tek bir girişi ekler/günceller; entry None ise siler"""
+        with self._lock:
+            if self._state is None:
+                # Henüz kurulmadıysa ilk kullanımda zaten güncel haliyle kurulur
+                return
+            keys, entries = self._state
+            entry_id = (entry_type, pk)
+            entries = dict(entries)
+            keys = [item for item in keys if item[2] != entry_id]
+            entries.pop(entry_id, None)
+            if entry is not None:
+                entries[entry_id] = entry
+                for position, key in enumerate(make_keys(entry['name'])):
+                    bisect.insort(keys, (key, position, entry_id))
+            self._state = (keys, entries)
+
+    def lookup(self, query, limit=8):
+        """Sorgu önekiyle eşleşen en fazla limit kadar girişi döndürür"""
+        prefix = ' '.join(re.findall(r'\w+', fold_turkish(query)))
+        if not prefix or self._state is None:
+            return []
+
+        keys, entries = self._state
+        start = bisect.bisect_left(keys, (prefix,))
+        matches = {}
+        for index in range(start, min(len(keys), start + MAX_SCAN)):
+            key, position, entry_id = keys[index]
+            if not key.startswith(prefix):
+                break
+            # Adın başından eşleşenler önce; sonra tür sırası ve eşleşen anahtara göre
+            rank = (position > 0, ENTRY_TYPES.index(entry_id[0]), key)
+            if entry_id not in matches or rank < matches[entry_id]:
+                matches[entry_id] = rank
+
+        ranked = sorted(matches, key=matches.get)
+        return [entries[entry_id] for entry_id in ranked[:limit]]
+
+
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,13 @@
+from celery import shared_task
+from ecommerce.cache import invalidate_namespace
+from .models import Product
+
+
+@shared_task
+def refresh_effective_prices():
+    """İndirim dönemi sınırlarında (her gece yarısı) ürünlerin indirimli fiyatlarını yeniler."""
+    updated = Product.refresh_effective_prices()
+    if updated:
+        # Toplu güncelleme sinyal tetiklemediği için katalog önbelleği burada temizlenir
+        invalidate_namespace('catalog')
+    return f"{updated} ürünün indirimli fiyatı güncellendi."
@@ -1,3 +1,743 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from ecommerce.cache import get_namespace_version
+from .inventory import InsufficientStock, release_stock, reserve_stock
+from .models import Category, Product, Discount, ProductReview, ProductRating
+from .suggest import suggestion_index
+
+# Görünüm testleri Redis yerine önbelleği devre dışı bırakan backend ile çalışır
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=NO_CACHE)
+class ProductQueryCountTests(TestCase):
+    """Ürün listeleme uç noktalarının sorgu sayısı ürün sayısından bağımsız olmalı"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.users = [
+            User.objects.create_user(username=f'kullanici{i}', password='sifre12345')
+            for i in range(3)
+        ]
+
+    def create_products(self, count):
+        today = timezone.now().date()
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                category=self.category,
+                name=f'Ürün {i}',
+                slug=f'urun-{i}',
+                price=Decimal('100.00'),
+                stock=10,
+            )
+            Discount.objects.create(
+                product=product,
+                discount_percentage=Decimal('10.00'),
+                start_date=today - timedelta(days=1),
+                end_date=today + timedelta(days=1),
+            )
+            for user in self.users:
+                ProductRating.objects.create(product=product, user=user, rating=5)
+                ProductReview.objects.create(product=product, user=user, review='Harika')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_list_query_count_is_constant(self):
+        self.create_products(2)
+        small, _ = self.count_queries('/api/products/')
+        self.create_products(20)
+        large, response = self.count_queries('/api/products/')
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data), 22)
+
+    def test_category_products_query_count_is_constant(self):
+        # Kategori ürünleri uç noktası yalnızca yöneticilere açıktır
+        self.client.force_authenticate(User.objects.create_user(username='yonetici', password='sifre12345', is_staff=True))
+        url = f'/api/categories/{self.category.slug}/products/'
+        self.create_products(2)
+        small, _ = self.count_queries(url)
+        self.create_products(20)
+        large, _ = self.count_queries(url)
+        self.assertEqual(small, large)
+
+    def test_get_by_slug_query_count_is_constant(self):
+        self.create_products(1)
+        product = Product.objects.get()
+        url = f'/api/products/by-slug/{product.slug}/'
+        small, _ = self.count_queries(url)
+        for i in range(10):
+            user = User.objects.create_user(username=f'yorumcu{i}', password='sifre12345')
+            ProductReview.objects.create(product=product, user=user, review='Güzel')
+        large, response = self.count_queries(url)
+        self.assertEqual(small, large)
+        self.assertEqual(response.data['review_count'], 13)
+
+    def test_list_payload_shape(self):
+        self.create_products(1)
+        _, response = self.count_queries('/api/products/')
+        item = response.data[0]
+        self.assertEqual(item['category_name'], 'Kaşar')
+        self.assertEqual(item['active_discount']['discount_percentage'], '10.00')
+        self.assertAlmostEqual(item['discounted_price'], 90.0)
+        self.assertEqual(item['rating'], 5.0)
+        self.assertEqual(item['review_count'], 3)
+
+
+@override_settings(CACHES=NO_CACHE)
+class ProductFeedbackAggregateTests(TestCase):
+    """Ürün üzerinde saklanan puan/yorum istatistikleri her yazma işleminde güncel kalmalı"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.product = Product.objects.create(category=category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('250.00'))
+        self.other = Product.objects.create(category=category, name='Taze Kaşar', slug='taze-kasar', price=Decimal('150.00'))
+        self.user = User.objects.create_user(username='ayse', password='sifre12345')
+        self.user2 = User.objects.create_user(username='mehmet', password='sifre12345')
+
+    def assertAggregates(self, product, rating_sum, rating_count, review_count):
+        product.refresh_from_db()
+        self.assertEqual(
+            (product.rating_sum, product.rating_count, product.review_count),
+            (rating_sum, rating_count, review_count),
+        )
+
+    def test_rating_create_update_move_and_delete(self):
+        rating = ProductRating.objects.create(product=self.product, user=self.user, rating=4)
+        ProductRating.objects.create(product=self.product, user=self.user2, rating=2)
+        self.assertAggregates(self.product, 6, 2, 0)
+        self.assertEqual(self.product.average_rating, 3)
+
+        rating = ProductRating.objects.get(pk=rating.pk)
+        rating.rating = 5
+        rating.save()
+        self.assertAggregates(self.product, 7, 2, 0)
+
+        rating.product = self.other
+        rating.save()
+        self.assertAggregates(self.product, 2, 1, 0)
+        self.assertAggregates(self.other, 5, 1, 0)
+
+        ProductRating.objects.filter(product=self.product).delete()
+        self.assertAggregates(self.product, 0, 0, 0)
+        self.assertIsNone(self.product.average_rating)
+
+    def test_review_count_follows_reviews(self):
+        review = ProductReview.objects.create(product=self.product, user=self.user, review='Güzel')
+        ProductReview.objects.create(product=self.product, user=self.user2, review='Fena değil')
+        self.assertAggregates(self.product, 0, 0, 2)
+        review.delete()
+        self.assertAggregates(self.product, 0, 0, 1)
+
+    def test_rebuild_fixes_drift(self):
+        ProductRating.objects.create(product=self.product, user=self.user, rating=4)
+        Product.objects.filter(pk=self.product.pk).update(rating_sum=0, rating_count=0, review_count=7)
+        changed = Product.rebuild_feedback_aggregates(dry_run=True)
+        self.assertEqual([p.pk for p in changed], [self.product.pk])
+        self.assertAggregates(self.product, 0, 0, 7)
+        Product.rebuild_feedback_aggregates()
+        self.assertAggregates(self.product, 4, 1, 0)
+
+    def test_ordering_by_rating(self):
+        ProductRating.objects.create(product=self.product, user=self.user, rating=2)
+        ProductRating.objects.create(product=self.other, user=self.user, rating=5)
+        response = APIClient().get('/api/products/?ordering=-rating_avg')
+        self.assertEqual([item['slug'] for item in response.data], ['taze-kasar', 'eski-kasar'])
+        response = APIClient().get('/api/products/?min_rating=3')
+        self.assertEqual([item['slug'] for item in response.data], ['taze-kasar'])
+
+
+@override_settings(CACHES=NO_CACHE)
+class EffectivePriceTests(TestCase):
+    """İndirimli fiyat ürün üzerinde saklanmalı ve indirim değişikliklerinde yenilenmeli"""
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.product = Product.objects.create(category=self.category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('200.00'))
+        self.today = timezone.localdate()
+
+    def test_discount_save_and_delete_refresh_price(self):
+        self.assertEqual(self.product.current_price, Decimal('200.00'))
+        discount = Discount.objects.create(
+            product=self.product, discount_percentage=Decimal('25.00'),
+            start_date=self.today, end_date=self.today,
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_price, Decimal('150.00'))
+        self.assertEqual(self.product.active_discount_id, discount.pk)
+
+        discount.is_active = False
+        discount.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_price, Decimal('200.00'))
+        self.assertIsNone(self.product.active_discount_id)
+
+        discount.is_active = True
+        discount.save()
+        discount.delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_price, Decimal('200.00'))
+
+    def test_price_change_keeps_discount(self):
+        Discount.objects.create(
+            product=self.product, discount_percentage=Decimal('10.00'),
+            start_date=self.today, end_date=self.today,
+        )
+        self.product.refresh_from_db()
+        self.product.price = Decimal('300.00')
+        self.product.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_price, Decimal('270.00'))
+        self.assertEqual(self.product.get_current_price(), Decimal('270.00'))
+
+    def test_refresh_applies_discount_windows(self):
+        Discount.objects.create(
+            product=self.product, discount_percentage=Decimal('50.00'),
+            start_date=self.today + timedelta(days=1), end_date=self.today + timedelta(days=2),
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_price, Decimal('200.00'))
+
+        # Gece yarısı geçtiğinde görev indirimi devreye alır
+        Discount.objects.update(start_date=self.today)
+        self.assertEqual(Product.refresh_effective_prices(), 1)
+        self.assertEqual(Product.refresh_effective_prices(), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.current_price, Decimal('100.00'))
+
+    def test_price_filter_uses_discounted_price(self):
+        Product.objects.create(category=self.category, name='Taze Kaşar', slug='taze-kasar', price=Decimal('120.00'))
+        Discount.objects.create(
+            product=self.product, discount_percentage=Decimal('50.00'),
+            start_date=self.today, end_date=self.today,
+        )
+        response = APIClient().get('/api/products/?max_price=110')
+        self.assertEqual([item['slug'] for item in response.data], ['eski-kasar'])
+        self.assertAlmostEqual(response.data[0]['discounted_price'], 100.0)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CatalogResponseCacheTests(TestCase):
+    """Anonim katalog istekleri önbellekten sunulmalı ve değişikliklerde geçersiz kılınmalı"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.product = Product.objects.create(category=self.category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('200.00'))
+
+    def test_anonymous_list_is_served_from_cache(self):
+        self.client.get('/api/products/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.data[0]['name'], 'Eski Kaşar')
+
+    def test_query_params_are_normalized(self):
+        self.client.get('/api/products/?ordering=name&search=')
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/?ordering=name')
+
+    def test_product_change_invalidates_cache(self):
+        self.client.get('/api/products/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'Yıllanmış Kaşar'
+            self.product.save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.data[0]['name'], 'Yıllanmış Kaşar')
+
+    def test_authenticated_requests_bypass_cache(self):
+        admin = User.objects.create_superuser(username='admin', password='sifre12345', email='admin@kasarcim.com')
+        self.client.force_authenticate(admin)
+        self.client.get('/api/products/')
+        Product.objects.filter(pk=self.product.pk).update(available=False)
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.data[0]['available'], False)
+
+    def test_cache_write_failure_still_serves_response(self):
+        # Okumadan sonra Redis bağlantısı koparsa başarılı yanıt 500'e dönmemeli
+        with mock.patch.object(cache, 'set', side_effect=ConnectionError), \
+                mock.patch.object(cache, 'incr', side_effect=ConnectionError), \
+                self.assertLogs('ecommerce.cache', level='WARNING'):
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['name'], 'Eski Kaşar')
+
+    def test_stats_endpoint(self):
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        admin = User.objects.create_superuser(username='admin', password='sifre12345', email='admin@kasarcim.com')
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/cache-stats/')
+        self.assertEqual(response.data['catalog']['hits'], 1)
+        self.assertEqual(response.data['catalog']['misses'], 1)
+
+
+@override_settings(CACHES=NO_CACHE)
+class ConditionalRequestTests(TestCase):
+    """Katalog uç noktaları ETag/Last-Modified üretmeli ve değişmemiş içerik için 304 dönmeli"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.product = Product.objects.create(category=self.category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('200.00'))
+        self.user = User.objects.create_user(username='ayse', password='sifre12345')
+
+    def test_list_returns_304_for_matching_etag(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        etag = response['ETag']
+
+        # Doğrulayıcı sorgusu dışında hiçbir sorgu çalışmaz
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_query_params(self):
+        etag = self.client.get('/api/products/')['ETag']
+        response = self.client.get('/api/products/?ordering=name', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_related_changes_change_etag(self):
+        url = f'/api/products/by-slug/{self.product.slug}/'
+        etags = [self.client.get(url)['ETag']]
+
+        ProductReview.objects.create(product=self.product, user=self.user, review='Güzel')
+        etags.append(self.client.get(url)['ETag'])
+
+        Discount.objects.create(
+            product=self.product, discount_percentage=Decimal('10.00'),
+            start_date=timezone.localdate(), end_date=timezone.localdate(),
+        )
+        etags.append(self.client.get(url)['ETag'])
+
+        Category.objects.filter(pk=self.category.pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+        etags.append(self.client.get(url)['ETag'])
+
+        self.assertEqual(len(set(etags)), 4)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[-1])
+        self.assertEqual(response.status_code, 304)
+
+    def test_deleted_product_changes_list_etag(self):
+        other = Product.objects.create(category=self.category, name='Taze Kaşar', slug='taze-kasar', price=Decimal('150.00'))
+        etag = self.client.get('/api/products/')['ETag']
+        other.delete()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+    def test_if_modified_since_on_detail(self):
+        url = f'/api/products/{self.product.slug}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_authenticated_responses_are_private(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/categories/')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('Authorization', response['Vary'])
+
+
+@override_settings(CACHES=NO_CACHE)
+class ProductSearchTests(TestCase):
+    """?search= Türkçe kök, karakter katlama, önek ve yazım hatası toleransıyla çalışmalı"""
+
+    def setUp(self):
+        self.cheese = Category.objects.create(name='Kaşar Peyniri', slug='kasar-peyniri')
+        self.other = Category.objects.create(name='Şarküteri', slug='sarkuteri')
+        Product.objects.create(category=self.cheese, name='Eski Kaşar', slug='eski-kasar', price=Decimal('250.00'))
+        Product.objects.create(category=self.cheese, name='Taze Kaşar', slug='taze-kasar', price=Decimal('150.00'))
+        Product.objects.create(
+            category=self.other, name='Sucuk', slug='sucuk', price=Decimal('300.00'),
+            description='Kahvaltıda kaşarla birlikte tostlarda ideal',
+        )
+        Product.objects.create(category=self.other, name='Işık Pastırması', slug='isik-pastirmasi', price=Decimal('400.00'))
+
+    def search(self, term, **params):
+        response = APIClient().get('/api/products/', {'search': term, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['slug'] for item in response.data]
+
+    def test_stemming_and_ranking(self):
+        # Ad eşleşmesi, açıklama eşleşmesinden önce gelir
+        self.assertEqual(self.search('kaşarları'), ['eski-kasar', 'taze-kasar', 'sucuk'])
+
+    def test_turkish_character_folding(self):
+        self.assertEqual(self.search('ISIK pastirma'), ['isik-pastirmasi'])
+        self.assertEqual(set(self.search('kasar')), {'eski-kasar', 'taze-kasar', 'sucuk'})
+
+    def test_prefix_and_typo_tolerance(self):
+        self.assertEqual(self.search('pastı'), ['isik-pastirmasi'])
+        self.assertEqual(self.search('sucukk'), ['sucuk'])
+
+    def test_typo_fallback_is_decided_after_filters(self):
+        # "kahvaltı" yalnızca diğer kategorideki sucuğun açıklamasında geçer
+        Product.objects.create(category=self.cheese, name='Kahvalıt Kaşarı', slug='kahvalit-kasari', price=Decimal('100.00'))
+        self.assertEqual(self.search('kahvaltı', category_slug='kasar-peyniri'), ['kahvalit-kasari'])
+        self.assertEqual(self.search('kahvaltı'), ['sucuk'])
+
+    def test_search_adds_no_queries(self):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as plain:
+            client.get('/api/products/')
+        for term in ('kaşar', 'sucukk'):
+            with self.assertNumQueries(len(plain.captured_queries)):
+                self.search(term)
+
+    def test_explicit_ordering_wins(self):
+        self.assertEqual(self.search('kaşar', ordering='-price'), ['sucuk', 'eski-kasar', 'taze-kasar'])
+
+    def test_vector_follows_product_and_category_changes(self):
+        self.other.name = 'Et Ürünleri'
+        self.other.save()
+        self.assertEqual(self.search('ürünleri'), ['isik-pastirmasi', 'sucuk'])
+
+        product = Product.objects.get(slug='sucuk')
+        product.name = 'Kangal Sucuk'
+        product.save(update_fields=['name'])
+        self.assertEqual(self.search('kangal'), ['sucuk'])
+
+    def test_full_save_recomputes_vector_only_when_searchable_fields_change(self):
+        product = Product.objects.get(slug='sucuk')
+        product.available = False
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+        self.assertFalse(any('to_tsvector' in q['sql'] for q in queries.captured_queries))
+
+        product.available = True
+        product.name = 'Kangal Sucuk'
+        product.save()
+        self.assertEqual(self.search('kangal'), ['sucuk'])
+
+        product.description = 'Fırında yumurtalı'
+        product.save()
+        self.assertEqual(self.search('yumurtalı'), ['sucuk'])
+
+
+@override_settings(CACHES=LOCMEM_CACHE, SUGGEST_INDEX_CHECK_INTERVAL=0)
+class SuggestTests(TestCase):
+    """Arama önerileri bellek içi indeksten, veritabanına gitmeden gelmeli"""
+
+    def setUp(self):
+        cache.clear()
+        suggestion_index.reset()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Kaşar Peyniri', slug='kasar-peyniri')
+        Product.objects.create(category=self.category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('250.00'), img_url='/eski.jpg')
+        Product.objects.create(category=self.category, name='Kars Gravyeri', slug='kars-gravyeri', price=Decimal('400.00'))
+        Product.objects.create(category=self.category, name='Satışta Olmayan Kaşar', slug='yok', price=Decimal('10.00'), available=False)
+
+    def suggest(self, q, **params):
+        response = self.client.get('/api/products/suggest/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_prefix_folding_and_order(self):
+        results = self.suggest('kas')
+        self.assertEqual([item['slug'] for item in results], ['kasar-peyniri', 'eski-kasar'])
+        self.assertEqual(results[1], {
+            'type': 'product', 'slug': 'eski-kasar', 'name': 'Eski Kaşar',
+            'img_url': '/eski.jpg', 'price': '250.00',
+        })
+        self.assertEqual([item['slug'] for item in self.suggest('KARS G')], ['kars-gravyeri'])
+        self.assertEqual(self.suggest(''), [])
+        self.assertEqual(len(self.suggest('k', limit=1)), 1)
+
+    def test_lookup_does_not_hit_database(self):
+        self.suggest('kas')
+        with override_settings(SUGGEST_INDEX_CHECK_INTERVAL=60), self.assertNumQueries(0):
+            self.suggest('eski')
+
+    def test_signals_update_index_incrementally(self):
+        self.suggest('kas')
+        with override_settings(SUGGEST_INDEX_CHECK_INTERVAL=60):
+            with self.captureOnCommitCallbacks(execute=True):
+                product = Product.objects.create(category=self.category, name='Ezine Peyniri', slug='ezine', price=Decimal('300.00'))
+            with self.assertNumQueries(0):
+                self.assertEqual([item['slug'] for item in self.suggest('ezi')], ['ezine'])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                product.available = False
+                product.save()
+            self.assertEqual(self.suggest('ezi'), [])
+
+    def test_other_worker_changes_trigger_rebuild(self):
+        self.suggest('kas')
+        # Başka bir süreçte yapılmış gibi: sinyalsiz değişiklik + katalog sürümü artışı
+        Product.objects.filter(slug='kars-gravyeri').update(name='Kars Kaşarı')
+        with self.captureOnCommitCallbacks(execute=True):
+            Discount.objects.create(
+                product=Product.objects.get(slug='eski-kasar'), discount_percentage=Decimal('20.00'),
+                start_date=timezone.localdate(), end_date=timezone.localdate(),
+            )
+        results = self.suggest('kars')
+        self.assertEqual([item['name'] for item in results], ['Kars Kaşarı'])
+        self.assertEqual(self.suggest('eski')[0]['price'], '200.00')
+
+    def test_stock_and_feedback_changes_keep_index(self):
+        self.suggest('kas')
+        version = get_namespace_version('suggest')
+        product = Product.objects.get(slug='eski-kasar')
+        user = User.objects.create_user(username='oneri', password='sifre12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            reserve_stock([(product.pk, 0)])
+            release_stock([(product.pk, 2)])
+            product.refresh_from_db()
+            product.stock = 5
+            product.save()
+            ProductReview.objects.create(product=product, user=user, review='Güzel')
+            ProductRating.objects.create(product=product, user=user, rating=5)
+        self.assertEqual(get_namespace_version('suggest'), version)
+
+        with self.assertNumQueries(0):
+            self.suggest('eski')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Eski Kaşar Peyniri'
+            product.save()
+        self.assertNotEqual(get_namespace_version('suggest'), version)
+
+    def test_lookup_latency(self):
+        Product.objects.bulk_create([
+            Product(category=self.category, name=f'Ürün {i} Kaşar', slug=f'urun-{i}', price=Decimal('1.00'), current_price=Decimal('1.00'))
+            for i in range(5000)
+        ])
+        suggestion_index.rebuild()
+        durations = []
+        for prefix in ['k', 'ka', 'kas', 'ür', 'urun 12', 'eski']:
+            for _ in range(100):
+                start = time.perf_counter()
+                suggestion_index.lookup(prefix)
+                durations.append(time.perf_counter() - start)
+        durations.sort()
+        self.assertLess(durations[int(len(durations) * 0.99)], 0.005)
+
+
+@override_settings(CACHES=NO_CACHE)
+class KeysetPaginationTests(TestCase):
+    """?pagination=cursor ve ?count=false modları; parametresiz istekler eskisi gibi kalmalı"""
+
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.product = Product.objects.create(category=category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('250.00'))
+        for i in range(7):
+            Product.objects.create(category=category, name=f'Ürün {i}', slug=f'urun-{i}', price=Decimal('10.00'))
+        now = timezone.now()
+        for i in range(25):
+            user = User.objects.create_user(username=f'yorumcu{i}', password='sifre12345')
+            review = ProductReview.objects.create(product=self.product, user=user, review=f'Yorum {i}')
+            ProductRating.objects.create(product=self.product, user=user, rating=i % 5 + 1)
+        # Aynı zaman damgasına sahip yorumlar id ile ayrışmalı
+        ProductReview.objects.update(created_at=now)
+        self.feedback_url = f'/api/products/{self.product.slug}/feedback/'
+
+    def walk(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_feedback_cursor_walks_all_reviews_once(self):
+        expected = list(ProductReview.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids, last = self.walk(self.feedback_url, {'pagination': 'cursor'})
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(last.data['results']), 5)
+
+        # Geri gidildiğinde bir önceki sayfa aynen gelir
+        response = self.client.get(last.data['previous'])
+        self.assertEqual([item['id'] for item in response.data['results']], expected[10:20])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_feedback_page_numbers_unchanged(self):
+        response = self.client.get(self.feedback_url, {'page': 2})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['results'][0]['user_rating'])
+
+    def test_no_count_mode_skips_count_query(self):
+        with CaptureQueriesContext(connection) as context:
+            ids, _ = self.walk(self.feedback_url, {'count': 'false', 'page_size': 10})
+        self.assertEqual(len(ids), 25)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+
+    def test_product_list_pagination_is_opt_in(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(len(response.data), 8)
+
+        ids, _ = self.walk('/api/products/', {'pagination': 'cursor', 'page_size': 3, 'ordering': '-name'})
+        expected = list(Product.objects.order_by('-name', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_cursor_rejects_unsupported_ordering(self):
+        for params in ({'ordering': '-price'}, {'search': 'kaşar'}):
+            response = self.client.get('/api/products/', {'pagination': 'cursor', **params})
+            self.assertEqual(response.status_code, 400)
+        # Aynı sıralamalar sayfa numarasıyla ve arama açık sıralamayla sayfalanabilir
+        response = self.client.get('/api/products/', {'page': 1, 'ordering': '-price'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/products/', {'pagination': 'cursor', 'search': 'eski', 'ordering': 'name'})
+        self.assertEqual([item['slug'] for item in response.data['results']], ['eski-kasar'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.feedback_url, {'cursor': 'bozuk'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=NO_CACHE)
+class ProductDetailReviewPreviewTests(TestCase):
+    """Ürün detayı yorumların yalnızca ilk sayfasını gömmeli, ?fields= ile yorumlar atlanabilmeli"""
+
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.product = Product.objects.create(category=category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('250.00'))
+        for i in range(8):
+            user = User.objects.create_user(username=f'yorumcu{i}', password='sifre12345')
+            ProductReview.objects.create(product=self.product, user=user, review=f'Yorum {i}')
+        self.url = f'/api/products/by-slug/{self.product.slug}/'
+
+    def test_embeds_first_page_with_next_link(self):
+        expected = list(ProductReview.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        response = self.client.get(self.url)
+        self.assertEqual([review['id'] for review in response.data['reviews']], expected[:5])
+        self.assertEqual(response.data['review_count'], 8)
+
+        response = self.client.get(response.data['reviews_next'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([review['id'] for review in response.data['results']], expected[5:])
+
+    def test_no_next_link_for_few_reviews(self):
+        ProductReview.objects.filter(pk__in=ProductReview.objects.values('pk')[:3]).delete()
+        response = self.client.get(f'/api/products/{self.product.slug}/')
+        self.assertEqual(len(response.data['reviews']), 5)
+        self.assertIsNone(response.data['reviews_next'])
+
+    def test_sparse_fields_skip_reviews(self):
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as sparse:
+            response = self.client.get(self.url, {'fields': 'id,name,price'})
+        self.assertEqual(set(response.data), {'id', 'name', 'price'})
+        self.assertLess(len(sparse.captured_queries), len(full.captured_queries))
+        self.assertFalse(any('products_productreview' in query['sql'] for query in sparse.captured_queries))
+
+
+@override_settings(CACHES=NO_CACHE)
+class ProductSparseFieldsetsTests(TestCase):
+    """Ürün listesinde ?fields= / ?omit= / ?expand="""
+
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        for i in range(3):
+            Product.objects.create(category=category, name=f'Ürün {i}', slug=f'urun-{i}', description='Uzun açıklama', price=Decimal('10.00'))
+
+    def test_fields_reads_only_needed_columns(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/products/', {'fields': 'id,name,discounted_price'})
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'discounted_price'})
+        product_query = next(
+            query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT "products_product"."id"')
+        )
+        self.assertNotIn('"description"', product_query)
+        self.assertNotIn('"products_category"', product_query)
+
+    def test_omit(self):
+        response = self.client.get('/api/products/', {'omit': 'description,category_name'})
+        self.assertNotIn('description', response.data[0])
+        self.assertNotIn('category_name', response.data[0])
+        self.assertIn('rating', response.data[0])
+
+    def test_expand_category(self):
+        response = self.client.get('/api/products/', {'expand': 'category'})
+        self.assertEqual(response.data[0]['category']['slug'], 'kasar')
+        self.assertEqual(self.client.get('/api/products/').data[0]['category'], Category.objects.get().pk)
+
+
+@override_settings(CACHES=NO_CACHE)
+class InventoryTests(TestCase):
+    """Stok ayırma tek koşullu UPDATE ile yapılmalı ve ya hep ya hiç çalışmalı"""
+
+    def setUp(self):
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        self.first = Product.objects.create(category=category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('250.00'), stock=5)
+        self.second = Product.objects.create(category=category, name='Tulum', slug='tulum', price=Decimal('150.00'), stock=1)
+
+    def stocks(self):
+        return list(Product.objects.order_by('pk').values_list('stock', flat=True))
+
+    def test_reserve_and_release(self):
+        with CaptureQueriesContext(connection) as context:
+            reserve_stock([(self.first.pk, 2), (self.second.pk, 1), (self.first.pk, 1)])
+        self.assertEqual(self.stocks(), [2, 0])
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in context.captured_queries), 1)
+
+        release_stock({self.first.pk: 3, self.second.pk: 1})
+        self.assertEqual(self.stocks(), [5, 1])
+
+    def test_insufficient_stock_changes_nothing(self):
+        with self.assertRaises(InsufficientStock) as context:
+            reserve_stock([(self.first.pk, 2), (self.second.pk, 3)])
+        self.assertEqual(context.exception.failures, [{'product_id': self.second.pk, 'requested': 3, 'available': 1}])
+        self.assertEqual(self.stocks(), [5, 1])
+
+
+@override_settings(CACHES=NO_CACHE)
+class InventoryConcurrencyTests(TransactionTestCase):
+    """Aynı ürün için yarışan istekler stoğu hiçbir zaman negatife düşürmemeli"""
+
+    def test_concurrent_reservations_never_oversell(self):
+        category = Category.objects.create(name='Kaşar', slug='kasar')
+        product = Product.objects.create(category=category, name='Eski Kaşar', slug='eski-kasar', price=Decimal('250.00'), stock=10)
+        workers = 25
+        barrier = threading.Barrier(workers)
+        results = []
+
+        def buy():
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    reserve_stock([(product.pk, 1)])
+                results.append(True)
+            except InsufficientStock:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(True), 10)
+        self.assertEqual(results.count(False), workers - 10)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
@@ -4,7 +4,6 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend, FilterSet
 import django_filters
 from django.db.models import Prefetch
@@ -16,38 +15,100 @@ from .serializers import (
     ProductFeedbackSerializer
 )
 from orders.models import OrderItem
+from ecommerce.cache import cache_response
+from ecommerce.conditional import ConditionalGetMixin
+from ecommerce.pagination import KeysetPagination
+from ecommerce.serializers import SparseFieldsetsViewMixin, is_field_requested
+from .suggest import suggestion_index
 
 # Custom Pagination Class
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    # Yorum listeleri için keyset sıralaması (bkz. ProductReview indeksleri)
+    cursor_ordering = ('-created_at', '-id')
+
+
+class ReviewPagination(StandardResultsSetPagination):
+    # Yorum listeleri varsayılan olarak tam liste döner; sayfalama parametreyle açılır
+    paginate_by_default = False
+
+
+class ProductPagination(KeysetPagination):
+    # Ürün listesi frontend için sayfalanmamış döner; ?pagination=cursor, ?count=false
+    # veya ?page= ile sayfalama açılır
+    paginate_by_default = False
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_ordering = ('name', 'id')
+    cursor_orderings = {
+        'name': ('name', 'id'),
+        '-name': ('-name', '-id'),
+        'created_at': ('created_at', 'id'),
+        '-created_at': ('-created_at', '-id'),
+    }
+    # Arama sonuçları ?ordering= verilmediyse alaka puanına göre sıralıdır
+    cursor_unsupported_params = ('search',)
 
 # Create your views here.
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAdminUser]
     lookup_field = 'slug'
+    conditional_list_actions = ('list', 'products')
+    conditional_cache_namespace = 'catalog'
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             return [permissions.AllowAny()]
         return super().get_permissions()
+
+    def get_conditional_queryset(self):
+        if self.action == 'products':
+            return Product.objects.filter(category__slug=self.kwargs['slug'], available=True)
+        return super().get_conditional_queryset()
+
+    def get_conditional_timestamp_fields(self):
+        if self.action == 'products':
+            return ('updated_at', 'category__updated_at')
+        return super().get_conditional_timestamp_fields()
+
+    @cache_response('catalog')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     @action(detail=True, methods=['get'])
     def products(self, request, slug=None):
         category = self.get_object()
-        products = Product.objects.filter(category=category, available=True)
+        products = Product.objects.with_listing_data().filter(category=category, available=True)
         serializer = ProductSerializer(products, many=True)
         return Response(serializer.data)
 
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ?search= parametresini ILIKE yerine PostgreSQL tam metin aramasıyla karşılar
+    (bkz. ProductQuerySet.search). Açık bir ?ordering= verilmediyse sonuçlar alaka
+    düzeyine göre sıralı döner. DjangoFilterBackend'den sonra yer almalıdır.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+        return queryset.search(' '.join(search_terms))
+
 class ProductFilter(FilterSet):
     category_slug = django_filters.CharFilter(field_name='category__slug')
-    min_price = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
-    max_price = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    # Fiyat filtreleri indirim uygulanmış (indeksli) fiyat üzerinden çalışır
+    min_price = django_filters.NumberFilter(field_name='current_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='current_price', lookup_expr='lte')
     in_stock = django_filters.BooleanFilter(field_name='stock', method='filter_in_stock')
+    # rating_avg, Product.objects.with_rating() ile eklenen ortalama puan anotasyonudur
+    min_rating = django_filters.NumberFilter(field_name='rating_avg', lookup_expr='gte')
     
     def filter_in_stock(self, queryset, name, value):
         if value:
@@ -56,20 +117,29 @@ class ProductFilter(FilterSet):
     
     class Meta:
         model = Product
-        fields = ['category', 'category_slug', 'available', 'min_price', 'max_price', 'in_stock']
+        fields = ['category', 'category_slug', 'available', 'min_price', 'max_price', 'in_stock', 'min_rating']
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(SparseFieldsetsViewMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAdminUser]
     lookup_field = 'slug'
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
+    # Arama, yazım hatası kararını filtrelenmiş kümede vermek için filtrelerden sonra çalışır
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
+    # Arama ProductSearchFilter ile search_vector üzerinden yapılır; bu alanlar vektöre dahildir
     search_fields = ['name', 'description', 'category__name']
-    ordering_fields = ['name', 'price', 'created_at']
+    ordering_fields = ['name', 'price', 'current_price', 'created_at', 'rating_avg', 'rating_count', 'review_count']
     filterset_class = ProductFilter
+    pagination_class = ProductPagination
+    conditional_object_actions = ('retrieve', 'get_by_slug')
+    conditional_cache_namespace = 'catalog'
     
     def get_queryset(self):
-        queryset = Product.objects.all()
+        # Serileştiricinin satır başına sorgu atmaması için gerekli veriler önceden yüklenir
+        if self.action == 'retrieve':
+            queryset = Product.objects.with_detail_data()
+        else:
+            queryset = Product.objects.with_listing_data()
         
         # Default olarak sadece available=True olan ürünleri göster
         # is_admin durumuna göre available kontrolü yapalım
@@ -86,7 +156,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         if self.request.method == 'OPTIONS':
             return [permissions.AllowAny()]
             
-        if self.action in ['list', 'retrieve', 'reviews', 'ratings', 'feedback', 'has_reviewed', 'get_by_slug']:
+        if self.action in ['list', 'retrieve', 'reviews', 'ratings', 'feedback', 'has_reviewed', 'get_by_slug', 'suggest']:
             return [permissions.AllowAny()]
         elif self.action in ['add_review', 'add_rating']:
             return [IsAuthenticated()]
@@ -100,12 +170,39 @@ class ProductViewSet(viewsets.ModelViewSet):
         elif self.action == 'add_rating':
             return ProductRatingCreateSerializer
         return ProductSerializer
+
+    def get_conditional_queryset(self):
+        # by-slug uç noktası available filtresi olmadan çalışır
+        if self.action == 'get_by_slug':
+            return Product.objects.filter(slug=self.kwargs['slug'])
+        return super().get_conditional_queryset()
+
+    def get_conditional_timestamp_fields(self):
+        # Kategori adı listede, yorumlar detayda yanıta girer
+        if self.action in self.conditional_object_actions:
+            if not (is_field_requested(self.request, 'reviews') or is_field_requested(self.request, 'reviews_next')):
+                return ('updated_at', 'category__updated_at')
+            return ('updated_at', 'category__updated_at', 'reviews__updated_at')
+        return ('updated_at', 'category__updated_at')
+
+    @cache_response('catalog')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cache_response('catalog')
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
     
     @action(detail=True, methods=['get'])
     def reviews(self, request, slug=None):
         """Ürüne ait tüm yorumları getir"""
         product = self.get_object()
-        reviews = ProductReview.objects.filter(product=product)
+        reviews = ProductReview.objects.filter(product=product).select_related('user')
+        paginator = ReviewPagination()
+        page = paginator.paginate_queryset(reviews, request)
+        if page is not None:
+            serializer = ProductReviewSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
         serializer = ProductReviewSerializer(reviews, many=True)
         return Response(serializer.data)
     
@@ -184,12 +281,17 @@ class ProductViewSet(viewsets.ModelViewSet):
         paginator = StandardResultsSetPagination()
         
         # Yorumları al
-        reviews = ProductReview.objects.filter(product=product).order_by('-created_at')
-        # Kullanıcı ID'lerine göre puanlamaları alın
-        ratings = {rating.user_id: rating.rating for rating in ProductRating.objects.filter(product=product)}
+        reviews = ProductReview.objects.filter(product=product).select_related('user').order_by('-created_at', '-id')
         
         # Sayfalama
         page = paginator.paginate_queryset(reviews, request)
+
+        # Sadece bu sayfadaki kullanıcıların puanlamalarını alın
+        ratings = dict(
+            ProductRating.objects.filter(
+                product=product, user_id__in=[review.user_id for review in page]
+            ).values_list('user_id', 'rating')
+        )
         
         # Serileştiriciye göndermeden önce, her yoruma ait puanlamayı ekle
         for review in page:
@@ -218,20 +320,33 @@ class ProductViewSet(viewsets.ModelViewSet):
         
         return Response({"has_reviewed": False})
 
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Arama kutusu için ürün, kategori ve blog başlığı önerileri (bellek içi indeksten)"""
+        try:
+            limit = min(int(request.query_params.get('limit', 8)), 20)
+        except ValueError:
+            limit = 8
+        suggestion_index.ensure_fresh()
+        return Response(suggestion_index.lookup(request.query_params.get('q', ''), limit=max(limit, 1)))
+
     @action(detail=False, methods=['get'], url_path='by-slug/(?P<slug>[^/.]+)')
+    @cache_response('catalog')
     def get_by_slug(self, request, slug=None):
         """Ürünü slug ile getir (Public endpoint, herkes tarafından erişilebilir)"""
         try:
-            product = get_object_or_404(Product, slug=slug)
-            serializer = ProductDetailSerializer(product)
+            queryset = ProductDetailSerializer.optimize_queryset(Product.objects.with_detail_data(), request)
+            product = get_object_or_404(queryset, slug=slug)
+            serializer = ProductDetailSerializer(product, context=self.get_serializer_context())
             return Response(serializer.data)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
 
 class ProductReviewViewSet(viewsets.ModelViewSet):
-    queryset = ProductReview.objects.all()
+    queryset = ProductReview.objects.select_related('user')
     serializer_class = ProductReviewSerializer
     permission_classes = [permissions.IsAdminUser]
+    pagination_class = ReviewPagination
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
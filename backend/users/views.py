@@ -18,6 +18,10 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from .tasks import send_password_reset_email, send_welcome_email
+from carts.cart import CART_TOKEN_HEADER, merge_guest_cart
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
@@ -188,6 +192,12 @@ class LoginView(ObtainAuthToken):
         # Token oluştur veya al
         token, created = Token.objects.get_or_create(user=user)
         
+        # Misafir olarak doldurulan sepet kullanıcının sepetine aktarılır
+        try:
+            merge_guest_cart(user, request.headers.get(CART_TOKEN_HEADER))
+        except Exception as e:
+            logger.warning(f"Misafir sepeti aktarılamadı: {str(e)}")
+        
         # Profil bilgilerini de ekle
         user_serializer = UserSerializer(user)
         